@@ -1,78 +1,171 @@
-from constants import HOST, DATABASE_URL, PORT, DEBUG
+from constants import HOST, DATABASE_URL, PORT, DEBUG, METRICS_ENABLED, IDENTITY_CACHE_WARMUP, COLUMNAR_ENGINE
 import io, os
-import pandas as pd
+from functools import wraps
+from datetime import datetime
 from enum import Enum
 from urllib.parse import urlparse
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import NewType, Union, List, Optional, Any, Tuple, Dict, NamedTuple
+from typing import NewType, Union, List, Optional, Any, Tuple, Dict, NamedTuple, Iterator
 from models import (
-    PostgreSQL, College, Company, CompanyCollege, SortBy, SortByOptions, Order, OrderOptions, ItemPerson, 
-    AnalyticsSummary, TopListItem, TopCtcItem
+    PostgreSQL, LazyDatabase, College, Company, CompanyCollege, SortBy, SortByOptions, Order, OrderOptions, ItemPerson, PlacementRow, 
+    AnalyticsSummary, TopListItem, TopCtcItem, IngestReport, INGEST_COLUMNS, Page, PlacementQuery
 )
 
-from flask import Flask, jsonify, request, send_file
+import click
+from flask import Flask, Blueprint, current_app, jsonify, request, send_file, Response, stream_with_context
 from flask_cors import CORS
 from werkzeug.exceptions import BadRequest
+from cache import get_cache_backend, make_cache_key, make_etag, VersionedValue
+from metrics import Metrics, timed_serialization
+from json_encoding import FastJSONProvider, json_backend
+import compression
+from jobs import ImportJobRunner, JobError
+from replicas import VERSION_HEADER, MIN_VERSION_HEADER, required_version, written_version
+from arrow_io import ARROW_FORMATS, MEDIA_TYPES, ArrowChunker, ArrowUnavailable, stream_arrow, open_parquet, missing_columns, iter_parquet_records
+from serializers import (
+    get_dict_from_row, get_dict_from_company, get_dict_from_college, get_dict_from_report, get_dict_from_analytics,
+    get_dict_from_batch_report, get_dict_from_job, get_dict_from_distribution, get_distribution_args, get_columnar_from_rows, get_analytics_n,
+    get_autocomplete_args, get_dict_from_suggestions,
+    get_query, get_format, get_add_args, get_delete_args, get_edit_args, get_batch_ops, stream_csv, encode_rows_response,
+    RowFragmentCache, ResponseFormat, ResponseFormatOptions
+)
 
-db = PostgreSQL(DATABASE_URL)
-app = Flask(__name__)
-CORS(app)
-
-def get_dict_from_item(idx: int, item: ItemPerson):
-    return {
-        "id": idx,
-        "college_name": item.college.college_name, 
-        "company_name": item.company.company_name,
-        "role": item.company.role,
-        "ctc": item.company.ctc,
-        "hr_name" : item.person.name if item.person is not None else None,
-        "linkedin_id" : item.person.linkedin_id if item.person is not None else None,
-        "email" : item.person.email if item.person is not None else None,
-        "contact_number" :  item.person.contact_number if item.person is not None else None,
-    }
-    
-@app.route('/companies', methods=['GET'])
+metrics = Metrics()
+
+def init_database(database: PostgreSQL) -> None:
+    """Runs once, when the first request opens the database."""
+    if METRICS_ENABLED:
+        metrics.instrument_engine(database.engine)
+        metrics.watch_pool(database.pool_monitor)
+        for replica in (database.replicas.replicas if database.replicas is not None else []): metrics.instrument_engine(replica.engine)
+    if IDENTITY_CACHE_WARMUP:
+        try: database.warm_identity_caches()
+        finally: database.remove()
+    if COLUMNAR_ENGINE:
+        from columnar import ColumnStore, check_collation # NumPy, only for the apps that keep the copy
+        check_collation(database.engine) # other collations would page the copy and the database differently
+        database.columns = ColumnStore() # loaded by the first /view or /search
+    jobs.resume(database) # imports a previous process left unfinished
+
+# Nothing here connects: the engine is built by the first request that needs it, pandas is imported by the two
+# routes that use it. Serverless cold starts and short-lived workers only pay for what they serve.
+db = LazyDatabase(lambda: PostgreSQL(DATABASE_URL), on_create=init_database)
+cache = get_cache_backend()
+fragments = RowFragmentCache(json_backend)
+jobs = ImportJobRunner(db)
+snapshots = VersionedValue() # CTC column snapshot of /analytics/distribution
+bp = Blueprint("api", __name__, cli_group=None)
+
+@bp.before_request
+def read_your_writes():
+    """A client that wrote sends back the version it got, replicas that haven't caught up don't serve it."""
+    try: required_version.set(int(request.headers.get(MIN_VERSION_HEADER, 0)))
+    except ValueError: raise BadRequest(f"{MIN_VERSION_HEADER} must be an integer")
+    written_version.set(None)
+
+@bp.after_request
+def add_written_version(response: Response) -> Response:
+    version = written_version.get()
+    if version is not None: response.headers[VERSION_HEADER] = str(version)
+    return response
+
+def cached_response(view):
+    """
+    Serves a read endpoint from `cache`, keyed by endpoint, normalized query/JSON parameters and dataset version.
+    Responses carry a strong ETag, a matching If-None-Match gets a 304 without touching the view.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # The view reads in the same session: from the replica the version came from, if any
+        try:
+            version = db.get_version()
+            params = {"args": request.args.to_dict(flat=False), "json": request.get_json(silent=True)}
+            key = make_cache_key(request.endpoint, version, params)
+            etag = make_etag(key)
+            if request.if_none_match.contains_weak(etag): response = Response(status=304) # weak: compressed bodies carry W/ tags
+            else:
+                body = cache.get(key)
+                if body is not None: response = Response(body, mimetype='application/json')
+                else:
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200: return response
+                    cache.set(key, response.get_data())
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache' # browsers revalidate, we answer 304 while nothing changed
+            return response
+        finally: db.remove()
+    return wrapper
+
+def rows_response(query: PlacementQuery, page: Page, response_format: ResponseFormat) -> Response:
+    """A /view or /search body, row objects assembled from `fragments`."""
+    with timed_serialization(): body = encode_rows_response(query, page, response_format, fragments)
+    return Response(body, mimetype='application/json')
+
+@bp.route('/companies', methods=['GET'])
+@cached_response
 def get_companies():
     try:
         companies = db.fetch_all_companies()
         # db.close()
-        return jsonify([{
-            "id": company.id,
-            "company_name": company.company_name,
-            "role": company.role,
-            "ctc": company.ctc
-        } for company in companies])
+        return jsonify([get_dict_from_company(company) for company in companies])
     except Exception as e: return {"error": str(e)}, 500
     finally: db.remove()
 
-@app.route('/colleges', methods=['GET'])
+@bp.route('/colleges', methods=['GET'])
+@cached_response
 def get_colleges():
     try:
         colleges = db.fetch_all_colleges()
-        return jsonify([{
-            "id": college.id,
-            "college_name": college.college_name
-        } for college in colleges])
+        return jsonify([get_dict_from_college(college) for college in colleges])
     except Exception as e: return {"error": str(e)}, 500
     finally: db.remove()
     
-@app.route('/view', methods=['POST'])
+@bp.route('/view', methods=['POST'])
+@cached_response
 def get_view_data():
     try:
         data = request.json
-        sort_by = SortByOptions.get(data.get('sort_by'))
-        if sort_by is None: items = db.fetch_all_data()
-        else: items = db.fetch_all_data_sorted(sort_by=sort_by)
-        return jsonify([get_dict_from_item(idx, item) for idx, item in enumerate(items)])
+        query, response_format = get_query(data), get_format(data.get('format'))
+        return rows_response(query, db.query_rows(query), response_format)
+    except BadRequest as e: return jsonify({"message": e.description}), 400
     except Exception as e: return {"error": str(e)}, 500
     finally: db.remove()
 
-@app.route('/download', methods=['GET'])
+@bp.route('/download', methods=['GET'])
 def download():
+    """
+    Exports the dataset as CSV, streamed by default; `?stream=false` builds the whole file in memory first.
+    `?format=columnar` exports the columnar JSON of /view instead, `?format=parquet` / `?format=arrow` a Parquet or
+    Arrow IPC file streamed one record batch at a time.
+    """
     try:
-        items = db.fetch_all_data()
-        data = [get_dict_from_item(idx, item) for idx, item in enumerate(items)]
+        export_format = request.args.get('format', 'csv')
+        if export_format == ResponseFormatOptions["columnar"]:
+            response = jsonify(get_columnar_from_rows(db.fetch_all_rows()))
+            download_name = f"data_export_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json"
+            response.headers["Content-Disposition"] = f"attachment; filename={download_name}"
+            return response
+        if export_format in ARROW_FORMATS:
+            try: chunker = ArrowChunker(export_format)
+            except ArrowUnavailable as e: return jsonify({"message": str(e)}), 400
+            def generate_arrow() -> Iterator[bytes]:
+                try: yield from stream_arrow(db.iter_export_rows(), chunker)
+                finally: db.remove()
+            download_name = f"data_export_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.{export_format}"
+            return Response(stream_with_context(generate_arrow()), mimetype=MEDIA_TYPES[export_format],
+                            headers={"Content-Disposition": f"attachment; filename={download_name}"})
+        if export_format != 'csv': return jsonify({"message": "format must be csv, columnar, parquet or arrow"}), 400
+        if request.args.get('stream', 'true').lower() not in ('false', '0', 'f'):
+            def generate() -> Iterator[str]:
+                try: yield from stream_csv(db.iter_export_rows())
+                finally: db.remove()
+            download_name = f"data_export_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.csv"
+            return Response(stream_with_context(generate()), mimetype='text/csv',
+                            headers={"Content-Disposition": f"attachment; filename={download_name}"})
+        import pandas as pd # only the buffered export and uploads use it, it is the slowest import by far
+        rows = db.fetch_all_rows()
+        data = [get_dict_from_row(idx, row) for idx, row in enumerate(rows)]
         df = pd.DataFrame(data)
         buffer = io.BytesIO()
         df.to_csv(buffer, index=False)
@@ -82,58 +175,29 @@ def download():
     except Exception as e: return {"error": str(e)}, 500
     finally: db.remove()
 
-@app.route('/search', methods=['POST'])
+@bp.route('/search', methods=['POST'])
 def search():
     try:
         data = request.json
-        college_name = data.get('college_name')
-        company_name = data.get('company_name')
-        role = data.get('role')
-        non_none_count = sum(var is not None for var in (college_name, company_name, role))
-        if non_none_count == 0: return jsonify([])
-        if non_none_count == 1:
-            if college_name is not None: 
-                items = db.search_by_college(college_name=college_name)
-            elif company_name is not None: 
-                items = db.search_by_company(company_name=company_name)
-            else:  # elif role is not None:
-                items = db.search_by_role(role=role)
-        else:
-            items = db.search_with_filters(college_name=college_name, company_name=company_name, role=role)
-
-        return jsonify([get_dict_from_item(idx, item) for idx, item in enumerate(items)])
+        query, response_format = get_query(data), get_format(data.get('format'))
+        # Searching for nothing finds nothing, /view lists everything
+        if not query.has_filters: page = Page(items=[], next_cursor=None, total=0 if query.with_total else None)
+        else: page = db.query_rows(query)
+        return rows_response(query, page, response_format)
+    except BadRequest as e: return jsonify({"message": e.description}), 400
     except Exception as e: return {"error": str(e)}, 500
     finally: db.remove()
-@app.route('/add', methods=['POST'])
+@bp.route('/add', methods=['POST'])
 def add_data():
     try:
         data = request.json
-
-        college_name = data.get('college_name')
-        company_name = data.get('company_name')
-        role = data.get('role')
-        ctc = data.get('ctc')
-        
-        hr_name = data.get('hr_name')
-        linkedin_id = data.get('linkedin_id')
-        email = data.get('email')
-        contact_number = data.get('contact_number')
-
-        if company_name is None or role is None or ctc is None or college_name is None:
-            raise BadRequest("Missing required fields in request data")
-        try: ctc = float(ctc)
-        except Exception as e: raise BadRequest("ctc must be real")
-
-        db.add_data(college_name=college_name,
-                    company_name=company_name,
-                    role=role,
-                    ctc=ctc, hr_name=hr_name, email=email, contact_number=contact_number, linkedin_id=linkedin_id)
+        db.add_data(**get_add_args(data))
         db.commit()
         return jsonify({"message": "Data added successfully!"}), 201
     except Exception as e: return {"error": str(e)}, 500
     finally: db.remove()
 
-@app.route('/upload-csv', methods=['POST'])
+@bp.route('/upload-csv', methods=['POST'])
 def upload_csv():
     try:
         if 'file' not in request.files: return jsonify({"message": "No file part"}), 400
@@ -141,100 +205,83 @@ def upload_csv():
         if file.filename == '': return jsonify({"message": "No selected file"}), 400
         if file and file.filename.endswith('.csv'):
             # Use pandas to read the CSV file directly from the file object
+            import pandas as pd
             try:
                 df = pd.read_csv(file)  # , index_col=0
-                required_columns = ['college_name', 'company_name', 'role', 'ctc', 'hr_name', 'linkedin_id', 'email', 'contact_number']
-                missing_columns = [col for col in required_columns if col not in df.columns]
+                missing_columns = [col for col in INGEST_COLUMNS if col not in df.columns]
                 if missing_columns: 
                     return jsonify({"message": "Missing columns: " + ", ".join(missing_columns)}), 400
-                for i in range(0, len(df)):
-                    c =  df.iloc[i]
-                    (college_name, company_name, role, ctc, 
-                     hr_name, linkedin_id, email, contact_number) = (c["college_name"], c["company_name"], c["role"], c["ctc"],
-                                                                     c["hr_name"], c["linkedin_id"], c["email"], c["contact_number"])
-                    
-                    db.add_data(college_name=str(college_name),
-                                company_name=str(company_name),
-                                role=str(role),
-                                ctc=float(ctc),
-                                hr_name=(str(hr_name) if not pd.isna(hr_name) else None),
-                                linkedin_id=(str(linkedin_id) if not pd.isna(linkedin_id) else None),
-                                email=(str(email) if not pd.isna(email) else None),
-                                contact_number=(str(contact_number) if not pd.isna(contact_number) else None)
-                    )
-                db.commit()
-                return jsonify({"message": "File uploaded successfully!"}), 201
+                report = db.bulk_add_data(df[INGEST_COLUMNS].to_dict('records'))
+                return jsonify({"message": "File uploaded successfully!", **get_dict_from_report(report)}), 201
             except Exception as e:
                 return jsonify({"message": f"Error processing the file: {str(e)}"}), 400
         return jsonify({"message": "Invalid file type. Only CSV files are allowed."}), 400
     except Exception as e: return {"error": str(e)}, 500
     finally: db.remove()
 
-@app.route('/edit-college-company', methods=['POST'])
+@bp.route('/upload-parquet', methods=['POST'])
+def upload_parquet():
+    """`/upload-csv` for Parquet files, read and validated one record batch at a time and written in one transaction."""
+    try:
+        if 'file' not in request.files: return jsonify({"message": "No file part"}), 400
+        file = request.files['file']
+        if file.filename == '': return jsonify({"message": "No selected file"}), 400
+        if file and file.filename.endswith('.parquet'):
+            try:
+                parquet = open_parquet(file.stream)
+                missing = missing_columns(parquet)
+                if missing: return jsonify({"message": "Missing columns: " + ", ".join(missing)}), 400
+                report = db.bulk_add_batches(iter_parquet_records(parquet))
+                return jsonify({"message": "File uploaded successfully!", **get_dict_from_report(report)}), 201
+            except Exception as e:
+                return jsonify({"message": f"Error processing the file: {str(e)}"}), 400
+        return jsonify({"message": "Invalid file type. Only Parquet files are allowed."}), 400
+    except Exception as e: return {"error": str(e)}, 500
+    finally: db.remove()
+
+@bp.route('/jobs', methods=['POST'])
+def submit_job():
+    """Background import of a CSV or Parquet file: spooled to disk, the job id comes back before any row is read."""
+    try:
+        if 'file' not in request.files: return jsonify({"message": "No file part"}), 400
+        file = request.files['file']
+        if file.filename == '': return jsonify({"message": "No selected file"}), 400
+        try: job_id = jobs.submit(file.stream, file.filename)
+        except JobError as e: return jsonify({"message": str(e)}), 400
+        status_url = f"/jobs/{job_id}"
+        return jsonify({"message": "Import queued", "job_id": job_id, "status_url": status_url}), 202, {"Location": status_url}
+    except Exception as e: return {"error": str(e)}, 500
+    finally: db.remove()
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id: str):
+    """Progress of an import job: rows processed and rejected so far, throughput and ETA."""
+    try:
+        job = db.get_import_job(job_id)
+        if job is None: return jsonify({"message": "Job not found"}), 404
+        return jsonify(get_dict_from_job(job))
+    except Exception as e: return {"error": str(e)}, 500
+    finally: db.remove()
+
+@bp.route('/edit-college-company', methods=['POST'])
 def edit_college_company():
     try:
         # first delete then add new entry...
         data = request.json
-        old_college_name = data.get('old_college_name')
-        old_company_name = data.get('old_company_name')
-        old_role = data.get('old_role')
-        old_ctc = data.get('old_ctc')
-
-
-        if old_college_name is None or old_role is None or old_ctc is None or old_company_name is None:
-            raise BadRequest("Missing required fields in request data")
-        try: old_ctc = float(old_ctc)
-        except Exception as e: raise BadRequest("ctc must be real")
-
-        new_college_name = data.get('new_college_name', old_college_name)
-        new_company_name = data.get('new_company_name', old_company_name)
-        new_role = data.get('new_role', old_role)
-        new_ctc = data.get('new_ctc', old_ctc)
-        try: new_ctc = float(new_ctc)
-        except Exception as e: raise BadRequest("ctc must be real")
-        
-        new_hr_name = data.get('new_hr_name')
-        new_linkedin_id = data.get('new_linkedin_id')
-        new_email = data.get('new_email')
-        new_contact_number = data.get('new_contact_number')
-
-        college = College.get(db.session, college_name=old_college_name)
-        company = Company.get(db.session, company_name=old_company_name, role=old_role, ctc=old_ctc)
-        if college is None or company is None: raise BadRequest("Data not found...")
-
-        college.companies.remove(company)
-        if len(college.companies) == 0: db.session.delete(college)
-        if len(company.colleges) == 0: db.session.delete(company)
-
-        db.add_data(college_name=new_college_name, company_name=new_company_name, role=new_role, ctc=new_ctc,
-                    hr_name=new_hr_name, email=new_email, contact_number=new_contact_number, linkedin_id=new_linkedin_id)
+        old, new = get_edit_args(data)
+        if not db.delete_data(**old): raise BadRequest("Data not found...")
+        db.add_data(**new)
 
         db.commit()
         return jsonify({"message": "Data successfully deleted!"}), 201
     except Exception as e: return {"error": str(e)}, 500
     finally: db.remove()
 
-@app.route('/delete-college-company', methods=['POST'])
+@bp.route('/delete-college-company', methods=['POST'])
 def delete_college_company():
     try:
         data = request.json
-        college_name = data.get('college_name')
-        company_name = data.get('company_name')
-        role = data.get('role')
-        ctc = data.get('ctc')
-
-        if company_name is None or role is None or ctc is None or college_name is None:
-            raise BadRequest("Missing required fields in request data")
-        try: ctc = float(ctc)
-        except Exception as e: raise BadRequest("ctc must be real")
-
-        college = College.get(db.session, college_name=college_name)
-        company = Company.get(db.session, company_name=company_name, role=role, ctc=ctc)
-        if college is None or company is None: raise BadRequest("Data not found...")
-
-        college.companies.remove(company)
-        if len(college.companies) == 0: db.session.delete(college)
-        if len(company.colleges) == 0: db.session.delete(company)
+        if not db.delete_data(**get_delete_args(data)): raise BadRequest("Data not found...")
 
         db.commit()
 
@@ -242,41 +289,112 @@ def delete_college_company():
     except Exception as e: return {"error": str(e)}, 500
     finally: db.remove()
 
-@app.route('/analytics', methods=['GET'])
+@bp.route('/batch', methods=['POST'])
+def apply_batch():
+    """Ordered add / edit / delete operations applied in one transaction, all or nothing, with a result per operation."""
+    try:
+        try: operations, invalid = get_batch_ops(request.get_json(silent=True))
+        except BadRequest as e: return jsonify({"message": e.description}), 400
+        if invalid: return jsonify({"message": "Invalid operations", "applied": False, "results": [result._asdict() for result in invalid]}), 400
+        report = db.apply_batch(operations)
+        if not report.applied: return jsonify({"message": "Batch not applied", **get_dict_from_batch_report(report)}), 409
+        return jsonify({"message": "Batch applied successfully!", **get_dict_from_batch_report(report)}), 201
+    except Exception as e: return {"error": str(e)}, 500
+    finally: db.remove()
+
+@bp.route('/analytics', methods=['GET'])
+@cached_response
 def get_analytics():
     """
     Provides various analytics data.
     Accepts optional query parameter 'n' for top lists (default 5).
     """
     try:
-        # Get 'n' from query parameters, default to 5 if not provided or invalid
-        try:
-            n = int(request.args.get('n', 5))
-            if n <= 0: n = 5
-        except ValueError:
-            n = 5
-
-        summary = db.get_analytics_summary()
-        top_companies_visits = db.get_top_companies_by_visits(n)
-        top_colleges_visits = db.get_top_colleges_by_visits(n)
-        top_placements_ctc = db.get_top_placements_by_ctc(n)
-
-        # Convert NamedTuples to dictionaries for JSON serialization
-        analytics_data = {
-            "summary": summary._asdict(),
-            f"top_{n}_companies_by_visits": [item._asdict() for item in top_companies_visits],
-            f"top_{n}_colleges_by_visits": [item._asdict() for item in top_colleges_visits],
-            f"top_{n}_placements_by_ctc": [item._asdict() for item in top_placements_ctc],
-        }
-
+        n = get_analytics_n(request.args.get('n'))
+        analytics_data = get_dict_from_analytics(n, db.get_analytics_summary(), db.get_top_companies_by_visits(n),
+                                                 db.get_top_colleges_by_visits(n), db.get_top_placements_by_ctc(n))
         return jsonify(analytics_data)
 
     except Exception as e:
-        # Log the exception details here if needed
-        print(f"Error in /analytics: {e}") # Basic logging
+        current_app.logger.exception("Error in /analytics")
         return jsonify({"error": f"An internal error occurred: {str(e)}"}), 500
     finally:
         db.remove()
 
+@bp.route('/analytics/distribution', methods=['GET', 'POST'])
+@cached_response
+def get_distribution():
+    """
+    CTC percentiles, histogram, per-role and per-college medians, and comparisons between groups of colleges.
+    Optional 'percentiles', 'bins', 'limit' (groups in the median lists) and, as JSON, 'groups': {name: [college names]}.
+    """
+    try:
+        args = get_distribution_args(request.get_json(silent=True) or request.args)
+        from distribution import load_snapshot, distribution_report # NumPy, imported on first use
+        snapshot = snapshots.get(db.get_version(), lambda version: load_snapshot(db, version))
+        return jsonify(get_dict_from_distribution(distribution_report(snapshot, **args)))
+    except BadRequest as e: return jsonify({"message": e.description}), 400
+    except Exception as e: return {"error": str(e)}, 500
+    finally: db.remove()
+
+@bp.route('/autocomplete', methods=['GET'])
+def get_autocomplete():
+    """
+    Typeahead suggestions, the names with a word starting with 'prefix' (any case) most placed first. Optional 'field'
+    (college_name, company_name or role, all three by default) and 'limit' per field. Not cached: the index answers faster.
+    """
+    try:
+        fields, prefix, limit = get_autocomplete_args(request.args)
+        return jsonify(get_dict_from_suggestions({field: db.suggest(field, prefix, limit) for field in fields}))
+    except BadRequest as e: return jsonify({"message": e.description}), 400
+    except Exception as e: return {"error": str(e)}, 500
+    finally: db.remove()
+
+@bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    stats = cache.stats()
+    identity = {stats.backend: {**stats._asdict(), "hit_rate": stats.hit_rate} for stats in db.identity_cache_stats()}
+    fragment_stats = fragments.stats()
+    columns = db.columns.stats()._asdict() if db.columns is not None else None
+    return jsonify({**stats._asdict(), "hit_rate": stats.hit_rate, "identity": identity, "fragments": {**fragment_stats._asdict(), "hit_rate": fragment_stats.hit_rate},
+                    "columns": columns, "autocomplete": db.autocomplete.stats()._asdict()})
+
+@bp.route('/pool/stats', methods=['GET'])
+def get_pool_stats():
+    return jsonify({**db.pool_stats()._asdict(), "replicas": [stats._asdict() for stats in db.replica_stats()]})
+
+@bp.cli.command("check-rollups")
+@click.option("--repair", is_flag=True, help="Rebuild the rollups from scratch when they disagree.")
+def check_rollups(repair: bool):
+    """Compares the analytics rollup tables with a full recomputation."""
+    try:
+        diff = db.check_rollups(repair=repair)
+        if diff.consistent: return click.echo("Rollups are consistent.")
+        for field, (stored, actual) in diff.stats.items(): click.echo(f"placement_stats.{field}: stored={stored} actual={actual}")
+        for company_id, (stored, actual) in diff.companies.items(): click.echo(f"company_visits[{company_id}]: stored={stored} actual={actual}")
+        for college_id, (stored, actual) in diff.colleges.items(): click.echo(f"college_visits[{college_id}]: stored={stored} actual={actual}")
+        click.echo("Rollups rebuilt." if repair else "Run with --repair to rebuild them.")
+    finally: db.remove()
+
+@bp.cli.command("init-db")
+def init_db():
+    """Creates the schema and applies pending migrations. Run once per database and after upgrades, unless AUTO_CREATE_SCHEMA is on."""
+    try:
+        applied = db.create_all()
+        click.echo(f"Schema is up to date, applied migrations: {', '.join(map(str, applied)) or 'none'}.")
+    finally: db.remove()
+
+def create_app() -> Flask:
+    """The Flask app (`flask --app "api:create_app()"`), cheap to build: the database opens on first use."""
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    CORS(app, expose_headers=["ETag", VERSION_HEADER])
+    if METRICS_ENABLED: metrics.init_app(app) # first: after_request hooks run in reverse, it sees the compressed response
+    compression.init_app(app)
+    app.register_blueprint(bp)
+    return app
+
+app = create_app()
+
 if __name__ == '__main__':
     app.run(debug=DEBUG, host=HOST, port=PORT)
\ No newline at end of file
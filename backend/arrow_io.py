@@ -0,0 +1,95 @@
+"""
+Apache Parquet and Arrow IPC for bulk data: `/download?format=parquet|arrow` exports and `/upload-parquet` imports.
+
+Both directions work in record batches of `ARROW_BATCH_SIZE` rows, so memory stays bounded by one batch: exports
+encode a batch (a Parquet row group) at a time as rows stream out of the database, uploads hand `bulk_add_batches`
+one decoded batch at a time. `ctc` keeps its float type, strings and nulls round-trip as they are.
+pyarrow is an optional dependency, imported on first use; without it these formats raise `ArrowUnavailable`.
+"""
+import io
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+
+from constants import ARROW_BATCH_SIZE
+from models import INGEST_COLUMNS
+
+ARROW_FORMATS = ("parquet", "arrow")
+MEDIA_TYPES = {"parquet": "application/vnd.apache.parquet", "arrow": "application/vnd.apache.arrow.file"}
+
+class ArrowUnavailable(RuntimeError): pass
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow, pyarrow.ipc, pyarrow.parquet # the heaviest import of the app, only for these formats
+    except ImportError as e: raise ArrowUnavailable("Parquet and Arrow formats need the pyarrow package") from e
+    return pyarrow
+
+def export_schema() -> Any:
+    """The /download columns: a running `id`, then `INGEST_COLUMNS`, `ctc` as float64 and the rest as strings."""
+    pa = _pyarrow()
+    return pa.schema([("id", pa.int64())] + [(name, pa.float64() if name == "ctc" else pa.string()) for name in INGEST_COLUMNS])
+
+class _Sink(io.RawIOBase):
+    """Write-only file collecting what a writer emits, taken out between batches."""
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+    def writable(self) -> bool: return True
+    def write(self, data: Any) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    def tell(self) -> int: return self.position
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+class ArrowChunker:
+    """`CsvChunker` for Parquet and Arrow IPC files: buffers `batch_size` rows, then encodes them as one record batch."""
+    def __init__(self, export_format: str, batch_size: int = ARROW_BATCH_SIZE):
+        if export_format not in ARROW_FORMATS: raise ValueError(f"Unknown Arrow format {export_format}")
+        self.pa = _pyarrow()
+        self.schema = export_schema()
+        self.batch_size = batch_size
+        self.count = 0
+        self.sink = _Sink()
+        if export_format == "parquet": self.writer = self.pa.parquet.ParquetWriter(self.sink, self.schema)
+        else: self.writer = self.pa.ipc.new_file(self.sink, self.schema)
+        self.columns: List[List[Any]] = [[] for _ in self.schema]
+    def _write(self) -> None:
+        if not self.columns[0]: return
+        arrays = [self.pa.array(values, type=field.type) for values, field in zip(self.columns, self.schema)]
+        self.writer.write_batch(self.pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self.columns = [[] for _ in self.schema]
+    def add(self, row: tuple) -> Optional[bytes]:
+        """Buffers one export row, returns the encoded bytes once `batch_size` rows are buffered."""
+        self.columns[0].append(self.count)
+        for values, value in zip(self.columns[1:], row): values.append(value)
+        self.count += 1
+        if len(self.columns[0]) < self.batch_size: return None
+        self._write()
+        return self.sink.take()
+    def finish(self) -> bytes:
+        """The last batch and the file footer."""
+        self._write()
+        self.writer.close()
+        return self.sink.take()
+
+def stream_arrow(rows: Iterator[tuple], chunker: ArrowChunker) -> Iterator[bytes]:
+    """Yields the export file batch by batch, like `stream_csv`."""
+    for row in rows:
+        chunk = chunker.add(row)
+        if chunk: yield chunk
+    yield chunker.finish()
+
+def open_parquet(file: BinaryIO) -> Any:
+    """A `pyarrow.parquet.ParquetFile` over a seekable upload, only the footer is read."""
+    return _pyarrow().parquet.ParquetFile(file)
+
+def missing_columns(parquet: Any) -> List[str]:
+    names = set(parquet.schema_arrow.names)
+    return [col for col in INGEST_COLUMNS if col not in names]
+
+def iter_parquet_records(parquet: Any, batch_size: int = ARROW_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """The `INGEST_COLUMNS` of the file as lists of records, one record batch at a time."""
+    for batch in parquet.iter_batches(batch_size=batch_size, columns=INGEST_COLUMNS): yield batch.to_pylist()
@@ -0,0 +1,318 @@
+"""
+ASGI serving mode: the routes of api.py on Starlette, backed by `AsyncPostgreSQL`.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5001
+
+Handlers await the database instead of holding a worker thread, so slow queries or long downloads
+don't cap concurrency at the thread count. The Flask app (api.py) keeps working unchanged.
+"""
+import json, logging
+from datetime import datetime
+from contextlib import asynccontextmanager
+from functools import wraps
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from werkzeug.exceptions import BadRequest
+
+from constants import DATABASE_URL, DEBUG, IDENTITY_CACHE_WARMUP, AUTO_CREATE_SCHEMA
+from models import PostgreSQL, LazyDatabase, Page, INGEST_COLUMNS
+from async_models import AsyncPostgreSQL, to_sync_url
+from jobs import ImportJobRunner, JobError
+from cache import get_cache_backend, make_cache_key, make_etag, VersionedValue
+from compression import CompressionMiddleware
+from arrow_io import ARROW_FORMATS, MEDIA_TYPES, ArrowChunker, ArrowUnavailable, open_parquet, missing_columns, iter_parquet_records
+from serializers import (
+    get_dict_from_company, get_dict_from_college, get_dict_from_report, get_dict_from_analytics,
+    get_dict_from_batch_report, get_dict_from_job, get_dict_from_distribution, get_distribution_args, get_columnar_from_rows, get_analytics_n,
+    get_autocomplete_args, get_dict_from_suggestions, get_query, get_format,
+    get_add_args, get_delete_args, get_edit_args, get_batch_ops, CsvChunker, encode_rows_response, RowFragmentCache, ResponseFormatOptions
+)
+from json_encoding import json_backend
+
+logger = logging.getLogger(__name__)
+db = AsyncPostgreSQL(DATABASE_URL)
+cache = get_cache_backend()
+fragments = RowFragmentCache(json_backend)
+# Import jobs and distribution snapshots are built on worker threads, with a sync engine of their own
+sync_db = LazyDatabase(lambda: PostgreSQL(to_sync_url(DATABASE_URL), create_schema=False))
+jobs = ImportJobRunner(sync_db)
+snapshots = VersionedValue()
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+def json_response(data: Any, status_code: int = 200) -> Response:
+    """Same body as the Flask app's `jsonify`."""
+    return Response(json_backend.dumps(data) + b"\n", status_code=status_code, media_type="application/json")
+
+async def get_json(request: Request) -> Any:
+    try: return await request.json()
+    except Exception as e: raise BadRequest("Failed to decode JSON object")
+
+def cached_response(view: Handler) -> Handler:
+    """Async `api.cached_response`: cache hits and 304s never reach the view."""
+    @wraps(view)
+    async def wrapper(request: Request) -> Response:
+        version = await db.get_version()
+        body = await request.body()
+        try: body_json = json.loads(body) if body else None
+        except ValueError: body_json = None
+        args = {key: request.query_params.getlist(key) for key in request.query_params.keys()}
+        key = make_cache_key(view.__name__, version, {"args": args, "json": body_json})
+        etag = make_etag(key)
+        # Weak comparison, compressed bodies carry W/ tags
+        if etag in {tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")}: response = Response(status_code=304)
+        else:
+            cached = cache.get(key)
+            if cached is not None: response = Response(cached, media_type="application/json")
+            else:
+                response = await view(request)
+                if response.status_code != 200: return response
+                cache.set(key, response.body)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache" # browsers revalidate, we answer 304 while nothing changed
+        return response
+    return wrapper
+
+@cached_response
+async def get_companies(request: Request) -> Response:
+    try:
+        companies = await db.fetch_all_companies()
+        return json_response([get_dict_from_company(company) for company in companies])
+    except Exception as e: return json_response({"error": str(e)}, 500)
+
+@cached_response
+async def get_colleges(request: Request) -> Response:
+    try:
+        colleges = await db.fetch_all_colleges()
+        return json_response([get_dict_from_college(college) for college in colleges])
+    except Exception as e: return json_response({"error": str(e)}, 500)
+
+@cached_response
+async def get_view_data(request: Request) -> Response:
+    try:
+        data = await get_json(request)
+        query, response_format = get_query(data), get_format(data.get('format'))
+        return Response(encode_rows_response(query, await db.query_rows(query), response_format, fragments), media_type="application/json")
+    except BadRequest as e: return json_response({"message": e.description}, 400)
+    except Exception as e: return json_response({"error": str(e)}, 500)
+
+async def download(request: Request) -> Response:
+    """Exports the dataset as CSV, streamed by default; `?stream=false` builds the whole file in memory first. `?format=columnar|parquet|arrow` as in api.py."""
+    async def generate() -> AsyncIterator[str]:
+        chunker = CsvChunker()
+        yield chunker.header()
+        async for row in db.iter_export_rows():
+            chunk = chunker.add(row)
+            if chunk is not None: yield chunk
+        rest = chunker.flush()
+        if rest: yield rest
+    try:
+        export_format = request.query_params.get('format', 'csv')
+        if export_format == ResponseFormatOptions["columnar"]:
+            response = json_response(get_columnar_from_rows(await db.fetch_all_rows()))
+            response.headers["Content-Disposition"] = f"attachment; filename=data_export_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json"
+            return response
+        if export_format in ARROW_FORMATS:
+            try: arrow_chunker = ArrowChunker(export_format)
+            except ArrowUnavailable as e: return json_response({"message": str(e)}, 400)
+            async def generate_arrow() -> AsyncIterator[bytes]:
+                async for row in db.iter_export_rows():
+                    chunk = arrow_chunker.add(row)
+                    if chunk: yield chunk
+                yield arrow_chunker.finish()
+            return StreamingResponse(generate_arrow(), media_type=MEDIA_TYPES[export_format],
+                                     headers={"Content-Disposition": f"attachment; filename=data_export_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.{export_format}"})
+        if export_format != 'csv': return json_response({"message": "format must be csv, columnar, parquet or arrow"}, 400)
+        headers = {"Content-Disposition": f"attachment; filename=data_export_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.csv"}
+        if request.query_params.get('stream', 'true').lower() not in ('false', '0', 'f'):
+            return StreamingResponse(generate(), media_type="text/csv", headers=headers)
+        return Response("".join([chunk async for chunk in generate()]), media_type="text/csv", headers=headers)
+    except Exception as e: return json_response({"error": str(e)}, 500)
+
+async def search(request: Request) -> Response:
+    try:
+        data = await get_json(request)
+        query, response_format = get_query(data), get_format(data.get('format'))
+        if not query.has_filters: page = Page(items=[], next_cursor=None, total=0 if query.with_total else None)
+        else: page = await db.query_rows(query)
+        return Response(encode_rows_response(query, page, response_format, fragments), media_type="application/json")
+    except BadRequest as e: return json_response({"message": e.description}, 400)
+    except Exception as e: return json_response({"error": str(e)}, 500)
+
+async def add_data(request: Request) -> Response:
+    try:
+        await db.add_data(**get_add_args(await get_json(request)))
+        return json_response({"message": "Data added successfully!"}, 201)
+    except Exception as e: return json_response({"error": str(e)}, 500)
+
+async def upload_csv(request: Request) -> Response:
+    try:
+        form = await request.form()
+        if 'file' not in form: return json_response({"message": "No file part"}, 400)
+        file = form['file']
+        if not getattr(file, 'filename', None): return json_response({"message": "No selected file"}, 400)
+        if file.filename.endswith('.csv'):
+            try:
+                import pandas as pd # imported on first upload, see api.py
+                # pandas parsing is CPU bound, keep it off the event loop
+                df = await run_in_threadpool(pd.read_csv, file.file)
+                missing_columns = [col for col in INGEST_COLUMNS if col not in df.columns]
+                if missing_columns:
+                    return json_response({"message": "Missing columns: " + ", ".join(missing_columns)}, 400)
+                report = await db.bulk_add_data(df[INGEST_COLUMNS].to_dict('records'))
+                return json_response({"message": "File uploaded successfully!", **get_dict_from_report(report)}, 201)
+            except Exception as e:
+                return json_response({"message": f"Error processing the file: {str(e)}"}, 400)
+        return json_response({"message": "Invalid file type. Only CSV files are allowed."}, 400)
+    except Exception as e: return json_response({"error": str(e)}, 500)
+
+async def upload_parquet(request: Request) -> Response:
+    try:
+        form = await request.form()
+        if 'file' not in form: return json_response({"message": "No file part"}, 400)
+        file = form['file']
+        if not getattr(file, 'filename', None): return json_response({"message": "No selected file"}, 400)
+        if file.filename.endswith('.parquet'):
+            try:
+                parquet = await run_in_threadpool(open_parquet, file.file)
+                missing = missing_columns(parquet)
+                if missing: return json_response({"message": "Missing columns: " + ", ".join(missing)}, 400)
+                # Batches are decoded by the worker thread that writes them
+                report = await db.bulk_add_batches(iter_parquet_records(parquet))
+                return json_response({"message": "File uploaded successfully!", **get_dict_from_report(report)}, 201)
+            except Exception as e:
+                return json_response({"message": f"Error processing the file: {str(e)}"}, 400)
+        return json_response({"message": "Invalid file type. Only Parquet files are allowed."}, 400)
+    except Exception as e: return json_response({"error": str(e)}, 500)
+
+async def submit_job(request: Request) -> Response:
+    try:
+        form = await request.form()
+        if 'file' not in form: return json_response({"message": "No file part"}, 400)
+        file = form['file']
+        if not getattr(file, 'filename', None): return json_response({"message": "No selected file"}, 400)
+        try: job_id = await run_in_threadpool(jobs.submit, file.file, file.filename)
+        except JobError as e: return json_response({"message": str(e)}, 400)
+        status_url = f"/jobs/{job_id}"
+        response = json_response({"message": "Import queued", "job_id": job_id, "status_url": status_url}, 202)
+        response.headers["Location"] = status_url
+        return response
+    except Exception as e: return json_response({"error": str(e)}, 500)
+
+async def get_job(request: Request) -> Response:
+    try:
+        job = await db.get_import_job(request.path_params['job_id'])
+        if job is None: return json_response({"message": "Job not found"}, 404)
+        return json_response(get_dict_from_job(job))
+    except Exception as e: return json_response({"error": str(e)}, 500)
+
+async def edit_college_company(request: Request) -> Response:
+    try:
+        old, new = get_edit_args(await get_json(request))
+        if not await db.edit_data(old, new): raise BadRequest("Data not found...")
+        return json_response({"message": "Data successfully deleted!"}, 201)
+    except Exception as e: return json_response({"error": str(e)}, 500)
+
+async def delete_college_company(request: Request) -> Response:
+    try:
+        if not await db.delete_data(**get_delete_args(await get_json(request))): raise BadRequest("Data not found...")
+        return json_response({"message": "Data successfully deleted!"}, 201)
+    except Exception as e: return json_response({"error": str(e)}, 500)
+
+async def apply_batch(request: Request) -> Response:
+    try:
+        try: operations, invalid = get_batch_ops(await get_json(request))
+        except BadRequest as e: return json_response({"message": e.description}, 400)
+        if invalid: return json_response({"message": "Invalid operations", "applied": False, "results": [result._asdict() for result in invalid]}, 400)
+        report = await db.apply_batch(operations)
+        if not report.applied: return json_response({"message": "Batch not applied", **get_dict_from_batch_report(report)}, 409)
+        return json_response({"message": "Batch applied successfully!", **get_dict_from_batch_report(report)}, 201)
+    except Exception as e: return json_response({"error": str(e)}, 500)
+
+@cached_response
+async def get_analytics(request: Request) -> Response:
+    """Same as /analytics of api.py, 'n' sets the length of the top lists (default 5)."""
+    try:
+        n = get_analytics_n(request.query_params.get('n'))
+        return json_response(get_dict_from_analytics(n, *await db.get_analytics(n)))
+    except Exception as e:
+        logger.exception("Error in /analytics")
+        return json_response({"error": f"An internal error occurred: {str(e)}"}, 500)
+
+def load_distribution_snapshot() -> Any:
+    from distribution import load_snapshot # NumPy, imported on first use
+    try: return snapshots.get(sync_db.get_version(), lambda version: load_snapshot(sync_db, version))
+    finally: sync_db.remove()
+
+@cached_response
+async def get_distribution(request: Request) -> Response:
+    """Same as /analytics/distribution of api.py."""
+    try:
+        try: args = get_distribution_args(await get_json(request) if request.method == "POST" else request.query_params)
+        except BadRequest as e: return json_response({"message": e.description}, 400)
+        from distribution import distribution_report
+        snapshot = await run_in_threadpool(load_distribution_snapshot)
+        return json_response(get_dict_from_distribution(distribution_report(snapshot, **args)))
+    except Exception as e:
+        logger.exception("Error in /analytics/distribution")
+        return json_response({"error": f"An internal error occurred: {str(e)}"}, 500)
+
+async def get_autocomplete(request: Request) -> Response:
+    """Same as /autocomplete of api.py."""
+    try:
+        try: fields, prefix, limit = get_autocomplete_args(request.query_params)
+        except BadRequest as e: return json_response({"message": e.description}, 400)
+        return json_response(get_dict_from_suggestions(await db.suggest_fields(fields, prefix, limit)))
+    except Exception as e:
+        logger.exception("Error in /autocomplete")
+        return json_response({"error": f"An internal error occurred: {str(e)}"}, 500)
+
+async def get_cache_stats(request: Request) -> Response:
+    stats = cache.stats()
+    identity = {stats.backend: {**stats._asdict(), "hit_rate": stats.hit_rate} for stats in db.identity_cache_stats()}
+    fragment_stats = fragments.stats()
+    return json_response({**stats._asdict(), "hit_rate": stats.hit_rate, "identity": identity, "fragments": {**fragment_stats._asdict(), "hit_rate": fragment_stats.hit_rate},
+                          "autocomplete": db.autocomplete.stats()._asdict()})
+
+async def get_pool_stats(request: Request) -> Response:
+    return json_response(db.pool_stats()._asdict())
+
+@asynccontextmanager
+async def lifespan(app: Starlette) -> AsyncIterator[None]:
+    if AUTO_CREATE_SCHEMA: await db.create_all() # otherwise created once by `flask --app api init-db`
+    if IDENTITY_CACHE_WARMUP: await db.run_sync(lambda db: db.warm_identity_caches())
+    await run_in_threadpool(jobs.resume)
+    yield
+    await run_in_threadpool(jobs.shutdown)
+    await db.dispose()
+
+routes = [
+    Route('/companies', get_companies, methods=['GET']),
+    Route('/colleges', get_colleges, methods=['GET']),
+    Route('/view', get_view_data, methods=['POST']),
+    Route('/download', download, methods=['GET']),
+    Route('/search', search, methods=['POST']),
+    Route('/add', add_data, methods=['POST']),
+    Route('/upload-csv', upload_csv, methods=['POST']),
+    Route('/upload-parquet', upload_parquet, methods=['POST']),
+    Route('/jobs', submit_job, methods=['POST']),
+    Route('/jobs/{job_id}', get_job, methods=['GET']),
+    Route('/edit-college-company', edit_college_company, methods=['POST']),
+    Route('/delete-college-company', delete_college_company, methods=['POST']),
+    Route('/batch', apply_batch, methods=['POST']),
+    Route('/analytics', get_analytics, methods=['GET']),
+    Route('/analytics/distribution', get_distribution, methods=['GET', 'POST']),
+    Route('/autocomplete', get_autocomplete, methods=['GET']),
+    Route('/cache/stats', get_cache_stats, methods=['GET']),
+    Route('/pool/stats', get_pool_stats, methods=['GET']),
+]
+
+app = Starlette(debug=DEBUG, routes=routes, lifespan=lifespan,
+                middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"], expose_headers=["ETag"]), Middleware(CompressionMiddleware)])
@@ -0,0 +1,140 @@
+"""
+Async counterpart of `PostgreSQL`, used by the ASGI app (asgi.py).
+
+Queries go through an `AsyncEngine` (aiosqlite / asyncpg). Instead of keeping a second copy of every query,
+each method runs the synchronous implementation under `AsyncSession.run_sync`: SQLAlchemy drives the async
+driver from a greenlet there, so waiting on the database never blocks the event loop.
+"""
+from typing import List, Optional, Any, Dict, Callable, TypeVar, AsyncIterator, Tuple, Iterable, Sequence
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from constants import EXPORT_CHUNK_SIZE, MAX_PAGE_SIZE
+from models import (
+    PostgreSQL, College, Company, SortBy, SortByOptions, Order, OrderOptions, PlacementRow, Page, PlacementQuery,
+    AnalyticsSummary, TopListItem, TopCtcItem, IngestReport, BatchOp, BatchReport, ImportJobInfo, export_select
+)
+from search_index import SearchIndex, get_search_index
+from pool import PoolMonitor, PoolStats, engine_options, configure_engine
+from cache import CacheStats
+from identity_cache import IdentityCaches
+from autocomplete import Autocomplete, Suggestion
+
+T = TypeVar("T")
+
+# Async driver used when the URL names a dialect without one (or with a sync one)
+ASYNC_DRIVERS: Dict[str, str] = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+ASYNC_DRIVER_NAMES = ("aiosqlite", "asyncpg", "psycopg", "psycopg_async")
+
+def to_async_url(db_url: str) -> str:
+    url = make_url(db_url)
+    if url.get_driver_name() in ASYNC_DRIVER_NAMES: return db_url
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS: raise ValueError(f"No async driver known for {backend}")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+def to_sync_url(db_url: str) -> str:
+    """The URL with the dialect's default (sync) driver when it names an async one, for work done off the event loop."""
+    url = make_url(db_url)
+    if url.get_driver_name() not in ASYNC_DRIVER_NAMES: return db_url
+    return url.set(drivername=url.get_backend_name()).render_as_string(hide_password=False)
+
+class _SessionBoundPostgreSQL(PostgreSQL):
+    """`PostgreSQL` working on one given sync Session, the one `AsyncSession.run_sync` hands over."""
+    def __init__(self, parent: "AsyncPostgreSQL", session: Session):
+        self.db_url = parent.db_url
+        self.engine = parent.engine.sync_engine
+        self.search_index = parent.search_index
+        self.identities = parent.identities
+        self.columns = None # no in-memory copy in the async serving mode
+        self.autocomplete = parent.autocomplete
+        self.session = session # type: ignore[assignment]
+    def remove(self) -> None: pass # the AsyncSession owns the session
+
+class AsyncPostgreSQL:
+    def __init__(self, db_url: str):
+        self.db_url = to_async_url(db_url)
+        self.pool_monitor = PoolMonitor()
+        self.engine: AsyncEngine = create_async_engine(self.db_url, **engine_options(self.db_url, self.pool_monitor, is_async=True))
+        configure_engine(self.engine.sync_engine, self.pool_monitor, single_writer=False)
+        self.search_index: SearchIndex = get_search_index(self.engine.sync_engine)
+        self.identities = IdentityCaches()
+        self.autocomplete = Autocomplete()
+        # Results outlive their session, keep loaded attributes readable after commit
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def run_sync(self, fn: Callable[[PostgreSQL], T]) -> T:
+        """Runs `fn` against a `PostgreSQL` bound to a fresh session, which is closed afterwards (`fn` commits itself)."""
+        async with self.sessionmaker() as session:
+            return await session.run_sync(lambda sync_session: fn(_SessionBoundPostgreSQL(self, sync_session)))
+
+    async def create_all(self) -> None: await self.run_sync(lambda db: db.create_all())
+    async def dispose(self) -> None: await self.engine.dispose()
+    def pool_stats(self) -> PoolStats: return self.pool_monitor.stats()
+    def identity_cache_stats(self) -> List[CacheStats]: return self.identities.stats()
+    async def get_version(self) -> int: return await self.run_sync(lambda db: db.get_version())
+
+    # --- Reads ---
+
+    async def fetch_all_companies(self) -> List[Company]: return await self.run_sync(lambda db: db.fetch_all_companies())
+    async def fetch_all_colleges(self) -> List[College]: return await self.run_sync(lambda db: db.fetch_all_colleges())
+    async def fetch_all_rows(self, sort_by: Optional[SortBy] = None, order: Order = OrderOptions["asc"]) -> List[PlacementRow]:
+        return await self.run_sync(lambda db: db.fetch_all_rows(sort_by=sort_by, order=order))
+    async def fetch_page(self, sort_by: SortBy = SortByOptions["college_name"], order: Order = OrderOptions["asc"],
+                         limit: int = MAX_PAGE_SIZE, cursor: Optional[str] = None, with_total: bool = False) -> Page:
+        return await self.run_sync(lambda db: db.fetch_page(sort_by=sort_by, order=order, limit=limit, cursor=cursor, with_total=with_total, projection=True))
+    async def search_rows(self, college_name: Optional[str] = None, company_name: Optional[str] = None, role: Optional[str] = None) -> List[PlacementRow]:
+        return await self.run_sync(lambda db: db.search_rows(college_name=college_name, company_name=company_name, role=role))
+    async def search_page(self, college_name: Optional[str] = None, company_name: Optional[str] = None, role: Optional[str] = None,
+                          sort_by: SortBy = SortByOptions["college_name"], order: Order = OrderOptions["asc"],
+                          limit: int = MAX_PAGE_SIZE, cursor: Optional[str] = None, with_total: bool = False) -> Page:
+        return await self.run_sync(lambda db: db.search_page(college_name=college_name, company_name=company_name, role=role, sort_by=sort_by,
+                                                             order=order, limit=limit, cursor=cursor, with_total=with_total, projection=True))
+    async def query_rows(self, query: PlacementQuery) -> Page: return await self.run_sync(lambda db: db.query_rows(query))
+
+    async def iter_export_rows(self, chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[Tuple[Any, ...]]:
+        """Async `PostgreSQL.iter_export_rows`: a server-side cursor read `chunk_size` rows at a time."""
+        async with self.sessionmaker() as session:
+            result = await session.stream(export_select().execution_options(yield_per=chunk_size))
+            async for row in result: yield tuple(row)
+
+    async def get_import_job(self, job_id: str) -> Optional[ImportJobInfo]: return await self.run_sync(lambda db: db.get_import_job(job_id))
+
+    async def get_analytics(self, n: int) -> Tuple[AnalyticsSummary, List[TopListItem], List[TopListItem], List[TopCtcItem]]:
+        """Everything /analytics shows, in one session."""
+        return await self.run_sync(lambda db: (db.get_analytics_summary(), db.get_top_companies_by_visits(n),
+                                               db.get_top_colleges_by_visits(n), db.get_top_placements_by_ctc(n)))
+
+    async def suggest_fields(self, fields: Sequence[str], prefix: str, limit: int) -> Dict[str, List[Suggestion]]:
+        """`PostgreSQL.suggest` for each of `fields`, in one session."""
+        return await self.run_sync(lambda db: {field: db.suggest(field, prefix, limit) for field in fields})
+
+    # --- Writes ---
+
+    async def add_data(self, **kwargs: Any) -> None:
+        def add(db: PostgreSQL) -> None:
+            db.add_data(**kwargs)
+            db.commit()
+        await self.run_sync(add)
+
+    async def bulk_add_data(self, records: List[Dict[str, Any]]) -> IngestReport: return await self.run_sync(lambda db: db.bulk_add_data(records))
+    async def bulk_add_batches(self, batches: Iterable[List[Dict[str, Any]]]) -> IngestReport: return await self.run_sync(lambda db: db.bulk_add_batches(batches))
+    async def apply_batch(self, operations: List[BatchOp]) -> BatchReport: return await self.run_sync(lambda db: db.apply_batch(operations))
+
+    async def delete_data(self, college_name: str, company_name: str, role: str, ctc: float) -> bool:
+        def delete(db: PostgreSQL) -> bool:
+            if not db.delete_data(college_name=college_name, company_name=company_name, role=role, ctc=ctc): return False
+            db.commit()
+            return True
+        return await self.run_sync(delete)
+
+    async def edit_data(self, old: Dict[str, Any], new: Dict[str, Any]) -> bool:
+        """Deletes the `old` placement and adds `new` (`add_data` arguments) in the same session."""
+        def edit(db: PostgreSQL) -> bool:
+            if not db.delete_data(**old): return False
+            db.add_data(**new)
+            db.commit()
+            return True
+        return await self.run_sync(edit)
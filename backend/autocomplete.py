@@ -0,0 +1,173 @@
+"""
+Typeahead suggestions (`/autocomplete`) for college names, company names and roles, from an in-memory prefix index.
+
+Each field has a `_Names` index: how many placements use each name (the visit rollups, summed per company name and
+per role) and one sorted list of (key, name) pairs, a key being the case-folded name from one of its word starts on
+("IIT Delhi" is found by "iit d" and by "del"). A prefix is a binary search for its range of keys, the most placed
+names of the range come first. Ranges past `SCAN_KEYS` keys (short and common prefixes) are not ranked per request:
+their top names are cached and kept exact through the count changes instead.
+
+The index is read once (`PostgreSQL.fetch_name_counts`), then kept current by the placements the write paths add
+and remove, applied in place when their transaction commits (`cache.IncrementalValue`), under the lock readers take.
+Requests don't read the dataset version: only the writes of other processes can leave the index behind, and those
+are looked for at most every `AUTOCOMPLETE_CHECK_SECONDS`. An index found behind is reloaded; until then, and while a
+delta is on its way, requests get the last index. Unlike columnar.py this needs no NumPy: everything is lists and dicts.
+"""
+import bisect, heapq, math, re, time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from cache import IncrementalValue
+from constants import AUTOCOMPLETE_MAX_LIMIT, AUTOCOMPLETE_CHECK_SECONDS
+
+AUTOCOMPLETE_FIELDS = ("college_name", "company_name", "role")
+SCAN_KEYS = 64 # prefixes matching more keys than this have their top names cached
+CACHED_NAMES = 2 * AUTOCOMPLETE_MAX_LIMIT # top names kept per cached prefix, the slack absorbs names falling out
+_AFTER = "\U0010ffff" # sorts after every character a prefix can continue with
+_WORD = re.compile(r"\w+")
+
+class Suggestion(NamedTuple):
+    name: str
+    count: int # placements using the name
+
+class AutocompleteStats(NamedTuple):
+    version: Optional[int]
+    names: Dict[str, int] # field -> distinct names
+    loads: int
+    deltas: int
+
+def normalize(text: str) -> str: return text.strip().casefold()
+
+def _keys(name: str) -> List[str]:
+    """The folded name from each of its word starts on, the whole of it included."""
+    folded = normalize(name)
+    return list(dict.fromkeys([folded] + [folded[match.start():] for match in _WORD.finditer(folded)]))
+
+class _Names:
+    """The names of one field, changed in place under the lock of their `Autocomplete`."""
+    def __init__(self, counts: Dict[str, int]):
+        self.counts = {name: count for name, count in counts.items() if count > 0}
+        self.keys: List[Tuple[str, str]] = sorted((key, name) for name in self.counts for key in _keys(name))
+        self.top: Dict[str, Tuple[List[str], bool]] = {} # prefix -> (its first names in rank order, whether that is all of them)
+
+    def _rank(self, name: str) -> Tuple[int, str]: return (-self.counts[name], name)
+
+    def suggest(self, prefix: str, limit: int) -> List[Suggestion]:
+        """The `limit` most placed names with a key starting with `prefix` (normalized)."""
+        cached = self.top.get(prefix)
+        if cached is not None and (len(cached[0]) >= limit or cached[1]): names = cached[0][:limit]
+        else:
+            start = bisect.bisect_left(self.keys, (prefix,))
+            stop = bisect.bisect_left(self.keys, (prefix + _AFTER,), lo=start)
+            matching = list(dict.fromkeys(name for _, name in self.keys[start:stop])) # a name can match at several word starts
+            if stop - start <= SCAN_KEYS and cached is None: names = heapq.nsmallest(limit, matching, key=self._rank)
+            else:
+                keep = max(CACHED_NAMES, limit)
+                self.top[prefix] = (heapq.nsmallest(keep, matching, key=self._rank), len(matching) <= keep)
+                names = self.top[prefix][0][:limit]
+        return [Suggestion(name=name, count=self.counts[name]) for name in names]
+
+    def change(self, name: str, delta: int) -> None:
+        """Adds `delta` placements to `name`, a name without any left is dropped."""
+        old = self.counts.get(name, 0)
+        if not old and delta <= 0: return
+        keys = _keys(name)
+        if old + delta > 0:
+            self.counts[name] = old + delta
+            if not old:
+                for key in keys: bisect.insort(self.keys, (key, name))
+        else:
+            del self.counts[name]
+            for key in keys: del self.keys[bisect.bisect_left(self.keys, (key, name))]
+        if self.top:
+            for prefix in {key[:length] for key in keys for length in range(len(key) + 1)}:
+                if prefix in self.top: self._rerank(prefix, name)
+
+    def _rerank(self, prefix: str, name: str) -> None:
+        # The cached names are the first of their prefix: they stay so with `name` taken out, and with it put back when
+        # it ranks before the last of them (past the last, it is among the names not cached)
+        names, complete = self.top[prefix]
+        if name in names: names.remove(name)
+        if name in self.counts and (complete or (names and self._rank(name) < self._rank(names[-1]))):
+            bisect.insort(names, name, key=self._rank)
+            if len(names) > CACHED_NAMES:
+                del names[CACHED_NAMES:]
+                self.top[prefix] = (names, False)
+        elif not names and not complete: del self.top[prefix]
+
+class _Index:
+    def __init__(self, version: int, colleges: Dict[int, List[Any]], companies: Dict[int, List[Any]]):
+        self.version = version
+        self.colleges = colleges # college_id -> [college_name, placements]
+        self.companies = companies # company_id -> [company_name, role, placements]
+        counts: Dict[str, Counter] = {field: Counter() for field in AUTOCOMPLETE_FIELDS}
+        for college_name, placements in colleges.values(): counts["college_name"][college_name] += placements
+        for company_name, role, placements in companies.values():
+            counts["company_name"][company_name] += placements
+            counts["role"][role] += placements
+        self.fields = {field: _Names(counts[field]) for field in AUTOCOMPLETE_FIELDS}
+
+    def apply(self, version: int, changes: Sequence[Tuple[bool, Any]]) -> Optional["_Index"]:
+        """Counts the placements added and removed in place, None when the index has to be reloaded instead."""
+        # Past the size of the index, reading it again is cheaper than inserting names one by one
+        if len(changes) > max(len(self.colleges) + len(self.companies), 1000): return None
+        for added, placement in changes:
+            college_id, company_id = (placement.college_id, placement.company_id) if added else placement
+            if added:
+                college = self.colleges.setdefault(college_id, [placement.college_name, 0])
+                company = self.companies.setdefault(company_id, [placement.company_name, placement.role, 0])
+            else:
+                college, company = self.colleges.get(college_id), self.companies.get(company_id)
+                if college is None or company is None: return None # a placement the index never counted
+            delta = 1 if added else -1
+            college[-1] += delta
+            company[-1] += delta
+            self.fields["college_name"].change(college[0], delta)
+            self.fields["company_name"].change(company[0], delta)
+            self.fields["role"].change(company[1], delta)
+            if not college[-1]: del self.colleges[college_id]
+            if not company[-1]: del self.companies[company_id]
+        self.version = version
+        return self
+
+class Autocomplete(IncrementalValue):
+    """The prefix index of one `PostgreSQL` (its `autocomplete`), see the module docstring."""
+    def __init__(self, check_seconds: float = AUTOCOMPLETE_CHECK_SECONDS):
+        super().__init__()
+        self.check_seconds = check_seconds
+        self._checked = -math.inf # when the index was last compared with the database's version (monotonic clock)
+
+    def _changes(self) -> List[Tuple[bool, Any]]: return [] # (True, PlacementRow) or (False, (college_id, company_id)), in order
+    def _build(self, db: Any, version: int) -> _Index:
+        names = db.fetch_name_counts()
+        return _Index(version, {college_id: [college_name, placements] for college_id, college_name, placements in names.colleges},
+                      {company_id: [company_name, role, placements] for company_id, company_name, role, placements in names.companies})
+    def _apply(self, index: _Index, version: int, changes: List[Tuple[bool, Any]]) -> Optional[_Index]: return index.apply(version, changes)
+
+    def record(self, session: Session, added: Iterable[Any] = (), removed: Iterable[Tuple[int, int]] = ()) -> None:
+        """Placements written by this transaction: `added` as `PlacementRow`s, `removed` as (college_id, company_id)."""
+        changes: List[Tuple[bool, Any]] = self._pending(session).changes
+        changes.extend((False, tuple(key)) for key in removed)
+        changes.extend((True, row) for row in added)
+
+    def suggest(self, db: Any, field: str, prefix: str, limit: int) -> List[Suggestion]:
+        """Names of `field` for `prefix`, reading the database only to load the index or for a due version check."""
+        now = time.monotonic()
+        if self._value is not None and now - self._checked >= self.check_seconds:
+            self._checked = now
+            self.current(db) # reloads an index another process's writes left behind
+        while True:
+            with self._lock:
+                if self._value is not None: return self._value.fields[field].suggest(normalize(prefix), limit)
+            with self._building:
+                if self._value is None:
+                    self._checked = time.monotonic()
+                    self.load(db)
+
+    def stats(self) -> AutocompleteStats:
+        index = self._value
+        return AutocompleteStats(version=index.version if index is not None else None,
+                                 names={field: len(index.fields[field].counts) if index is not None else 0 for field in AUTOCOMPLETE_FIELDS},
+                                 loads=self.builds, deltas=self.deltas)
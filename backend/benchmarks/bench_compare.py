@@ -0,0 +1,69 @@
+"""
+Compares two bench_suite.py result files and flags regressions.
+
+usage (from backend/):
+    python benchmarks/bench_compare.py baseline.json current.json [--threshold 0.15] [--min-delta-ms 1]
+
+A case regresses when its median got slower by more than `threshold` (relative) and `min-delta-ms`
+(absolute, so sub-millisecond noise doesn't count). Exits with status 1 if anything regressed.
+"""
+import argparse, json, sys
+from typing import Any, Dict, List, NamedTuple, Optional
+
+class Comparison(NamedTuple):
+    database: str
+    case: str
+    baseline_ms: Optional[float]
+    current_ms: Optional[float]
+    ratio: Optional[float] # current / baseline
+    status: str # regression | improvement | ok | new | missing | error
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.15, min_delta_ms: float = 1.0) -> List[Comparison]:
+    comparisons = []
+    for database, results in current["databases"].items():
+        old_cases = baseline["databases"].get(database, {}).get("cases", {})
+        new_cases = results["cases"]
+        for case in sorted(set(old_cases) | set(new_cases)):
+            old, new = old_cases.get(case), new_cases.get(case)
+            if new is None: comparisons.append(Comparison(database, case, old.get("median_ms"), None, None, "missing")); continue
+            if old is None: comparisons.append(Comparison(database, case, None, new.get("median_ms"), None, "new")); continue
+            if "error" in old or "error" in new:
+                comparisons.append(Comparison(database, case, old.get("median_ms"), new.get("median_ms"), None, "error")); continue
+            old_ms, new_ms = old["median_ms"], new["median_ms"]
+            ratio = new_ms / old_ms if old_ms > 0 else None
+            status = "ok"
+            if abs(new_ms - old_ms) >= min_delta_ms:
+                if new_ms > old_ms * (1 + threshold): status = "regression"
+                elif new_ms < old_ms / (1 + threshold): status = "improvement"
+            comparisons.append(Comparison(database, case, old_ms, new_ms, ratio, status))
+    return comparisons
+
+def print_comparison(comparisons: List[Comparison]) -> None:
+    fmt = lambda ms: f"{ms:10.2f}" if ms is not None else f"{'-':>10}"
+    for database in dict.fromkeys(c.database for c in comparisons):
+        print(f"\n{database}")
+        for c in comparisons:
+            if c.database != database: continue
+            ratio = f"{c.ratio:6.2f}x" if c.ratio is not None else f"{'':7}"
+            flag = "" if c.status == "ok" else c.status.upper()
+            print(f"  {c.case:<45} {fmt(c.baseline_ms)} -> {fmt(c.current_ms)} ms {ratio}  {flag}")
+    regressions = [c for c in comparisons if c.status == "regression"]
+    print(f"\n{len(regressions)} regression(s)" + (": " + ", ".join(f"{c.database} {c.case}" for c in regressions) if regressions else ""))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument("--min-delta-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with open(args.baseline) as f: baseline = json.load(f)
+    with open(args.current) as f: current = json.load(f)
+    if baseline["meta"]["spec"] != current["meta"]["spec"]: print("warning: the runs used different datasets, timings aren't comparable")
+    comparisons = compare(baseline, current, threshold=args.threshold, min_delta_ms=args.min_delta_ms)
+    print_comparison(comparisons)
+    sys.exit(1 if any(c.status == "regression" for c in comparisons) else 0)
+
+if __name__ == '__main__':
+    main()
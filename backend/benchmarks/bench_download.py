@@ -0,0 +1,60 @@
+"""
+Compares the streaming and buffered /download modes, and the Parquet / Arrow IPC formats (with pyarrow installed):
+time-to-first-byte, total time, peak Python memory and size. Also times reading each file back.
+
+usage (from backend/):
+    python benchmarks/bench_download.py [--rows N]
+"""
+import argparse, io, os, sys, tempfile, time, tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_ingest import make_records
+
+def measure(client, url: str):
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get(url, buffered=False)
+    chunks = iter(response.response)
+    first = next(chunks)
+    ttfb = time.perf_counter() - start
+    size = len(first) + sum(len(chunk) for chunk in chunks)
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    response.close()
+    return ttfb, total, peak, size
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import api
+        from models import PostgreSQL
+        api.db = PostgreSQL(f"sqlite:///{os.path.join(tmp, 'download.db')}", create_schema=True)
+        api.db.bulk_add_data(make_records(args.rows))
+        api.db.remove()
+        client = api.app.test_client()
+        for label, url in (("streaming", "/download"), ("buffered", "/download?stream=false"), ("parquet", "/download?format=parquet"), ("arrow", "/download?format=arrow")):
+            if client.get(url, buffered=False).status_code != 200:
+                print(f"{label:>9}: skipped (needs pyarrow)")
+                continue
+            ttfb, total, peak, size = measure(client, url)
+            print(f"{label:>9}: ttfb {ttfb * 1000:8.1f} ms | total {total:6.2f}s | peak memory {peak / 2**20:7.1f} MiB | {size / 2**20:.1f} MiB sent")
+        readers = {"csv": ("/download", lambda data: __import__("pandas").read_csv(io.BytesIO(data)))}
+        try:
+            import pyarrow.ipc, pyarrow.parquet
+            readers["parquet"] = ("/download?format=parquet", lambda data: pyarrow.parquet.read_table(pyarrow.BufferReader(data)))
+            readers["arrow"] = ("/download?format=arrow", lambda data: pyarrow.ipc.open_file(pyarrow.BufferReader(data)).read_all())
+        except ImportError: pass
+        for label, (url, read) in readers.items():
+            data = client.get(url).get_data()
+            start = time.perf_counter()
+            read(data)
+            print(f"{label:>9}: parsed back in {(time.perf_counter() - start) * 1000:8.1f} ms")
+        api.db.remove()
+
+if __name__ == '__main__':
+    main()
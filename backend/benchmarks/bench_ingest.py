@@ -0,0 +1,59 @@
+"""
+Measures bulk ingestion throughput (rows/second) of `PostgreSQL.bulk_add_data`.
+
+usage (from backend/):
+    python benchmarks/bench_ingest.py                   # synthetic 50k-row file
+    python benchmarks/bench_ingest.py --csv data.csv    # your own export
+    python benchmarks/bench_ingest.py --legacy          # also time the old per-row add_data loop
+"""
+import argparse, csv, os, random, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import PostgreSQL, INGEST_COLUMNS
+
+def make_records(rows: int, seed: int = 0):
+    rng = random.Random(seed)
+    colleges = [f"College {i}" for i in range(max(1, rows // 25))]
+    companies = [(f"Company {i}", rng.choice(["SDE", "Analyst", "Intern", "Data Scientist", "PM"]), float(rng.randrange(3, 60) * 100000))
+                 for i in range(max(1, rows // 5))]
+    for i in range(rows):
+        company_name, role, ctc = rng.choice(companies)
+        has_person = rng.random() < 0.5
+        yield {
+            "college_name": rng.choice(colleges), "company_name": company_name, "role": role, "ctc": ctc,
+            "hr_name": f"HR {i}" if has_person else None, "linkedin_id": None,
+            "email": f"hr{i}@example.com" if has_person else None, "contact_number": None,
+        }
+
+def read_records(path: str):
+    with open(path, newline='') as f:
+        for record in csv.DictReader(f):
+            yield {col: (record.get(col) or None) for col in INGEST_COLUMNS}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--csv", default=None)
+    parser.add_argument("--legacy", action="store_true")
+    args = parser.parse_args()
+
+    records = list(read_records(args.csv) if args.csv else make_records(args.rows))
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PostgreSQL(f"sqlite:///{os.path.join(tmp, 'bulk.db')}", create_schema=True)
+        report = db.bulk_add_data(records)
+        print(f"bulk_add_data: {len(records)} rows in {report.elapsed_seconds:.2f}s -> {report.rows_per_second:,.0f} rows/s "
+              f"(accepted={report.accepted}, duplicates={report.duplicates}, rejected={report.rejected})")
+        db.remove()
+
+        if args.legacy:
+            db = PostgreSQL(f"sqlite:///{os.path.join(tmp, 'legacy.db')}", create_schema=True)
+            start = time.perf_counter()
+            for record in records: db.add_data(**{col: record[col] for col in INGEST_COLUMNS})
+            db.commit()
+            elapsed = time.perf_counter() - start
+            print(f"add_data loop: {len(records)} rows in {elapsed:.2f}s -> {len(records) / elapsed:,.0f} rows/s")
+            db.remove()
+
+if __name__ == '__main__':
+    main()
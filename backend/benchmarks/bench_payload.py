@@ -0,0 +1,64 @@
+"""
+Payload size and time of a full /view listing: row objects vs the columnar format, each uncompressed,
+gzip and (with the brotli package) brotli, through the Flask test client. Also times the JSON encoding alone,
+per backend (`JSON_BACKEND`) and through the warm row fragment cache.
+
+usage (from backend/):
+    python benchmarks/bench_payload.py [--preset small] [--repeat R]
+"""
+import argparse, os, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PRESET_NAMES = ("tiny", "small", "medium", "large") # datagen.PRESETS, which can't be imported before the environment is set
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--preset", choices=PRESET_NAMES, default="small")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'payload.db')}"
+        os.environ["CACHE_BACKEND"] = "none" # time the encoding, not the read cache
+        os.environ["AUTO_CREATE_SCHEMA"] = "true"
+        from datagen import PRESETS, load
+        import api
+        from compression import ENCODINGS
+        load(api.db, PRESETS[args.preset])
+        api.db.remove()
+        client = api.app.test_client()
+
+        print(f"{'format':>9} {'encoding':>9} {'bytes':>12} {'ratio':>7} {'ms':>9}")
+        baseline = None
+        for response_format in ("rows", "columnar"):
+            for encoding in ("identity", *ENCODINGS):
+                best, size = float("inf"), 0
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    response = client.post("/view", json={"format": response_format}, headers={"Accept-Encoding": encoding})
+                    size = len(response.get_data())
+                    best = min(best, time.perf_counter() - start)
+                baseline = baseline or size
+                print(f"{response_format:>9} {encoding:>9} {size:>12,} {baseline / size:>6.1f}x {best * 1000:>9.1f}")
+
+        from serializers import get_columnar_from_rows, get_dict_from_row, RowFragmentCache
+        from json_encoding import StdlibJSON, OrjsonJSON, orjson
+        rows = api.db.fetch_all_rows()
+        api.db.remove()
+        for backend in [StdlibJSON()] + ([OrjsonJSON()] if orjson is not None else []):
+            fragments = RowFragmentCache(backend)
+            for response_format, encode in (
+                ("rows", lambda: backend.dumps([get_dict_from_row(idx, row) for idx, row in enumerate(rows)])),
+                ("columnar", lambda: backend.dumps(get_columnar_from_rows(rows))),
+                ("fragments", lambda: fragments.encode_rows(rows)), # warm after the first repeat
+            ):
+                best = float("inf")
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    encode()
+                    best = min(best, time.perf_counter() - start)
+                print(f"encode {backend.name:>6} {response_format:>9}: {best * 1000:8.1f} ms for {len(rows)} rows")
+
+if __name__ == '__main__':
+    main()
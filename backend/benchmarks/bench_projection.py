@@ -0,0 +1,55 @@
+"""
+ORM entity hydration vs the projection read path for a full listing (fetch + serialize to dicts).
+
+usage (from backend/):
+    python benchmarks/bench_projection.py [--rows N] [--repeat R]
+"""
+import argparse, os, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_ingest import make_records
+from models import PostgreSQL, SortByOptions
+
+def orm_listing(db: PostgreSQL):
+    items = db.fetch_all_data_sorted(sort_by=SortByOptions["college_name"])
+    return [{
+        "id": idx, "college_name": item.college.college_name, "company_name": item.company.company_name,
+        "role": item.company.role, "ctc": item.company.ctc,
+        "hr_name": item.person.name if item.person is not None else None,
+        "linkedin_id": item.person.linkedin_id if item.person is not None else None,
+        "email": item.person.email if item.person is not None else None,
+        "contact_number": item.person.contact_number if item.person is not None else None,
+    } for idx, item in enumerate(items)]
+
+def projection_listing(db: PostgreSQL):
+    rows = db.fetch_all_rows(sort_by=SortByOptions["college_name"])
+    return [{
+        "id": idx, "college_name": row.college_name, "company_name": row.company_name, "role": row.role, "ctc": row.ctc,
+        "hr_name": row.hr_name, "linkedin_id": row.linkedin_id, "email": row.email, "contact_number": row.contact_number,
+    } for idx, row in enumerate(rows)]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PostgreSQL(f"sqlite:///{os.path.join(tmp, 'projection.db')}", create_schema=True)
+        db.bulk_add_data(make_records(args.rows))
+        db.remove()
+        results = {}
+        for label, listing in (("orm", orm_listing), ("projection", projection_listing)):
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                data = listing(db)
+                best = min(best, time.perf_counter() - start)
+                db.remove()
+            results[label] = data
+            print(f"{label:>10}: {len(data)} rows in {best * 1000:8.1f} ms (best of {args.repeat})")
+        assert results["orm"] == results["projection"]
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,340 @@
+"""
+Times every public `PostgreSQL` method and every Flask route (through the test client) on a generated dataset,
+once per database, and saves the timings as JSON so runs can be compared (bench_compare.py).
+
+usage (from backend/):
+    python benchmarks/bench_suite.py --preset small                     # SQLite temp file
+    python benchmarks/bench_suite.py --preset medium --db-url sqlite:///bench.db --db-url postgresql://localhost/bench
+    python benchmarks/bench_suite.py --preset small --compare benchmarks/results/baseline.json
+    python benchmarks/bench_suite.py --only 'route:|fetch_'               # regex on case names
+
+Database URLs must point at scratch databases: they are wiped (`delete_all`, needs DEBUG=1) and loaded with the
+dataset (`--no-load` reuses what a previous run with the same preset loaded). Write cases undo their changes between runs.
+Responses aren't cached during route timings unless `--cache` is given. `startup:` cases time a fresh interpreter
+importing api.py and serving its first request against the loaded database (cold start of a worker).
+"""
+import argparse, csv, io, json, os, platform, re, statistics, subprocess, sys, tempfile, time, uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://") # api.py builds its own db at import, keep that one in memory
+
+import sqlalchemy
+from sqlalchemy.engine import make_url
+
+from datagen import PRESETS, DatasetSpec, load, record
+from bench_compare import compare, print_comparison
+from models import PostgreSQL, College, Company, ImportJob, SortByOptions, OrderOptions, PlacementQuery, BatchOp, BatchOpOptions, IngestRow, INGEST_COLUMNS
+from cache import NullCache
+from jobs import ImportJobRunner
+import api
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+KEY_COLUMNS = ("college_name", "company_name", "role", "ctc")
+WRITE_BATCH = 250 # records per bulk write case (their teardown deletes them one by one)
+# Public methods that aren't timed, and why
+SKIPPED_METHODS = {"remove": "session bookkeeping", "delete_all": "destructive, would wipe the dataset"}
+
+class Case(NamedTuple):
+    name: str
+    run: Callable[[], Any] # timed
+    setup: Optional[Callable[[], Any]] = None # untimed, before each run
+    teardown: Optional[Callable[[], Any]] = None # untimed, after each run
+
+def extra_record(idx: Any) -> Dict[str, Any]:
+    """A placement outside the generated dataset, for write cases."""
+    return {"college_name": f"Bench College {idx}", "company_name": f"Bench Company {idx}", "role": "SDE", "ctc": 1_000_000.0,
+            "hr_name": f"Bench HR {idx}", "linkedin_id": None, "email": f"bench{idx}@example.com", "contact_number": None}
+
+def key(rec: Dict[str, Any]) -> Dict[str, Any]: return {col: rec[col] for col in KEY_COLUMNS}
+
+def add(db: PostgreSQL, rec: Dict[str, Any]) -> None:
+    db.add_data(**rec)
+    db.commit()
+    db.remove()
+
+def delete(db: PostgreSQL, *recs: Dict[str, Any]) -> None:
+    for rec in recs: db.delete_data(**key(rec))
+    db.commit()
+    db.remove()
+
+def create_job(db: PostgreSQL, job: Dict[str, str], claim: bool = False) -> None:
+    """An import job row for the job cases, under a new id kept in `job`."""
+    job["id"] = uuid.uuid4().hex
+    db.create_import_job(job["id"], "bench.csv", "csv", os.devnull, WRITE_BATCH)
+    if claim: db.claim_import_job(job["id"], "bench", time.time())
+    db.remove()
+
+def drop_job(db: PostgreSQL, job: Dict[str, str]) -> None:
+    db.session.query(ImportJob).filter(ImportJob.id == job["id"]).delete()
+    db.commit()
+    db.remove()
+
+def method_cases(db: PostgreSQL, spec: DatasetSpec) -> List[Case]:
+    sample = record(spec, spec.links // 2)
+    one = extra_record("one")
+    batch = [extra_record(idx) for idx in range(WRITE_BATCH)]
+    job: Dict[str, str] = {}
+    ids: Dict[str, int] = {}
+    def add_relation():
+        add(db, one)
+        ids.update(college_id=College.get(db.session, one["college_name"]).id, company_id=Company.get(db.session, one["company_name"], one["role"], one["ctc"]).id)
+        db.remove()
+    def remove_relation():
+        db.remove_relation(College.get(db.session, one["college_name"]), Company.get(db.session, one["company_name"], one["role"], one["ctc"]))
+        db.commit()
+    return [
+        Case("create_all", db.create_all),
+        Case("migrate", db.migrate),
+        Case("commit", db.commit),
+        Case("bump_version", lambda: (db.bump_version(), db.commit())),
+        Case("get_version", db.get_version),
+        Case("pool_stats", db.pool_stats),
+        Case("replica_stats", db.replica_stats),
+        Case("identity_cache_stats", db.identity_cache_stats),
+        Case("warm_identity_caches", db.warm_identity_caches),
+        Case("get_or_create_college_id", lambda: db.get_or_create_college_id(sample["college_name"])), # existing, nothing to commit
+        Case("get_or_create_company_id", lambda: db.get_or_create_company_id(sample["company_name"], sample["role"], sample["ctc"])),
+        Case("add_data", lambda: (db.add_data(**one), db.commit()), teardown=lambda: delete(db, one)),
+        Case("remove_relation", remove_relation, setup=lambda: add(db, one)),
+        Case("delete_data", lambda: (db.delete_data(**key(one)), db.commit()), setup=lambda: add(db, one)),
+        Case("delete_relation", lambda: (db.delete_relation(**ids), db.commit()), setup=add_relation),
+        Case("delete_orphans", lambda: (db.delete_orphans(), db.commit())), # every table scanned, nothing to delete
+        Case("validate_ingest_records", lambda: PostgreSQL.validate_ingest_records(batch)),
+        Case("bulk_add_data", lambda: db.bulk_add_data(batch), teardown=lambda: delete(db, *batch)),
+        Case("bulk_add_batches", lambda: db.bulk_add_batches(batch[i:i + 100] for i in range(0, len(batch), 100)), teardown=lambda: delete(db, *batch)),
+        Case("apply_batch", lambda: db.apply_batch([BatchOp(op=BatchOpOptions["add"], new=IngestRow(**rec)) for rec in batch]),
+             teardown=lambda: delete(db, *batch)),
+        Case("create_import_job", lambda: db.create_import_job(job["id"], "bench.csv", "csv", os.devnull, WRITE_BATCH),
+             setup=lambda: job.update(id=uuid.uuid4().hex), teardown=lambda: drop_job(db, job)),
+        Case("get_import_job", lambda: db.get_import_job(job["id"]), setup=lambda: create_job(db, job), teardown=lambda: drop_job(db, job)),
+        Case("resumable_import_jobs", lambda: db.resumable_import_jobs(time.time()), setup=lambda: create_job(db, job), teardown=lambda: drop_job(db, job)),
+        Case("claim_import_job", lambda: db.claim_import_job(job["id"], "bench", time.time()), setup=lambda: create_job(db, job), teardown=lambda: drop_job(db, job)),
+        Case("import_job_chunk", lambda: db.import_job_chunk(job["id"], "bench", batch, 0), setup=lambda: create_job(db, job, claim=True),
+             teardown=lambda: (drop_job(db, job), delete(db, *batch))),
+        Case("finish_import_job", lambda: db.finish_import_job(job["id"], "bench"), setup=lambda: create_job(db, job, claim=True), teardown=lambda: drop_job(db, job)),
+        Case("release_import_job", lambda: db.release_import_job(job["id"], "bench"), setup=lambda: create_job(db, job, claim=True), teardown=lambda: drop_job(db, job)),
+        Case("fetch_all_companies", db.fetch_all_companies),
+        Case("fetch_all_colleges", db.fetch_all_colleges),
+        Case("fetch_all_data", db.fetch_all_data),
+        Case("iter_export_rows", lambda: sum(1 for _ in db.iter_export_rows())),
+        Case("fetch_all_data_sorted", lambda: db.fetch_all_data_sorted(sort_by=SortByOptions["ctc"], order=OrderOptions["desc"])),
+        Case("fetch_all_rows", lambda: db.fetch_all_rows(sort_by=SortByOptions["ctc"], order=OrderOptions["desc"])),
+        Case("fetch_page", lambda: db.fetch_page(sort_by=SortByOptions["ctc"], limit=100, with_total=True)),
+        Case("search_page", lambda: db.search_page(college_name=sample["college_name"], limit=100, with_total=True)),
+        Case("search_by_college", lambda: db.search_by_college(sample["college_name"])),
+        Case("search_by_company", lambda: db.search_by_company(sample["company_name"])),
+        Case("search_by_role", lambda: db.search_by_role(sample["role"])),
+        Case("search_with_filters", lambda: db.search_with_filters(company_name=sample["company_name"], role=sample["role"])),
+        Case("search_rows", lambda: db.search_rows(college_name=sample["college_name"].split()[0])), # a city, broad match
+        Case("query_rows", lambda: db.query_rows(PlacementQuery(college_name=sample["college_name"], ctc_min=sample["ctc"] / 2,
+                                                                sort_by=SortByOptions["ctc"], limit=100, with_total=True))),
+        Case("rebuild_rollups", db.rebuild_rollups),
+        Case("check_rollups", db.check_rollups),
+        Case("fetch_name_counts", db.fetch_name_counts),
+        Case("fetch_placement_columns", db.fetch_placement_columns),
+        Case("suggest", lambda: db.suggest("college_name", sample["college_name"][:3])),
+        Case("get_analytics_summary", db.get_analytics_summary),
+        Case("get_top_companies_by_visits", lambda: db.get_top_companies_by_visits(10)),
+        Case("get_top_colleges_by_visits", lambda: db.get_top_colleges_by_visits(10)),
+        Case("get_top_placements_by_ctc", lambda: db.get_top_placements_by_ctc(10)),
+    ]
+
+def route_cases(db: PostgreSQL, spec: DatasetSpec) -> List[Case]:
+    client = api.app.test_client()
+    sample = record(spec, spec.links // 2)
+    one = extra_record("one")
+    batch = [extra_record(idx) for idx in range(WRITE_BATCH)]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=INGEST_COLUMNS)
+    writer.writeheader(); writer.writerows(batch)
+    upload = buffer.getvalue().encode()
+    try:
+        import pyarrow, pyarrow.parquet
+        parquet_buffer = io.BytesIO()
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(batch), parquet_buffer)
+        parquet_upload: Optional[bytes] = parquet_buffer.getvalue()
+    except ImportError: parquet_upload = None # the Parquet cases report an error
+    def call(method: str, url: str, **kwargs) -> int:
+        response = client.open(url, method=method, **kwargs)
+        if response.status_code >= 400: raise RuntimeError(f"{method} {url}: {response.status_code} {response.get_data(as_text=True)[:200]}")
+        return len(response.get_data())
+    edited = {**one, "ctc": 2_000_000.0}
+    job: Dict[str, str] = {}
+    def submit_job() -> int:
+        response = client.post("/jobs", data={"file": (io.BytesIO(upload), "bench.csv")})
+        if response.status_code != 202: raise RuntimeError(f"POST /jobs: {response.status_code} {response.get_data(as_text=True)[:200]}")
+        job["id"] = response.get_json()["job_id"]
+        return len(response.get_data())
+    def import_done() -> None:
+        api.jobs.wait(job["id"])
+        drop_job(db, job)
+        delete(db, *batch)
+    return [
+        Case("GET /companies", lambda: call("GET", "/companies")),
+        Case("GET /colleges", lambda: call("GET", "/colleges")),
+        Case("POST /view", lambda: call("POST", "/view", json={"sort_by": "ctc"})),
+        Case("POST /view (page)", lambda: call("POST", "/view", json={"sort_by": "ctc", "limit": 100, "with_total": True})),
+        Case("GET /download", lambda: call("GET", "/download")),
+        Case("GET /download (parquet)", lambda: call("GET", "/download?format=parquet")),
+        Case("POST /search", lambda: call("POST", "/search", json={"college_name": sample["college_name"]})),
+        Case("POST /search (page)", lambda: call("POST", "/search", json={"company_name": sample["company_name"], "limit": 100})),
+        Case("POST /add", lambda: call("POST", "/add", json=one), teardown=lambda: delete(db, one)),
+        Case("POST /upload-csv", lambda: call("POST", "/upload-csv", data={"file": (io.BytesIO(upload), "bench.csv")}),
+             teardown=lambda: delete(db, *batch)),
+        Case("POST /upload-parquet", lambda: call("POST", "/upload-parquet", data={"file": (io.BytesIO(parquet_upload), "bench.parquet")}),
+             teardown=lambda: delete(db, *batch)),
+        Case("POST /edit-college-company", lambda: call("POST", "/edit-college-company", json={**{f"old_{col}": one[col] for col in KEY_COLUMNS}, "new_ctc": edited["ctc"]}),
+             setup=lambda: add(db, one), teardown=lambda: delete(db, edited)),
+        Case("POST /delete-college-company", lambda: call("POST", "/delete-college-company", json=key(one)), setup=lambda: add(db, one)),
+        Case("POST /batch", lambda: call("POST", "/batch", json={"operations": [{"op": "add", **rec} for rec in batch]}), teardown=lambda: delete(db, *batch)),
+        Case("POST /jobs", submit_job, teardown=import_done), # the upload spooled, not the import
+        Case("GET /jobs/<job_id>", lambda: call("GET", f"/jobs/{job['id']}"), setup=lambda: create_job(db, job), teardown=lambda: drop_job(db, job)),
+        Case("GET /analytics", lambda: call("GET", "/analytics?n=10")),
+        Case("GET /analytics/distribution", lambda: call("GET", "/analytics/distribution", query_string={"bins": 20})),
+        Case("POST /analytics/distribution", lambda: call("POST", "/analytics/distribution",
+                                                         json={"percentiles": [50, 90], "groups": {"sample": [sample["college_name"]]}})),
+        Case("GET /autocomplete", lambda: call("GET", "/autocomplete", query_string={"prefix": sample["college_name"][:3]})),
+        Case("GET /cache/stats", lambda: call("GET", "/cache/stats")),
+        Case("GET /pool/stats", lambda: call("GET", "/pool/stats")),
+        Case("GET /metrics", lambda: call("GET", "/metrics")),
+    ]
+
+def uncovered(method_names: List[str], route_names: List[str]) -> List[str]:
+    """Public methods and routes without a case, so new ones don't silently go unmeasured."""
+    public = {name for name, value in vars(PostgreSQL).items() if not name.startswith("_") and callable(value)}
+    routes = {f"{method} {rule.rule}" for rule in api.app.url_map.iter_rules() if rule.endpoint != "static"
+              for method in rule.methods - {"HEAD", "OPTIONS"}}
+    covered_routes = {name.split(" (")[0] for name in route_names}
+    return sorted(public - set(method_names) - set(SKIPPED_METHODS)) + sorted(routes - covered_routes)
+
+# Run in a fresh interpreter per sample, prints seconds to import api.py and to its first response
+COLD_START_SCRIPT = """
+import time
+start = time.perf_counter()
+import api
+imported = time.perf_counter()
+response = api.app.test_client().get("/colleges")
+if response.status_code != 200: raise SystemExit(response.get_data(as_text=True)[:200])
+print(imported - start, time.perf_counter() - start)
+"""
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    return {
+        "median_ms": statistics.median(samples), "min_ms": min(samples), "max_ms": max(samples), "mean_ms": statistics.fmean(samples),
+        "stdev_ms": statistics.stdev(samples) if len(samples) > 1 else 0.0, "runs": len(samples),
+    }
+
+def time_cold_start(db_url: str, repeat: int) -> Dict[str, Dict[str, Any]]:
+    """Import and import-to-first-response times of api.py, the schema already exists (as after `init-db`)."""
+    env = {**os.environ, "DATABASE_URL": db_url, "AUTO_CREATE_SCHEMA": "false", "IDENTITY_CACHE_WARMUP": "false"}
+    imports, first_responses = [], []
+    try:
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, "-c", COLD_START_SCRIPT], env=env, capture_output=True, text=True, check=True,
+                                 cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.split()
+            imports.append(float(out[-2]) * 1000)
+            first_responses.append(float(out[-1]) * 1000)
+    except subprocess.CalledProcessError as e: return {name: {"error": (e.stderr or str(e)).strip()[-200:]} for name in ("import", "first_response")}
+    return {"import": summarize(imports), "first_response": summarize(first_responses)}
+
+def time_case(db: PostgreSQL, case: Case, repeat: int, warmup: int) -> Dict[str, Any]:
+    samples = []
+    try:
+        for i in range(warmup + repeat):
+            if case.setup is not None: case.setup()
+            db.remove()
+            start = time.perf_counter()
+            case.run()
+            elapsed = time.perf_counter() - start
+            db.remove()
+            if case.teardown is not None: case.teardown()
+            if i >= warmup: samples.append(elapsed * 1000)
+    except Exception as e:
+        db.session.rollback()
+        return {"error": str(e)}
+    finally: db.remove()
+    return summarize(samples)
+
+def git_revision() -> Optional[str]:
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception: return None
+
+def bench_database(db_url: str, spec: DatasetSpec, args: argparse.Namespace) -> Dict[str, Any]:
+    db = PostgreSQL(db_url, create_schema=True)
+    result: Dict[str, Any] = {"dialect": db.engine.dialect.name}
+    if not args.no_load:
+        if db.get_analytics_summary().total_placements: db.delete_all() # refuses unless DEBUG is set
+        seconds = load(db, spec)
+        result.update(load_seconds=seconds, load_rows_per_second=spec.links / seconds)
+        print(f"  loaded {spec.links:,} placements in {seconds:.1f}s ({spec.links / seconds:,.0f} rows/s)")
+    api.db, api.cache = db, (api.cache if args.cache else NullCache())
+    api.jobs = ImportJobRunner(db, spool_dir=os.path.join(tempfile.gettempdir(), "bench-imports"))
+    methods, routes = method_cases(db, spec), route_cases(db, spec)
+    for name in uncovered([case.name for case in methods], [case.name for case in routes]): print(f"  warning: no benchmark case for {name}")
+    only = re.compile(args.only) if args.only else None
+    result["cases"] = {}
+    for prefix, cases in (("method", methods), ("route", routes)):
+        for case in cases:
+            name = f"{prefix}:{case.name}"
+            if only is not None and not only.search(name): continue
+            timing = time_case(db, case, repeat=args.repeat, warmup=args.warmup)
+            result["cases"][name] = timing
+            print(f"  {name:<50} " + (f"{timing['median_ms']:10.2f} ms" if "error" not in timing else f"ERROR {timing['error'][:80]}"))
+    if only is None or any(only.search(f"startup:{name}") for name in ("import", "first_response")):
+        for name, timing in time_cold_start(db_url, repeat=args.repeat).items():
+            if only is not None and not only.search(f"startup:{name}"): continue
+            result["cases"][f"startup:{name}"] = timing
+            print(f"  {'startup:' + name:<50} " + (f"{timing['median_ms']:10.2f} ms" if "error" not in timing else f"ERROR {timing['error'][:80]}"))
+    api.jobs.shutdown()
+    if not db.check_rollups().consistent: print("  warning: rollups drifted during the run, write cases didn't clean up")
+    db.remove()
+    db.engine.dispose()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--preset", choices=PRESETS, default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db-url", action="append", default=[], help="repeatable, defaults to a SQLite temp file")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--only", default=None, help="regex, only cases whose name matches")
+    parser.add_argument("--no-load", action="store_true", help="reuse the data already in --db-url")
+    parser.add_argument("--cache", action="store_true", help="keep the response cache on for route cases")
+    parser.add_argument("--output", default=None, help="defaults to benchmarks/results/<preset>-<timestamp>.json")
+    parser.add_argument("--compare", default=None, help="a previous result file to flag regressions against")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    args = parser.parse_args()
+
+    spec = PRESETS[args.preset]._replace(seed=args.seed)
+    report: Dict[str, Any] = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"), "git_revision": git_revision(), "preset": args.preset,
+            "spec": spec._asdict(), "repeat": args.repeat, "warmup": args.warmup, "cache": args.cache,
+            "python": platform.python_version(), "sqlalchemy": sqlalchemy.__version__, "platform": platform.platform(),
+        },
+        "databases": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        targets = [(url, make_url(url).render_as_string(hide_password=True)) for url in args.db_url]
+        if not targets: targets = [(f"sqlite:///{os.path.join(tmp, 'bench.db')}", "sqlite (temp file)")]
+        for url, label in targets:
+            print(f"{label}: {spec.links:,} placements, {spec.colleges:,} colleges, {spec.companies:,} companies")
+            report["databases"][label] = bench_database(url, spec, args)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{args.preset}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f: json.dump(report, f, indent=2)
+    print(f"results saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f: baseline = json.load(f)
+        comparisons = compare(baseline, report, threshold=args.threshold)
+        print_comparison(comparisons)
+        if any(c.status == "regression" for c in comparisons): sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Deterministic synthetic placement data for the benchmark suite.
+
+A dataset is `links` distinct (college, company) placements over `colleges` colleges and `companies`
+(company_name, role, ctc) tuples. Record `k` is a pure function of the spec and `k`, so any record can be
+regenerated (e.g. to pick search terms or keys to delete) without materializing the dataset.
+
+usage (from backend/):
+    python benchmarks/datagen.py --preset medium --csv medium.csv   # write an /upload-csv compatible file
+"""
+import argparse, csv, math, os, random, sys, time
+from typing import Any, Dict, Iterator, List, NamedTuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import PostgreSQL, INGEST_COLUMNS
+
+CITIES = ["Delhi", "Mumbai", "Patna", "Chennai", "Kanpur", "Roorkee", "Guwahati", "Hyderabad", "Pune", "Bhopal",
+          "Jaipur", "Indore", "Ranchi", "Nagpur", "Surat", "Mysore", "Trichy", "Warangal", "Silchar", "Goa"]
+KINDS = ["Institute of Technology", "Engineering College", "University", "College of Science", "Institute of Management"]
+COMPANY_WORDS = ["Tech", "Soft", "Data", "Cloud", "Micro", "Info", "Net", "Quant", "Bio", "Fin", "Logic", "Byte"]
+COMPANY_SUFFIXES = ["Systems", "Labs", "Solutions", "Corp", "Networks", "Analytics", "Capital", "Works"]
+ROLES = ["SDE", "SDE 2", "Analyst", "Intern", "Data Scientist", "Product Manager", "Consultant", "DevOps Engineer",
+         "ML Engineer", "QA Engineer", "Business Analyst", "Designer"]
+
+class DatasetSpec(NamedTuple):
+    colleges: int
+    companies: int
+    links: int
+    person_ratio: float = 0.3 # share of placements carrying an HR contact
+    seed: int = 0
+
+PRESETS: Dict[str, DatasetSpec] = {
+    "tiny": DatasetSpec(colleges=50, companies=500, links=2_000),
+    "small": DatasetSpec(colleges=500, companies=5_000, links=50_000),
+    "medium": DatasetSpec(colleges=2_000, companies=20_000, links=500_000),
+    "large": DatasetSpec(colleges=5_000, companies=50_000, links=2_000_000),
+}
+
+def college_name(spec: DatasetSpec, idx: int) -> str:
+    rng = random.Random(spec.seed * 1_000_003 + idx)
+    return f"{rng.choice(CITIES)} {rng.choice(KINDS)} {idx}"
+
+def company(spec: DatasetSpec, idx: int):
+    """(company_name, role, ctc) of company tuple `idx`, the index keeps the tuple unique."""
+    group = idx // len(ROLES) # one company name per len(ROLES) consecutive tuples, one role each
+    name_rng = random.Random(spec.seed * 2_000_003 + group)
+    name = f"{name_rng.choice(COMPANY_WORDS)}{name_rng.choice(COMPANY_WORDS).lower()} {name_rng.choice(COMPANY_SUFFIXES)} {group}"
+    rng = random.Random(spec.seed * 4_000_037 + idx)
+    ctc = round(min(rng.lognormvariate(math.log(900_000), 0.6), 9_000_000), -4) # ~9 LPA median, long right tail
+    return name, ROLES[idx % len(ROLES)], float(max(ctc, 200_000))
+
+def _stride(spec: DatasetSpec) -> int:
+    # Coprime with `companies`, so the companies of one college never repeat
+    stride = max(1, int(spec.companies * 0.618))
+    while math.gcd(stride, spec.companies) != 1: stride += 1
+    return stride
+
+def record(spec: DatasetSpec, k: int) -> Dict[str, Any]:
+    """Placement `k` (0 <= k < links) as an /upload-csv record."""
+    college_idx, visit = k % spec.colleges, k // spec.colleges
+    company_name, role, ctc = company(spec, (college_idx * 7919 + visit * _stride(spec)) % spec.companies)
+    has_person = random.Random(spec.seed * 3_000_017 + k).random() < spec.person_ratio
+    return {
+        "college_name": college_name(spec, college_idx), "company_name": company_name, "role": role, "ctc": ctc,
+        "hr_name": f"HR {k}" if has_person else None,
+        "linkedin_id": f"hr-{k}" if has_person else None,
+        "email": f"hr{k}@example.com" if has_person else None,
+        "contact_number": f"+91{9_000_000_000 + k}" if has_person else None,
+    }
+
+def iter_records(spec: DatasetSpec, start: int = 0, stop: int = -1) -> Iterator[Dict[str, Any]]:
+    if spec.links > spec.colleges * spec.companies: raise ValueError("links can't exceed colleges * companies")
+    for k in range(start, spec.links if stop < 0 else stop): yield record(spec, k)
+
+def load(db: PostgreSQL, spec: DatasetSpec, batch: int = 50_000) -> float:
+    """Bulk loads the dataset `batch` records at a time, returns the elapsed seconds."""
+    start = time.perf_counter()
+    for offset in range(0, spec.links, batch):
+        report = db.bulk_add_data(list(iter_records(spec, offset, min(offset + batch, spec.links))))
+        if report.rejected: raise ValueError(f"{report.rejected} generated records were rejected")
+        db.remove()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--preset", choices=PRESETS, default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", required=True)
+    args = parser.parse_args()
+
+    spec = PRESETS[args.preset]._replace(seed=args.seed)
+    with open(args.csv, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=INGEST_COLUMNS)
+        writer.writeheader()
+        writer.writerows(iter_records(spec))
+    print(f"wrote {spec.links} placements ({spec.colleges} colleges, {spec.companies} companies) to {args.csv}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""
+Read cache for the API.
+
+Entries are keyed by endpoint + normalized parameters + the dataset version (see `PostgreSQL.bump_version`),
+so a write never has to delete anything: it bumps the version and old entries simply stop being asked for
+(and age out of the LRU / expire from the shared store).
+
+Values derived from the whole dataset are rebuilt per version (`VersionedValue`) or, when rebuilding is too slow
+for every write, kept current by the writes of this process (`IncrementalValue`).
+"""
+import hashlib, json, threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, NamedTuple, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from constants import CACHE_BACKEND, CACHE_MAX_ENTRIES, CACHE_REDIS_URL, CACHE_TTL
+
+class CacheStats(NamedTuple):
+    backend: str
+    hits: int
+    misses: int
+    evictions: int
+    size: Optional[int] # None when the backend can't tell cheaply
+    @property
+    def hit_rate(self) -> float: return self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0
+
+class CacheBackend(ABC):
+    name: str = "abstract"
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit: self.hits += 1
+            else: self.misses += 1
+    def get(self, key: str) -> Optional[bytes]:
+        value = self._get(key)
+        self._count(value is not None)
+        return value
+    @abstractmethod
+    def _get(self, key: str) -> Optional[bytes]: ...
+    @abstractmethod
+    def set(self, key: str, value: bytes) -> None: ...
+    @abstractmethod
+    def clear(self) -> None: ...
+    def size(self) -> Optional[int]: return None
+    def stats(self) -> CacheStats:
+        return CacheStats(backend=self.name, hits=self.hits, misses=self.misses, evictions=self.evictions, size=self.size())
+
+class NullCache(CacheBackend):
+    name = "none"
+    def _get(self, key: str) -> Optional[bytes]: return None
+    def set(self, key: str, value: bytes) -> None: pass
+    def clear(self) -> None: pass
+
+class LRUCache(CacheBackend):
+    """Bounded in-process cache, least recently used entries go first."""
+    name = "lru"
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None: self._entries.move_to_end(key)
+            return value
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    def clear(self) -> None:
+        with self._lock: self._entries.clear()
+    def size(self) -> Optional[int]: return len(self._entries)
+
+class SharedCache(CacheBackend):
+    """
+    Cache shared by every worker, backed by any client with redis-py's `get(key)` / `set(key, value, ex=ttl)`.
+    Evictions happen inside the store and are not counted here.
+    """
+    name = "shared"
+    def __init__(self, client: Any, prefix: str = "collegeconnect:", ttl: int = CACHE_TTL):
+        super().__init__()
+        self.client, self.prefix, self.ttl = client, prefix, ttl
+    def _get(self, key: str) -> Optional[bytes]: return self.client.get(self.prefix + key)
+    def set(self, key: str, value: bytes) -> None: self.client.set(self.prefix + key, value, ex=self.ttl)
+    def clear(self) -> None:
+        for key in self.client.scan_iter(match=self.prefix + "*"): self.client.delete(key)
+
+class VersionedValue:
+    """One value derived from the whole dataset (e.g. a column snapshot), rebuilt once per dataset version."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version: Optional[int] = None
+        self.value: Any = None
+        self.builds = 0
+    def get(self, version: int, build: Callable[[int], Any]) -> Any:
+        """The value for `version`, built by `build(version)` by one caller while the others wait. A newer value is kept
+        (a replica lagging behind doesn't cause a rebuild)."""
+        if self.version is not None and self.version >= version: return self.value
+        with self._lock:
+            if self.version is None or self.version < version:
+                self.value = build(version)
+                self.version = version
+                self.builds += 1
+            return self.value
+
+SESSION_KEY = "incremental_values" # IncrementalValue -> its changes written by the transaction
+
+class _Pending:
+    """What one transaction changed for one `IncrementalValue`, kept in `session.info` until it ends."""
+    __slots__ = ("versions", "changes")
+    def __init__(self, changes: Any):
+        self.versions: List[int] = [] # dataset versions bumped by the transaction, consecutive
+        self.changes = changes
+
+class IncrementalValue(ABC):
+    """
+    One value derived from the whole dataset (with a `version` attribute), kept at the dataset version by the writes of
+    this process instead of being rebuilt.
+
+    Write paths record their changes through `_pending(session)` and report the versions they bump (`observe_version`),
+    the commit hands them over as one delta. A delta is applied only when it directly follows the value's version.
+    A value that falls behind otherwise (another process wrote) is rebuilt by the first reader to notice; while a
+    delta is on its way, a replica lags behind or another thread rebuilds, `current` has no value to give.
+    """
+    def __init__(self):
+        self._lock = threading.Lock() # guards the fields below, readers take `_value` without it
+        self._building = threading.Lock()
+        self._value: Any = None
+        self._committing: Set[int] = set() # versions bumped by transactions of this process not yet published
+        self._waiting: Dict[int, _Pending] = {} # committed deltas by first version, until the value reaches them
+        self.builds = self.deltas = 0
+
+    @abstractmethod
+    def _changes(self) -> Any:
+        """The empty changes of a transaction."""
+    @abstractmethod
+    def _build(self, db: Any, version: int) -> Any:
+        """The value at `version`, read in the session that read the version."""
+    @abstractmethod
+    def _apply(self, value: Any, version: int, changes: Any) -> Any:
+        """
+        The value at `version` from the one just before and the changes in between, None when it has to be rebuilt (as
+        after an exception). A value changed in place instead of copied must only be read under `_lock`.
+        """
+    def _changed(self, changes: Any) -> bool: return bool(changes)
+
+    def _pending(self, session: Session) -> _Pending:
+        values = session.info.setdefault(SESSION_KEY, {})
+        pending = values.get(self)
+        if pending is None: pending = values[self] = _Pending(self._changes())
+        return pending
+
+    def observe_version(self, session: Session, version: int) -> None:
+        """Records a version bumped by this transaction, readers seeing it before the commit is published get no value."""
+        self._pending(session).versions.append(version)
+        with self._lock: self._committing.add(version)
+
+    def _publish(self, pending: _Pending) -> None:
+        with self._lock:
+            self._committing.difference_update(pending.versions)
+            if not pending.versions:
+                # Changes written without a version bump can't be placed, start over from the database
+                if self._changed(pending.changes): self._value = None
+                return
+            if self._value is None: return
+            self._waiting[pending.versions[0]] = pending
+            self._advance()
+
+    def _discard(self, pending: _Pending) -> None:
+        with self._lock: self._committing.difference_update(pending.versions)
+
+    def _advance(self) -> None:
+        """Applies the waiting deltas that follow the value's version (caller holds the lock)."""
+        while self._value is not None:
+            for first in [first for first, pending in self._waiting.items() if pending.versions[-1] <= self._value.version]: del self._waiting[first]
+            pending = self._waiting.pop(self._value.version + 1, None)
+            if pending is None: return
+            try: self._value = self._apply(self._value, pending.versions[-1], pending.changes)
+            except Exception: self._value = None # possibly half applied, rebuilt by the next reader
+            self.deltas += 1
+
+    def load(self, db: Any) -> Any:
+        """Builds the value at the database's version and installs it, unless the one installed meanwhile is newer."""
+        version = db.get_version()
+        value = self._build(db, version)
+        with self._lock:
+            self.builds += 1
+            if self._value is None or self._value.version < value.version:
+                self._value = value
+                self._advance()
+            return self._value
+
+    def current(self, db: Any) -> Any:
+        """The value at the database's version, None when there is none to give right now."""
+        version = db.get_version()
+        with self._lock:
+            value = self._value
+            if value is not None:
+                if value.version == version: return value
+                # A replica behind the value, or writes of this process still being published
+                if value.version > version or all(v in self._committing for v in range(value.version + 1, version + 1)): return None
+        if not self._building.acquire(blocking=False): return None # another thread is building
+        try: value = self.load(db)
+        finally: self._building.release()
+        return value if value.version == version else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._value = None
+            self._waiting.clear()
+
+@event.listens_for(Session, "after_commit")
+def _publish_on_commit(session: Session) -> None:
+    for value, pending in session.info.pop(SESSION_KEY, {}).items(): value._publish(pending)
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_on_end(session: Session, transaction: Any) -> None:
+    # Rollbacks and closed sessions, a commit already took its changes
+    if transaction.parent is None:
+        for value, pending in session.info.pop(SESSION_KEY, {}).items(): value._discard(pending)
+
+def make_cache_key(endpoint: str, version: int, params: Any) -> str:
+    """Normalizes the parameters (key order, whitespace) so equivalent requests share an entry."""
+    normalized = json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+    return f"{endpoint}:{version}:" + hashlib.sha1(normalized.encode()).hexdigest()
+
+def make_etag(key: str) -> str:
+    # The key pins endpoint, parameters and dataset version, i.e. the exact response bytes: a strong validator
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def get_cache_backend(backend: str = CACHE_BACKEND) -> CacheBackend:
+    if backend == LRUCache.name: return LRUCache()
+    if backend == NullCache.name: return NullCache()
+    if backend == "redis":
+        import redis # optional dependency, only needed for the shared backend
+        return SharedCache(redis.Redis.from_url(CACHE_REDIS_URL))
+    raise ValueError(f"Unknown cache backend {backend}")
@@ -0,0 +1,413 @@
+"""
+In-memory columnar copy of the placements (`COLUMNAR_ENGINE`), `PostgreSQL.query_rows` answers /view and /search
+from it instead of running the three-way join.
+
+company_college joined with its college, company and person is held as NumPy columns: the ids, the ctc, the person
+fields, and the college name, company name and role as codes into sorted dictionaries, so comparing codes compares
+the strings. Each `SortByOptions` column has a presorted permutation by (value, company_id, college_id), the order
+of the SQL keyset pages: a page is a binary search for its cursor and a walk until `limit` rows pass the filters.
+Text filters are evaluated once per dictionary entry, then looked up by code.
+
+Writes don't reload it. The write paths of `PostgreSQL` record the placements they add and remove in their session,
+the commit hands them over as one delta tagged with the dataset versions it bumped (`cache.IncrementalValue`). A delta
+is applied only when it directly follows the copy's version (deltas are idempotent, applying one twice changes
+nothing). The next version shares the columns of the old one: new rows are appended past its end, removed ones only
+drop out of a `live` mask (compacted once they are a sixteenth of the rows), and the permutations are copied once
+with the new rows merged in, some milliseconds at a million rows where a load takes seconds. A copy that falls
+behind otherwise (another process wrote) is reloaded by the first query to notice; while a delta is on its way, a
+replica lags behind or another thread reloads, the database answers.
+
+Results are those of the SQL path (pytest/test_columnar.py diffs them): searches ranked by the search index's own
+score (FTS5 bm25, pg_trgm similarity) go to the database. Strings compare like SQLite's defaults, by code point with
+ASCII-only case folding, where FTS5 folds all of Unicode: searches for terms that aren't ASCII go to the database too. A listing can be paged partly by the copy and partly by the database, so their
+cursors have to agree. `check_collation` therefore only accepts SQLite, or PostgreSQL with the C (or POSIX) locale.
+"""
+import bisect
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from models import (
+    PostgreSQL, PlacementColumns, PlacementQuery, PlacementRow, Page, SortBy, SortByOptions, OrderOptions, MAX_PAGE_SIZE,
+    encode_cursor, decode_cursor
+)
+from cache import IncrementalValue
+from distribution import placement_ids, id_positions
+from search_index import SearchIndex
+
+TEXT_COLUMNS = ("college_name", "company_name", "role") # dictionary encoded, in `SortByOptions` and `PlacementQuery` naming
+PERSON_COLUMNS = ("hr_name", "linkedin_id", "email", "contact_number")
+
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+def _fold(value: str) -> str:
+    """Case folding of SQLite's LIKE and lower()."""
+    return value.translate(_ASCII_LOWER)
+
+def check_collation(engine: Engine) -> None:
+    """Raises unless the database sorts and folds text like the copy, see the module docstring."""
+    if engine.dialect.name == "sqlite": return
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            collate, ctype = conn.execute(text("SELECT datcollate, datctype FROM pg_database WHERE datname = current_database()")).one()
+        if collate in ("C", "POSIX") and ctype in ("C", "POSIX"): return
+        raise RuntimeError(f"COLUMNAR_ENGINE needs a database created with the C locale (LC_COLLATE {collate}, LC_CTYPE {ctype})")
+    raise RuntimeError(f"COLUMNAR_ENGINE doesn't support {engine.dialect.name}")
+
+def _tie_keys(company_id: np.ndarray, college_id: np.ndarray) -> np.ndarray:
+    """(company_id, college_id) as one int64 ordered the same way, ids below 2**31."""
+    return (company_id << 32) | college_id
+
+def _grow(buffer: np.ndarray, size: int, values: np.ndarray, in_place: bool) -> np.ndarray:
+    """A buffer starting with `buffer[:size]` then `values`: `buffer` itself if `in_place` and it has room, else a bigger copy."""
+    end = size + len(values)
+    if not in_place or len(buffer) < end:
+        grown = np.empty(max(end + end // 4, 1024), dtype=buffer.dtype)
+        grown[:size] = buffer[:size]
+        buffer = grown
+    buffer[size:end] = values
+    return buffer
+
+def _insert(values: np.ndarray, at: np.ndarray, inserted: np.ndarray) -> np.ndarray:
+    """`np.insert` of `inserted` before the sorted positions `at`, copied slice by slice when there are few."""
+    if len(at) > 64: return np.insert(values, at, inserted)
+    bounds = [0] + at.tolist() + [len(values)]
+    pieces = [values[:bounds[1]]]
+    for index in range(len(at)): pieces += [inserted[index:index + 1], values[bounds[index + 1]:bounds[index + 2]]]
+    return np.concatenate(pieces)
+
+class ColumnStats(NamedTuple):
+    version: Optional[int] # dataset version of the copy, None before the first load
+    rows: int
+    removed: int # rows deleted since the last compaction, still taking their place in the columns
+    loads: int # full reads of the tables
+    deltas: int # writes applied in memory
+    fallbacks: int # queries answered by the database instead
+
+class _Order:
+    """
+    Row positions sorted by (values, ties), columns of one `_Columns` version. Ties are unique among the live rows,
+    an order of unique values has none. Searches bisect through the columns, a delta copies nothing but `perm`.
+    """
+    __slots__ = ("perm", "values", "ties")
+    def __init__(self, perm: np.ndarray, values: np.ndarray, ties: Optional[np.ndarray]):
+        self.perm = perm
+        self.values = values
+        self.ties = ties
+
+    @classmethod
+    def build(cls, positions: np.ndarray, values: np.ndarray, ties: Optional[np.ndarray]) -> "_Order":
+        order = np.lexsort((ties[positions], values[positions])) if ties is not None else np.argsort(values[positions], kind="stable")
+        return cls(positions[order], values, ties)
+
+    def find(self, value: Any, tie: Optional[int] = None, side: str = "left") -> int:
+        """`np.searchsorted` of one key in the order, of `value` alone when `tie` is None."""
+        search = bisect.bisect_left if side == "left" else bisect.bisect_right
+        values, ties = self.values, self.ties
+        if tie is None: return search(self.perm, value, key=values.__getitem__)
+        return search(self.perm, (value, tie), key=lambda position: (values[position], ties[position]))
+
+    def _indexes(self, positions: np.ndarray) -> np.ndarray:
+        """Where the rows at `positions` go in the order, `np.searchsorted` style."""
+        if len(positions) <= 1024:
+            ties = self.ties[positions].tolist() if self.ties is not None else [None] * len(positions)
+            return np.fromiter((self.find(value, tie) for value, tie in zip(self.values[positions].tolist(), ties)), dtype=np.int64, count=len(positions))
+        values = self.values[self.perm]
+        if self.ties is None: return np.searchsorted(values, self.values[positions])
+        starts, stops = np.searchsorted(values, self.values[positions], "left"), np.searchsorted(values, self.values[positions], "right")
+        ties = self.ties[self.perm]
+        return np.fromiter((start + int(np.searchsorted(ties[start:stop], tie)) for start, stop, tie in zip(starts.tolist(), stops.tolist(), self.ties[positions].tolist())),
+                           dtype=np.int64, count=len(positions))
+
+    def lookup(self, values: np.ndarray, live: Optional[np.ndarray]) -> np.ndarray:
+        """Positions of the `live` rows of `values` in an order of unique values (but for deleted rows), -1 for the missing ones."""
+        perm = self.perm
+        if not len(perm): return np.full(len(values), -1, dtype=np.int64)
+        if len(values) <= 1024: idx = np.fromiter((self.find(value) for value in values.tolist()), dtype=np.int64, count=len(values))
+        else: idx = np.searchsorted(self.values[perm], values)
+        rows = perm[np.minimum(idx, len(perm) - 1)]
+        found = self.values[rows] == values
+        positions = np.where(found, rows, -1)
+        if live is None: return positions
+        # The first row of a value was deleted, a live one may follow
+        for index in np.flatnonzero(found & ~live[rows]).tolist():
+            position, value = int(idx[index]), int(values[index])
+            while position < len(perm) and self.values[perm[position]] == value and not live[perm[position]]: position += 1
+            found_live = position < len(perm) and self.values[perm[position]] == value
+            positions[index] = perm[position] if found_live else -1
+        return positions
+
+    def update(self, values: np.ndarray, ties: Optional[np.ndarray], positions: np.ndarray) -> "_Order":
+        """The order over the next version's `values` and `ties` (text codes may have moved up, in the same order), the rows at `positions` merged in."""
+        if not len(positions): return _Order(self.perm, values, ties)
+        current = _Order(self.perm, values, ties)
+        order = np.lexsort((ties[positions], values[positions])) if ties is not None else np.argsort(values[positions], kind="stable")
+        positions = positions[order]
+        return _Order(_insert(self.perm, current._indexes(positions), positions), values, ties)
+
+class _Columns:
+    """
+    One version of the copy, never changed once queries can see it: a delta builds the next one. Deleted rows stay
+    in the columns and the orders, out of `live`, until there are enough of them to compact. Versions share their
+    column buffers: a delta writes its rows past the end of the last version, which doesn't see them.
+    """
+    BUFFERS = ("college_id", "company_id", "key", "tie", "ctc", "person", *TEXT_COLUMNS)
+
+    def __init__(self, version: int, buffers: Dict[str, np.ndarray], size: int, dictionaries: Dict[str, np.ndarray],
+                 persons: List[Tuple[Optional[str], ...]], live: Optional[np.ndarray] = None,
+                 orders: Optional[Dict[str, _Order]] = None, end: Optional[List[int]] = None):
+        self.version = version
+        self._buffers = buffers
+        self._end = end if end is not None else [size] # rows written to the shared buffers so far
+        self.college_id, self.company_id, self.key, self.tie, self.ctc, self.person = (buffers[name][:size] for name in self.BUFFERS[:6])
+        self.codes = {name: buffers[name][:size] for name in TEXT_COLUMNS}
+        self.dictionaries = dictionaries # sorted unique strings, entries no row uses anymore stay until the next load
+        self.persons = persons # `PERSON_COLUMNS` fields that `person` indexes (-1: none), append-only and shared like the buffers
+        self.live = live # None when every row is
+        self.count = int(live.sum()) if live is not None else size
+        self.orders = orders if orders is not None else self._build_orders()
+        self._folded: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int: return self.count
+
+    def _order_columns(self, order: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        # "key": placement lookups by (college_id, company_id)
+        if order == "key": return self.key, None
+        return (self.ctc if order == SortByOptions["ctc"] else self.codes[order]), self.tie
+
+    def _build_orders(self) -> Dict[str, _Order]:
+        positions = np.flatnonzero(self.live) if self.live is not None else np.arange(len(self.ctc))
+        return {order: _Order.build(positions, *self._order_columns(order)) for order in (*SortByOptions.values(), "key")}
+
+    @classmethod
+    def create(cls, version: int, college_id: np.ndarray, company_id: np.ndarray, ctc: np.ndarray, person: np.ndarray, codes: Dict[str, np.ndarray],
+               dictionaries: Dict[str, np.ndarray], persons: List[Tuple[Optional[str], ...]]) -> "_Columns":
+        buffers = {"college_id": college_id, "company_id": company_id, "key": (college_id << 32) | company_id, "tie": _tie_keys(company_id, college_id),
+                   "ctc": ctc, "person": person, **codes}
+        return cls(version, buffers, len(ctc), dictionaries, persons)
+
+    @classmethod
+    def load(cls, version: int, columns: PlacementColumns) -> "_Columns":
+        placements = placement_ids(columns.placements)
+        college_ids = np.array([row[0] for row in columns.colleges], dtype=np.int64)
+        company_ids = np.array([row[0] for row in columns.companies], dtype=np.int64)
+        colleges = id_positions(college_ids)[placements[:, 0]]
+        companies = id_positions(company_ids)[placements[:, 1]]
+        codes: Dict[str, np.ndarray] = {}
+        dictionaries: Dict[str, np.ndarray] = {}
+        for name, rows, positions, field in (("college_name", columns.colleges, colleges, 1), ("company_name", columns.companies, companies, 1),
+                                             ("role", columns.companies, companies, 2)):
+            dictionaries[name], table_codes = np.unique(np.array([row[field] for row in rows], dtype=object), return_inverse=True)
+            codes[name] = table_codes.reshape(-1).astype(np.int64)[positions]
+        ctc = np.array([row[3] for row in columns.companies], dtype=np.float64)[companies]
+        person_ids = np.array([row[0] for row in columns.persons], dtype=np.int64)
+        person = np.where(placements[:, 2] >= 0, id_positions(person_ids)[np.maximum(placements[:, 2], 0)] if len(person_ids) else -1, -1)
+        persons = [tuple(row[1:]) for row in columns.persons]
+        return cls.create(version, placements[:, 0].copy(), placements[:, 1].copy(), ctc, person, codes, dictionaries, persons)
+
+    def _compacted(self) -> "_Columns":
+        """The live rows only, orders sorted again."""
+        positions = np.flatnonzero(self.live)
+        return self.create(self.version, self.college_id[positions], self.company_id[positions], self.ctc[positions], self.person[positions],
+                           {name: codes[positions] for name, codes in self.codes.items()}, self.dictionaries, self.persons)
+
+    def apply(self, version: int, added: Sequence[Tuple[PlacementRow, Optional[int]]], removed: Iterable[Tuple[int, int]]) -> "_Columns":
+        """The next version: `removed` (college_id, company_id) rows dropped, then `added` rows merged in."""
+        key_order = self.orders["key"]
+        dropped = key_order.lookup(np.array([college_id << 32 | company_id for college_id, company_id in removed], dtype=np.int64), self.live)
+        dropped = np.unique(dropped[dropped >= 0])
+        # Rows already in the copy (a load that saw the write already) are skipped, the last row of a key wins
+        rows = list({(row.college_id, row.company_id): row for row, _ in added}.values())
+        if rows:
+            present = key_order.lookup(np.array([row.college_id << 32 | row.company_id for row in rows], dtype=np.int64), self.live)
+            dropped_set = set(dropped.tolist())
+            rows = [row for row, position in zip(rows, present.tolist()) if position < 0 or position in dropped_set]
+        size = len(self.ctc)
+        if not len(dropped) and not rows: return _Columns(version, self._buffers, size, self.dictionaries, self.persons, self.live, self.orders, self._end)
+
+        college_id = np.array([row.college_id for row in rows], dtype=np.int64)
+        company_id = np.array([row.company_id for row in rows], dtype=np.int64)
+        new = {"college_id": college_id, "company_id": company_id, "key": (college_id << 32) | company_id, "tie": _tie_keys(company_id, college_id),
+               "ctc": np.array([row.ctc for row in rows], dtype=np.float64)}
+        person = new["person"] = np.empty(len(rows), dtype=np.int64)
+        for index, row in enumerate(rows):
+            fields = tuple(getattr(row, name) for name in PERSON_COLUMNS)
+            if all(field is None for field in fields): person[index] = -1
+            else:
+                person[index] = len(self.persons)
+                self.persons.append(fields)
+        buffers, dictionaries = dict(self._buffers), dict(self.dictionaries)
+        for name in TEXT_COLUMNS:
+            values = [getattr(row, name) for row in rows]
+            dictionary = dictionaries[name]
+            strings = np.array(sorted(set(values).difference(dictionary.tolist())), dtype=object)
+            if len(strings):
+                # Codes keep their order: old code c moves up by the count of new strings below it
+                buffers[name] = (np.arange(len(dictionary)) + np.searchsorted(strings, dictionary))[self.codes[name]]
+                dictionary = dictionaries[name] = np.insert(dictionary, np.searchsorted(dictionary, strings), strings)
+            new[name] = np.searchsorted(dictionary, np.array(values, dtype=object)).astype(np.int64) if values else np.empty(0, dtype=np.int64)
+        # Nothing was written past this version's rows: the buffers are extended in place
+        in_place = self._end[0] == size
+        for name, values in new.items(): buffers[name] = _grow(buffers[name], size, values, in_place and buffers[name] is self._buffers[name])
+        if in_place: self._end[0] = size + len(rows)
+        live = np.concatenate((self.live if self.live is not None else np.ones(size, dtype=bool), np.ones(len(rows), dtype=bool)))
+        live[dropped] = False
+
+        # Merging costs a copy of every order, sorting again is cheaper for big deltas
+        rebuild = len(rows) > max(size // 16, 1024)
+        columns = _Columns(version, buffers, size + len(rows), dictionaries, self.persons, live, None if rebuild else {}, self._end if in_place else None)
+        if len(columns.ctc) - len(columns) > max(len(columns.ctc) // 16, 1024): return columns._compacted()
+        if not rebuild:
+            positions = np.arange(size, size + len(rows), dtype=np.int64)
+            for order, old in self.orders.items(): columns.orders[order] = old.update(*columns._order_columns(order), positions)
+        return columns
+
+    # --- Queries ---
+
+    def _scores(self, name: str, term: str) -> np.ndarray:
+        """Match score of every dictionary entry, `search_index._like_score`'s: 3 equal, 2 prefix, 1 substring, 0 no match."""
+        folded = self._folded.get(name)
+        if folded is None: folded = self._folded[name] = [_fold(value) for value in self.dictionaries[name].tolist()]
+        term = _fold(term)
+        return np.fromiter((3 if value == term else 2 if value.startswith(term) else 1 if term in value else 0 for value in folded),
+                           dtype=np.int8, count=len(folded))
+
+    def _filter(self, query: PlacementQuery) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Rows matching every filter of `query` and their summed text match score, None for no filter / no search."""
+        mask: Optional[np.ndarray] = None
+        score: Optional[np.ndarray] = None
+        for name in TEXT_COLUMNS:
+            term = getattr(query, name)
+            if not term: continue
+            scores = self._scores(name, term)[self.codes[name]]
+            score = scores.astype(np.int16) if score is None else score + scores
+            mask = scores > 0 if mask is None else mask & (scores > 0)
+        for bound, matches in ((query.ctc_min, np.greater_equal), (query.ctc_max, np.less_equal)):
+            if bound is None: continue
+            mask = matches(self.ctc, bound) if mask is None else mask & matches(self.ctc, bound)
+        if self.live is not None: mask = self.live if mask is None else mask & self.live
+        return mask, score
+
+    def rows(self, positions: np.ndarray) -> List[PlacementRow]:
+        columns = [self.college_id[positions].tolist(), self.company_id[positions].tolist()]
+        columns += [self.dictionaries[name][self.codes[name][positions]].tolist() for name in TEXT_COLUMNS]
+        columns.append(self.ctc[positions].tolist())
+        persons, nobody = self.persons, (None,) * len(PERSON_COLUMNS)
+        people = [persons[person] if person >= 0 else nobody for person in self.person[positions].tolist()]
+        return [PlacementRow._make(row + person) for row, person in zip(zip(*columns), people)]
+
+    def _cursor_position(self, sort_by: SortBy, ascending: bool, cursor: str) -> int:
+        """Where the rows after the cursor start in the ascending order (end before it, descending)."""
+        value, company_id, college_id = decode_cursor(cursor, sort_by=sort_by, order=OrderOptions["asc" if ascending else "desc"])
+        order = self.orders[sort_by]
+        if sort_by == SortByOptions["ctc"]: key_value = float(value)
+        else:
+            dictionary = self.dictionaries[sort_by]
+            key_value = int(np.searchsorted(dictionary, value))
+            # A string no row has: every row sorts strictly before or after it, whatever the ids
+            if key_value >= len(dictionary) or dictionary[key_value] != value: return order.find(key_value)
+        return order.find(key_value, (int(company_id) << 32) | int(college_id), side="right" if ascending else "left")
+
+    @staticmethod
+    def _take(perm: np.ndarray, mask: Optional[np.ndarray], count: int) -> np.ndarray:
+        """The first `count` rows of `perm` in `mask`, scanning windows of doubling size."""
+        if mask is None: return perm[:count]
+        found, start, found_count, window = [], 0, 0, max(4 * count, 1024)
+        while start < len(perm) and found_count < count:
+            chunk = perm[start:start + window]
+            chunk = chunk[mask[chunk]]
+            found.append(chunk)
+            found_count += len(chunk)
+            start += window
+            window *= 2
+        return np.concatenate(found)[:count] if found else perm[:0]
+
+    def select(self, query: PlacementQuery) -> Page:
+        """`PostgreSQL.query_rows` with `projection`, see there."""
+        mask, score = self._filter(query)
+        ascending = query.order == OrderOptions["asc"]
+        if query.limit is not None:
+            sort_by = query.sort_by or SortByOptions["college_name"]
+            limit = max(1, min(int(query.limit), MAX_PAGE_SIZE))
+            total = (int(mask.sum()) if mask is not None else len(self)) if query.with_total else None
+            perm = self.orders[sort_by].perm
+            if query.cursor is not None:
+                position = self._cursor_position(sort_by, ascending, query.cursor)
+                perm = perm[position:] if ascending else perm[:position]
+            positions = self._take(perm if ascending else perm[::-1], mask, limit + 1)
+            next_cursor: Optional[str] = None
+            if len(positions) > limit:
+                positions = positions[:limit]
+                last = int(positions[-1])
+                value = float(self.ctc[last]) if sort_by == SortByOptions["ctc"] else self.dictionaries[sort_by][self.codes[sort_by][last]]
+                next_cursor = encode_cursor(sort_by, query.order, value, int(self.company_id[last]), int(self.college_id[last]))
+            return Page(items=self.rows(positions), next_cursor=next_cursor, total=total)
+        if query.sort_by is not None:
+            positions = self.orders[query.sort_by].perm
+            if not ascending: positions = positions[::-1]
+            if mask is not None: positions = positions[mask[positions]]
+        elif query.searches:
+            positions = np.flatnonzero(mask)
+            positions = positions[np.lexsort((self.college_id[positions], self.company_id[positions], -score[positions]))]
+        else: positions = np.flatnonzero(mask) if mask is not None else np.arange(len(self))
+        items = self.rows(positions)
+        return Page(items=items, next_cursor=None, total=len(items) if query.with_total else None)
+
+class _Changes:
+    """Placements one transaction wrote."""
+    __slots__ = ("added", "removed")
+    def __init__(self):
+        self.added: Dict[Tuple[int, int], Tuple[PlacementRow, Optional[int]]] = {}
+        self.removed: Set[Tuple[int, int]] = set() # applied before `added`
+
+class ColumnStore(IncrementalValue):
+    """The copy of one `PostgreSQL` (its `columns`), see the module docstring."""
+    def __init__(self):
+        super().__init__()
+        self.fallbacks = 0
+
+    def _changes(self) -> _Changes: return _Changes()
+    def _changed(self, changes: _Changes) -> bool: return bool(changes.added or changes.removed)
+    def _build(self, db: PostgreSQL, version: int) -> _Columns: return _Columns.load(version, db.fetch_placement_columns(persons=True))
+    def _apply(self, columns: _Columns, version: int, changes: _Changes) -> _Columns:
+        return columns.apply(version, list(changes.added.values()), changes.removed)
+
+    def record(self, session: Session, added: Sequence[Tuple[PlacementRow, Optional[int]]] = (), removed: Iterable[Tuple[int, int]] = ()) -> None:
+        """Placements written by this transaction: `added` as (row, person_id), `removed` as (college_id, company_id)."""
+        changes: _Changes = self._pending(session).changes
+        for key in removed:
+            key = tuple(key)
+            changes.added.pop(key, None)
+            changes.removed.add(key)
+        for row, person_id in added: changes.added[(row.college_id, row.company_id)] = (row, person_id)
+
+    @staticmethod
+    def _ranks_like(search_index: SearchIndex, query: PlacementQuery) -> bool:
+        """Whether the search index ranks this search by `_like_score`, the only ranking the copy reproduces."""
+        sides = [terms for terms in ((query.college_name,), (query.company_name, query.role)) if any(terms)]
+        return all(search_index.like_scored(*terms) for terms in sides)
+
+    @staticmethod
+    def _folds_like(query: PlacementQuery) -> bool:
+        """Whether the copy folds the search terms like the database: FTS5 folds Unicode case, the copy only ASCII."""
+        return all(term is None or term.isascii() for term in (query.college_name, query.company_name, query.role))
+
+    def query(self, db: PostgreSQL, query: PlacementQuery) -> Optional[Page]:
+        """`db.query_rows(query, projection=True)` from memory, None when the database has to answer it."""
+        columns = None
+        if not self._folds_like(query): pass
+        elif not (query.searches and query.limit is None and query.sort_by is None) or self._ranks_like(db.search_index, query):
+            columns = self.current(db)
+        if columns is None:
+            with self._lock: self.fallbacks += 1
+            return None
+        return columns.select(query)
+
+    def stats(self) -> ColumnStats:
+        columns = self._value
+        if columns is None: return ColumnStats(version=None, rows=0, removed=0, loads=self.builds, deltas=self.deltas, fallbacks=self.fallbacks)
+        return ColumnStats(version=columns.version, rows=len(columns), removed=len(columns.ctc) - len(columns), loads=self.builds, deltas=self.deltas,
+                           fallbacks=self.fallbacks)
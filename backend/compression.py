@@ -0,0 +1,90 @@
+"""
+Negotiated compression of JSON responses, for the Flask app (`init_app`) and the ASGI app (`CompressionMiddleware`).
+
+Brotli is used when the client accepts it and the `brotli` package is installed, gzip otherwise. Bodies smaller
+than `COMPRESS_MIN_BYTES`, streamed responses (the CSV download) and anything already encoded are sent as they
+are. The ETag of a compressed body becomes weak, the cached views compare If-None-Match weakly.
+"""
+import gzip
+from typing import Any, Callable, Dict, Optional
+
+from flask import Flask, Response, request
+
+from constants import COMPRESS_MIN_BYTES, COMPRESS_LEVEL, BROTLI_QUALITY
+
+try: import brotli # optional dependency, gzip only without it
+except ImportError: brotli = None
+
+# Server preference when the client weighs several equally
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Picks the content coding for an Accept-Encoding header, None for identity."""
+    weights: Dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        coding, *params = [piece.strip() for piece in part.split(";")]
+        if not coding: continue
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try: weight = float(value)
+                except ValueError: weight = 0.0
+        weights[coding.lower()] = weight
+    best = max(ENCODINGS, key=lambda coding: weights.get(coding, weights.get("*", 0.0)))
+    return best if weights.get(best, weights.get("*", 0.0)) > 0 else None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br": return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip": return gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported content coding {encoding}")
+
+def _weak(etag: str) -> str: return etag if etag.startswith("W/") else "W/" + etag
+
+def init_app(app: Flask, minimum_size: int = COMPRESS_MIN_BYTES) -> None:
+    @app.after_request
+    def compress_response(response: Response) -> Response:
+        if (response.direct_passthrough or response.is_streamed or response.mimetype != "application/json"
+                or response.status_code in (204, 304) or "Content-Encoding" in response.headers): return response
+        response.vary.add("Accept-Encoding")
+        encoding = negotiate(request.headers.get("Accept-Encoding"))
+        if encoding is None or response.calculate_content_length() < minimum_size: return response
+        response.set_data(compress(response.get_data(), encoding))
+        response.headers["Content-Encoding"] = encoding
+        if "ETag" in response.headers: response.headers["ETag"] = _weak(response.headers["ETag"])
+        return response
+
+class CompressionMiddleware:
+    """ASGI counterpart of `init_app`: compresses single-message JSON bodies, passes everything else through."""
+    def __init__(self, app: Callable, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http": return await self.app(scope, receive, send)
+        from starlette.datastructures import Headers, MutableHeaders
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        start: Optional[Dict[str, Any]] = None
+
+        async def send_compressed(message: Dict[str, Any]) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message # held back until the body shows whether it can be compressed
+                return
+            if start is not None and message["type"] == "http.response.body":
+                headers = MutableHeaders(raw=start["headers"])
+                body = message.get("body", b"")
+                if (not message.get("more_body", False) and headers.get("content-type", "").startswith("application/json")
+                        and "content-encoding" not in headers and start["status"] not in (204, 304)):
+                    headers.add_vary_header("Accept-Encoding")
+                    if encoding is not None and len(body) >= self.minimum_size:
+                        body = compress(body, encoding)
+                        headers["Content-Encoding"] = encoding
+                        headers["Content-Length"] = str(len(body))
+                        if "etag" in headers: headers["ETag"] = _weak(headers["etag"])
+                        message = {**message, "body": body}
+                await send(start)
+                start = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
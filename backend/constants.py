@@ -1,4 +1,4 @@
-import os
+import os, tempfile
 
 basepath = os.path.dirname(__file__)
 if os.path.exists(os.path.join(basepath, '.env')):
@@ -15,6 +15,47 @@ HOST = os.getenv("HOST", "127.0.0.1")
 DATABASE_URL = os.getenv("DATABASE_URL")
 PORT = int(os.getenv("PORT", 8000))
 DEBUG = os.getenv("DEBUG", "False").lower() in ("true", "1", "t")
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "lru") # lru | redis | none, see cache.py
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 256)) # bound of the in-process LRU
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_TTL = int(os.getenv("CACHE_TTL", 3600)) # seconds, only for the shared backend (old versions are never read again)
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto") # auto | pg_trgm | fts5 | like, see search_index.py
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 1000)) # upper bound for `limit` on paginated /view and /search
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 1000)) # rows fetched per round trip (and per written chunk) by the streaming /download
+ARROW_BATCH_SIZE = int(os.getenv("ARROW_BATCH_SIZE", 65536)) # rows per record batch (Parquet row group) in Parquet / Arrow exports and uploads
+BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", 500)) # rows per IN query / multi-row insert in bulk uploads
+IDENTITY_CACHE_MAX_ENTRIES = int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES", 10000)) # colleges / company tuples remembered by /add, see identity_cache.py
+IDENTITY_CACHE_WARMUP = os.getenv("IDENTITY_CACHE_WARMUP", "False").lower() in ("true", "1", "t") # fill the identity caches at startup
+MAX_BATCH_OPERATIONS = int(os.getenv("MAX_BATCH_OPERATIONS", 10000)) # upper bound for the operations of one /batch request
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5)) # connections kept open, see pool.py
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10)) # extra connections opened under load, closed when returned
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30)) # seconds a request waits for a connection before failing
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800)) # seconds before a connection is replaced, -1 never (PostgreSQL only)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() in ("true", "1", "t") # test connections on checkout (PostgreSQL only)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0)) # PostgreSQL statement_timeout, 0 disables
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()] # read replicas of DATABASE_URL, comma separated, see replicas.py
+REPLICA_STRATEGY = os.getenv("REPLICA_STRATEGY", "round_robin") # round_robin | least_connections
+REPLICA_HEALTH_CHECK_SECONDS = float(os.getenv("REPLICA_HEALTH_CHECK_SECONDS", 5)) # between replica probes, a failing replica is evicted until it answers again
+SQLITE_WAL = os.getenv("SQLITE_WAL", "True").lower() in ("true", "1", "t") # readers don't block the writer (file databases)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)) # how long a writer waits for the database lock
+SQLITE_SINGLE_WRITER = os.getenv("SQLITE_SINGLE_WRITER", "True").lower() in ("true", "1", "t") # queue writing transactions in-process
+AUTO_CREATE_SCHEMA = os.getenv("AUTO_CREATE_SCHEMA", str(DEBUG)).lower() in ("true", "1", "t") # create tables / apply migrations on startup, otherwise run `flask --app api init-db` once
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "collegeconnect-imports")) # uploads of background imports wait here, see jobs.py
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2)) # import jobs processed at once per process
+JOB_CHUNK_ROWS = int(os.getenv("JOB_CHUNK_ROWS", 10000)) # rows parsed and committed together, bounds the memory of a job
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", 300)) # a running job without a commit for this long is resumed by another runner
+JOB_MAX_REJECTED_ROWS = int(os.getenv("JOB_MAX_REJECTED_ROWS", 1000)) # rejected rows kept with their reason per job (all are counted)
+COLUMNAR_ENGINE = os.getenv("COLUMNAR_ENGINE", "False").lower() in ("true", "1", "t") # serve /view and /search from an in-memory copy of the placements, see columnar.py
+AUTOCOMPLETE_LIMIT = int(os.getenv("AUTOCOMPLETE_LIMIT", 10)) # suggestions per field when /autocomplete is not given a limit
+AUTOCOMPLETE_MAX_LIMIT = int(os.getenv("AUTOCOMPLETE_MAX_LIMIT", 50)) # the most /autocomplete returns per field, see autocomplete.py
+AUTOCOMPLETE_CHECK_SECONDS = float(os.getenv("AUTOCOMPLETE_CHECK_SECONDS", 1.0)) # how long writes of other processes may go unseen by /autocomplete
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto") # auto | orjson | stdlib, see json_encoding.py
+FRAGMENT_CACHE_MAX_ENTRIES = int(os.getenv("FRAGMENT_CACHE_MAX_ENTRIES", 100000)) # pre-encoded colleges / companies kept for listings
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024)) # smaller JSON bodies are sent uncompressed
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", 1)) # gzip level, 1 (fastest) to 9; the ratio gained above 1 rarely pays for the CPU on dynamic bodies
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 4)) # brotli quality, 0 (fastest) to 11, only with the brotli package
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() in ("true", "1", "t") # per-request SQL instrumentation and GET /metrics
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 250)) # statements at least this slow are logged with their parameters, <= 0 disables
 
 
 if DATABASE_URL is None:
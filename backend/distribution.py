@@ -0,0 +1,140 @@
+"""
+CTC distribution analytics (`/analytics/distribution`) over an in-memory column snapshot.
+
+`load_snapshot` reads the CTC, college and role of every placement once (`PostgreSQL.fetch_placement_columns`)
+into NumPy arrays, sorted by CTC overall and by (group, CTC) per college and per role. Percentiles and group medians
+are then index lookups, histograms binary searches and group comparisons a merge of presorted slices, instead of
+SQL round trips. Snapshots are cached per dataset version (`cache.VersionedValue`): the first request after a write
+rebuilds it. NumPy is imported with this module, the first request that needs it.
+"""
+import itertools
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models import (
+    PostgreSQL, CtcSummary, CtcHistogram, GroupMedian, GroupComparison, DistributionReport
+)
+
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90, 95, 99)
+DEFAULT_BINS = 20
+DEFAULT_GROUP_LIMIT = 20
+
+def placement_ids(chunks: Iterable[Sequence[Tuple[int, ...]]]) -> np.ndarray:
+    """(college_id, company_id, person_id) rows of `PlacementColumns.placements` as one int64 array of three columns."""
+    arrays = [np.fromiter(itertools.chain.from_iterable(chunk), dtype=np.int64, count=3 * len(chunk)).reshape(-1, 3) for chunk in chunks]
+    return np.concatenate(arrays) if arrays else np.empty((0, 3), dtype=np.int64)
+
+def id_positions(ids: np.ndarray) -> np.ndarray:
+    """Lookup table id -> row position."""
+    positions = np.full(int(ids.max()) + 1 if len(ids) else 1, -1, dtype=np.int64)
+    positions[ids] = np.arange(len(ids))
+    return positions
+
+def _quantiles(values: np.ndarray, percentiles: Sequence[float]) -> np.ndarray:
+    """`np.percentile` (linear method) of already sorted values."""
+    ranks = np.asarray(percentiles, dtype=np.float64) / 100 * (len(values) - 1)
+    lower = np.floor(ranks).astype(np.int64)
+    upper = np.minimum(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (ranks - lower)
+
+def summarize(values: np.ndarray, percentiles: Sequence[float]) -> CtcSummary:
+    """Summary of sorted CTC values."""
+    if not len(values): return CtcSummary(count=0, mean=None, std=None, min=None, max=None, percentiles={})
+    return CtcSummary(count=len(values), mean=float(values.mean()), std=float(values.std()), min=float(values[0]), max=float(values[-1]),
+                      percentiles={f"p{p:g}": value for p, value in zip(percentiles, _quantiles(values, percentiles).tolist())})
+
+def histogram(values: np.ndarray, bins: int) -> CtcHistogram:
+    """`np.histogram` of sorted values: equal-width bins between min and max, counted by binary search."""
+    if not len(values): return CtcHistogram(edges=[], counts=[])
+    low, high = float(values[0]), float(values[-1])
+    if low == high: low, high = low - 0.5, high + 0.5
+    edges = np.linspace(low, high, bins + 1)
+    bounds = np.concatenate(([0], np.searchsorted(values, edges[1:-1], side="left"), [len(values)]))
+    return CtcHistogram(edges=edges.tolist(), counts=np.diff(bounds).tolist())
+
+class GroupIndex:
+    """CTC values ordered by (group, CTC): a group's values are one sorted slice, medians are computed up front."""
+    def __init__(self, names: Sequence[str], codes: np.ndarray, ctc: np.ndarray):
+        self.names = list(names)
+        self.codes: Dict[str, int] = {name: code for code, name in enumerate(self.names)}
+        self.values = ctc[np.lexsort((ctc, codes))]
+        self.counts = np.bincount(codes, minlength=len(self.names))
+        self.starts = np.cumsum(self.counts) - self.counts
+        self.medians = np.full(len(self.names), np.nan)
+        present = self.counts > 0
+        lower = self.starts + (self.counts - 1) // 2
+        upper = self.starts + self.counts // 2
+        self.medians[present] = (self.values[lower[present]] + self.values[upper[present]]) / 2
+
+    def group_values(self, codes: Sequence[int]) -> np.ndarray:
+        """Sorted values of several groups together."""
+        slices = [self.values[self.starts[code]:self.starts[code] + self.counts[code]] for code in codes]
+        return np.sort(np.concatenate(slices)) if slices else self.values[:0]
+
+    def top(self, limit: int) -> List[GroupMedian]:
+        """Medians of the `limit` groups with the most placements."""
+        order = np.argsort(-self.counts, kind="stable")[:limit]
+        return [GroupMedian(name=self.names[code], count=int(self.counts[code]), median=float(self.medians[code]))
+                for code in order.tolist() if self.counts[code]]
+
+class Snapshot:
+    def __init__(self, version: int, ctc: np.ndarray, colleges: GroupIndex, roles: GroupIndex):
+        self.version = version
+        self.ctc = ctc # sorted
+        self.colleges = colleges
+        self.roles = roles
+
+def load_snapshot(db: PostgreSQL, version: int) -> Snapshot:
+    """Reads the columns of every placement, `version` being the dataset version read in the same session."""
+    columns = db.fetch_placement_columns()
+    college_ids = np.array([row[0] for row in columns.colleges], dtype=np.int64)
+    college_names = [row[1] for row in columns.colleges]
+    company_ids = np.array([row[0] for row in columns.companies], dtype=np.int64)
+    role_names, company_roles = np.unique(np.array([row[2] for row in columns.companies], dtype=object), return_inverse=True)
+    company_ctc = np.array([row[3] for row in columns.companies], dtype=np.float64)
+    pairs = placement_ids(columns.placements)
+
+    companies = id_positions(company_ids)[pairs[:, 1]]
+    colleges = id_positions(college_ids)[pairs[:, 0]]
+    ctc = company_ctc[companies]
+    keep = np.isfinite(ctc)
+    ctc, colleges, roles = ctc[keep], colleges[keep], company_roles.reshape(-1)[companies][keep]
+    return Snapshot(version=version, ctc=np.sort(ctc), colleges=GroupIndex(college_names, colleges, ctc),
+                    roles=GroupIndex(role_names.tolist(), roles, ctc))
+
+def _change(value: Optional[float], baseline: Optional[float]) -> Optional[float]:
+    return value - baseline if value is not None and baseline is not None else None
+
+def _change_pct(value: Optional[float], baseline: Optional[float]) -> Optional[float]:
+    return (value - baseline) / baseline * 100 if value is not None and baseline else None
+
+def compare_groups(snapshot: Snapshot, groups: Dict[str, List[str]], percentiles: Sequence[float]) -> List[GroupComparison]:
+    """CTC of each group of colleges, the first group is the baseline of the changes."""
+    comparison: List[GroupComparison] = []
+    baseline: Optional[CtcSummary] = None
+    for name, college_names in groups.items():
+        found = [college for college in college_names if college in snapshot.colleges.codes]
+        summary = summarize(snapshot.colleges.group_values([snapshot.colleges.codes[college] for college in found]), percentiles)
+        comparison.append(GroupComparison(
+            name=name, colleges=found, missing=[college for college in college_names if college not in snapshot.colleges.codes], summary=summary,
+            median_change=_change(summary.percentiles.get("p50"), baseline.percentiles.get("p50")) if baseline else None,
+            median_change_pct=_change_pct(summary.percentiles.get("p50"), baseline.percentiles.get("p50")) if baseline else None,
+            mean_change=_change(summary.mean, baseline.mean) if baseline else None,
+            mean_change_pct=_change_pct(summary.mean, baseline.mean) if baseline else None,
+        ))
+        if baseline is None: baseline = summary
+    return comparison
+
+def distribution_report(snapshot: Snapshot, percentiles: Sequence[float] = DEFAULT_PERCENTILES, bins: int = DEFAULT_BINS,
+                        limit: int = DEFAULT_GROUP_LIMIT, groups: Optional[Dict[str, List[str]]] = None) -> DistributionReport:
+    # Group comparisons always carry the median, the changes are computed from it
+    group_percentiles = tuple(percentiles) + ((50,) if 50 not in percentiles else ())
+    return DistributionReport(
+        version=snapshot.version,
+        summary=summarize(snapshot.ctc, percentiles),
+        histogram=histogram(snapshot.ctc, bins),
+        role_medians=snapshot.roles.top(limit),
+        college_medians=snapshot.colleges.top(limit),
+        comparison=compare_groups(snapshot, groups or {}, group_percentiles),
+    )
@@ -0,0 +1,146 @@
+"""
+Write-through name -> id caches for colleges and (company_name, role, ctc) tuples, so `add_data` can skip its lookups.
+
+Entries found or created by a write stay private to its session and are published when it commits (dropped on
+rollback). Deletes invalidate right away and again after the commit, in case a concurrent write cached the row
+meanwhile. Writers bump the dataset version first (see `PostgreSQL.bump_version`): the cache only answers a
+transaction whose bump directly follows the last version it knows, so a write by another process empties it.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from cache import CacheStats
+from constants import IDENTITY_CACHE_MAX_ENTRIES
+
+SESSION_KEY = "identity_caches"
+
+class IdentityCache:
+    """One bounded LRU map from natural key to id, guarded by the lock of its `IdentityCaches`."""
+    def __init__(self, name: str, max_entries: int):
+        self.name = name
+        self.max_entries = max_entries
+        self.hits = self.misses = self.evictions = 0
+        self._entries: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._keys: Dict[int, Hashable] = {} # id -> key, deletes come in by id
+    def _get(self, key: Hashable) -> Optional[int]:
+        value = self._entries.get(key)
+        if value is None: self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return value
+    def _put(self, key: Hashable, value: int) -> None:
+        self._drop(self._keys.get(value))
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._keys[value] = key
+        while len(self._entries) > self.max_entries:
+            _, old_value = self._entries.popitem(last=False)
+            self._keys.pop(old_value, None)
+            self.evictions += 1
+    def _drop(self, key: Optional[Hashable]) -> None:
+        if key is None: return
+        value = self._entries.pop(key, None)
+        if value is not None: self._keys.pop(value, None)
+    def _invalidate(self, ids: Iterable[int]) -> None:
+        for value in ids: self._drop(self._keys.get(value))
+    def _clear(self) -> None:
+        self._entries.clear()
+        self._keys.clear()
+    def stats(self) -> CacheStats:
+        return CacheStats(backend=self.name, hits=self.hits, misses=self.misses, evictions=self.evictions, size=len(self._entries))
+
+class _Pending:
+    """What one transaction learned, kept in `session.info` until it ends."""
+    __slots__ = ("owner", "version", "synced", "entries", "invalidated")
+    def __init__(self, owner: "IdentityCaches"):
+        self.owner = owner
+        self.version: Optional[int] = None # dataset version written by this transaction
+        self.synced = False # no other writer committed between the caches' version and ours
+        self.entries: Dict[str, Dict[Hashable, int]] = {}
+        self.invalidated: Dict[str, List[int]] = {}
+
+class IdentityCaches:
+    def __init__(self, max_entries: int = IDENTITY_CACHE_MAX_ENTRIES):
+        self._lock = threading.Lock()
+        self.colleges = IdentityCache("colleges", max_entries)
+        self.companies = IdentityCache("companies", max_entries)
+        self.version: Optional[int] = None # dataset version the entries are valid for
+    def _caches(self) -> List[IdentityCache]: return [self.colleges, self.companies]
+
+    def _pending(self, session: Session) -> _Pending:
+        pending = session.info.get(SESSION_KEY)
+        if pending is None: pending = session.info[SESSION_KEY] = _Pending(self)
+        return pending
+
+    def observe_version(self, session: Session, version: int) -> None:
+        """Records the version a bump in this transaction wrote, the caches serve it only if nobody else wrote in between."""
+        pending = self._pending(session)
+        with self._lock:
+            expected = pending.version if pending.version is not None else self.version
+            pending.synced = (pending.version is None or pending.synced) and expected is not None and version == expected + 1
+        pending.version = version
+
+    def get(self, session: Session, cache: IdentityCache, key: Hashable) -> Optional[int]:
+        pending: Optional[_Pending] = session.info.get(SESSION_KEY)
+        if pending is not None:
+            value = pending.entries.get(cache.name, {}).get(key)
+            if value is not None: return value
+        if pending is None or not pending.synced: return None
+        with self._lock: return cache._get(key)
+
+    def put(self, session: Session, cache: IdentityCache, key: Hashable, value: int) -> None:
+        """Remembers an id read or inserted by this session, shared once it commits."""
+        self._pending(session).entries.setdefault(cache.name, {})[key] = value
+
+    def invalidate(self, session: Session, cache: IdentityCache, ids: Iterable[int]) -> None:
+        ids = list(ids)
+        if not ids: return
+        pending = self._pending(session)
+        pending.invalidated.setdefault(cache.name, []).extend(ids)
+        for key in [key for key, value in pending.entries.get(cache.name, {}).items() if value in ids]:
+            del pending.entries[cache.name][key]
+        with self._lock: cache._invalidate(ids)
+
+    def warm(self, version: int, colleges: Iterable[Any], companies: Iterable[Any]) -> None:
+        """Fills both caches with (key, id) pairs read after `version`, unless a newer write was already published."""
+        with self._lock:
+            if self.version is not None and version < self.version: return
+            for cache in self._caches(): cache._clear()
+            for key, value in colleges: self.colleges._put(key, value)
+            for key, value in companies: self.companies._put(key, value)
+            self.version = version
+
+    def _publish(self, pending: _Pending) -> None:
+        with self._lock:
+            for cache in self._caches(): cache._invalidate(pending.invalidated.get(cache.name, ()))
+            if pending.version is None: return
+            # A write published out of order, its entries may predate the newer write's deletes
+            if self.version is not None and pending.version <= self.version: return
+            if not pending.synced:
+                for cache in self._caches(): cache._clear()
+            for cache in self._caches():
+                for key, value in pending.entries.get(cache.name, {}).items(): cache._put(key, value)
+            self.version = pending.version
+
+    def clear(self) -> None:
+        with self._lock:
+            for cache in self._caches(): cache._clear()
+            self.version = None
+
+    def stats(self) -> List[CacheStats]:
+        with self._lock: return [cache.stats() for cache in self._caches()]
+
+@event.listens_for(Session, "after_commit")
+def _publish_on_commit(session: Session) -> None:
+    pending: Optional[_Pending] = session.info.pop(SESSION_KEY, None)
+    if pending is not None: pending.owner._publish(pending)
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_on_end(session: Session, transaction: Any) -> None:
+    # Rollbacks and closed sessions, a commit already took its entries
+    if transaction.parent is None: session.info.pop(SESSION_KEY, None)
@@ -0,0 +1,172 @@
+"""
+Background imports. `ImportJobRunner.submit` spools an upload to `JOB_SPOOL_DIR` and returns a job id at once. A pool
+of `JOB_WORKERS` threads then parses the file in chunks of `JOB_CHUNK_ROWS` rows, each written in one transaction
+together with the job's checkpoint (`PostgreSQL.import_job_chunk`), so a job holds one chunk in memory and a job whose
+process died resumes after its last committed chunk. Progress, rejected rows, throughput and ETA live in `import_jobs`.
+"""
+import io, logging, os, threading, time, uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from constants import JOB_SPOOL_DIR, JOB_WORKERS, JOB_CHUNK_ROWS, JOB_STALE_SECONDS
+from models import PostgreSQL, INGEST_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+JOB_FORMATS = {".csv": "csv", ".parquet": "parquet"}
+SPOOL_BLOCK_SIZE = 1 << 20
+
+class JobError(ValueError):
+    """An upload that can't become a job (file type, columns), the client's mistake."""
+
+def spool(stream: BinaryIO, path: str) -> int:
+    """Copies an upload to disk block by block, returns its number of lines."""
+    lines, last = 0, b"\n"
+    with open(path, "wb") as out:
+        while True:
+            block = stream.read(SPOOL_BLOCK_SIZE)
+            if not block: break
+            lines += block.count(b"\n")
+            last = block[-1:]
+            out.write(block)
+    return lines + (last != b"\n") # an unterminated last line
+
+def inspect(path: str, file_format: str, lines: int) -> Tuple[List[str], Optional[int]]:
+    """The columns of a spooled upload and its row count (estimated from the lines for CSV, quoted line breaks count too)."""
+    if file_format == "csv":
+        import pandas as pd
+        return list(pd.read_csv(path, nrows=0).columns), max(lines - 1, 0)
+    from arrow_io import open_parquet
+    with open(path, "rb") as f:
+        parquet = open_parquet(f)
+        return parquet.schema_arrow.names, parquet.metadata.num_rows
+
+def _csv_records(f: BinaryIO, chunk_rows: int) -> Iterator[bytes]:
+    """The lines of `f` from its position on, `chunk_rows` records at a time. A record ends on a line break outside of
+    quotes: where the quotes read so far are even (an escaped quote is two of them)."""
+    lines: List[bytes] = []
+    records = quotes = 0
+    for line in f:
+        lines.append(line)
+        quotes += line.count(b'"')
+        if quotes % 2: continue
+        records += 1
+        if records == chunk_rows:
+            yield b"".join(lines)
+            lines, records = [], 0
+    if lines: yield b"".join(lines)
+
+def iter_chunks(path: str, file_format: str, start: int, chunk_rows: int, offset: Optional[int] = None) -> Iterator[Tuple[int, List[Dict[str, Any]], Optional[int]]]:
+    """
+    (first row, records, offset) chunks of a spooled upload from row `start` on, at most `chunk_rows` records each.
+    For CSV, `offset` is the byte offset of row `start` (None: right after the header) and the offset yielded the one
+    of the row after the chunk, what the job resumes from: counting lines to skip would miscount quoted line breaks.
+    """
+    if file_format == "csv":
+        import pandas as pd
+        # Text columns stay strings, otherwise each chunk would guess its own types (a phone number as a float)
+        dtype = {col: str for col in INGEST_COLUMNS if col != "ctc"}
+        with open(path, "rb") as f:
+            header = f.readline()
+            if offset is not None: f.seek(offset)
+            position = start
+            for chunk in _csv_records(f, chunk_rows):
+                frame = pd.read_csv(io.BytesIO(header + chunk), usecols=INGEST_COLUMNS, dtype=dtype)
+                yield position, frame.to_dict('records'), f.tell()
+                position += len(frame)
+        return
+    from arrow_io import open_parquet
+    with open(path, "rb") as f:
+        position = 0
+        for batch in open_parquet(f).iter_batches(batch_size=chunk_rows, columns=INGEST_COLUMNS):
+            if position + batch.num_rows > start:
+                skip = max(start - position, 0)
+                yield position + skip, batch.slice(skip).to_pylist(), None
+            position += batch.num_rows
+
+class ImportJobRunner:
+    """Spools uploads and runs their imports on a thread pool, started by the first job."""
+    def __init__(self, db: PostgreSQL, spool_dir: str = JOB_SPOOL_DIR, workers: int = JOB_WORKERS, chunk_rows: int = JOB_CHUNK_ROWS,
+                 stale_seconds: float = JOB_STALE_SECONDS):
+        self.db = db
+        self.spool_dir = spool_dir
+        self.workers = workers
+        self.chunk_rows = chunk_rows
+        self.stale_seconds = stale_seconds
+        self.owner = uuid.uuid4().hex # claims jobs for this runner
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self._stopping = threading.Event()
+
+    def submit(self, stream: BinaryIO, filename: str, schedule: bool = True) -> str:
+        """Spools an upload and queues its import, returns the job id. Raises `JobError` for unusable files."""
+        file_format = JOB_FORMATS.get(os.path.splitext(filename)[1].lower())
+        if file_format is None: raise JobError("Invalid file type. Only CSV and Parquet files are allowed.")
+        os.makedirs(self.spool_dir, exist_ok=True)
+        job_id = uuid.uuid4().hex
+        path = os.path.join(self.spool_dir, f"{job_id}.{file_format}")
+        try:
+            lines = spool(stream, path)
+            try: columns, total_rows = inspect(path, file_format, lines)
+            except Exception as e: raise JobError(f"Error processing the file: {str(e)}") from e
+            missing_columns = [col for col in INGEST_COLUMNS if col not in columns]
+            if missing_columns: raise JobError("Missing columns: " + ", ".join(missing_columns))
+            try: self.db.create_import_job(job_id, filename, file_format, path, total_rows)
+            finally: self.db.remove()
+        except Exception:
+            if os.path.exists(path): os.remove(path)
+            raise
+        if schedule: self.schedule(job_id)
+        return job_id
+
+    def schedule(self, job_id: str) -> Future:
+        with self._lock:
+            future = self._futures.get(job_id)
+            if future is None or future.done():
+                if self._executor is None: self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="import-job")
+                future = self._futures[job_id] = self._executor.submit(self._run, job_id)
+            return future
+
+    def resume(self, db: Optional[PostgreSQL] = None) -> List[str]:
+        """Schedules the jobs left queued or abandoned, e.g. by a previous process. `db` overrides the runner's for the lookup."""
+        db = db or self.db
+        try: job_ids = db.resumable_import_jobs(time.time() - self.stale_seconds)
+        finally: db.remove()
+        for job_id in job_ids: self.schedule(job_id)
+        return job_ids
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> None:
+        with self._lock: future = self._futures.get(job_id)
+        if future is not None: future.result(timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops after the chunks being written, unfinished jobs go back to the queue."""
+        self._stopping.set()
+        with self._lock: executor, self._executor = self._executor, None
+        if executor is not None: executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job_id: str) -> None:
+        db = self.db
+        try:
+            job = db.claim_import_job(job_id, self.owner, time.time() - self.stale_seconds)
+            if job is None: return # finished, or another runner holds it
+            db.remove()
+            try:
+                chunks = iter_chunks(job.path, job.file_format, job.rows_processed, self.chunk_rows, job.checkpoint_offset)
+                while True:
+                    if self._stopping.is_set(): return db.release_import_job(job_id, self.owner)
+                    started = time.perf_counter()
+                    chunk = next(chunks, None)
+                    if chunk is None: break
+                    start, records, offset = chunk
+                    if not db.import_job_chunk(job_id, self.owner, records, start, offset, parse_seconds=time.perf_counter() - started): return
+                    db.remove()
+                db.finish_import_job(job_id, self.owner)
+            except Exception as e:
+                # Chunks committed so far stay, the job reports why it stopped
+                logger.exception("Import job %s failed", job_id)
+                db.session.rollback()
+                db.finish_import_job(job_id, self.owner, error=str(e))
+            if os.path.exists(job.path): os.remove(job.path)
+        finally: db.remove()
@@ -0,0 +1,76 @@
+"""
+Pluggable JSON encoding for every response. `JSON_BACKEND` picks orjson (optional dependency, several times faster)
+or the standard library; `auto` uses orjson when it is installed. Both produce compact JSON with sorted keys, like
+Flask's default provider.
+"""
+import json
+from json.encoder import encode_basestring_ascii
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Optional
+
+from flask.json.provider import DefaultJSONProvider
+
+from constants import JSON_BACKEND
+
+try: import orjson # optional dependency, the stdlib encoder is used without it
+except ImportError: orjson = None
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, tuple): return list(obj) # NamedTuples, orjson only takes plain tuples
+    return DefaultJSONProvider.default(obj)
+
+class JSONBackend(ABC):
+    name: str = "abstract"
+    @abstractmethod
+    def dumps(self, obj: Any, default: Callable[[Any], Any] = _default, sort_keys: bool = True, indent: bool = False) -> bytes: ...
+    @abstractmethod
+    def loads(self, data: Any) -> Any: ...
+    def string(self, value: Optional[str]) -> bytes:
+        """One string or null, for fragments assembled by hand."""
+        return b"null" if value is None else self.dumps(value)
+
+class StdlibJSON(JSONBackend):
+    name = "stdlib"
+    def dumps(self, obj: Any, default: Callable[[Any], Any] = _default, sort_keys: bool = True, indent: bool = False) -> bytes:
+        layout = {"indent": 2} if indent else {"separators": (",", ":")}
+        return json.dumps(obj, default=default, sort_keys=sort_keys, **layout).encode()
+    def loads(self, data: Any) -> Any: return json.loads(data)
+    def string(self, value: Optional[str]) -> bytes:
+        return b"null" if value is None else encode_basestring_ascii(value).encode() # json.dumps pays its setup per call
+
+class OrjsonJSON(JSONBackend):
+    """orjson writes UTF-8 instead of \\u escapes and null for NaN / infinity, otherwise the same documents."""
+    name = "orjson"
+    def dumps(self, obj: Any, default: Callable[[Any], Any] = _default, sort_keys: bool = True, indent: bool = False) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0) | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=default, option=option)
+    def loads(self, data: Any) -> Any: return orjson.loads(data)
+
+def get_json_backend(backend: str = JSON_BACKEND) -> JSONBackend:
+    backend = backend.lower()
+    if backend == "auto": backend = OrjsonJSON.name if orjson is not None else StdlibJSON.name
+    if backend == StdlibJSON.name: return StdlibJSON()
+    if backend == OrjsonJSON.name:
+        if orjson is None: raise ValueError("JSON_BACKEND=orjson but orjson is not installed")
+        return OrjsonJSON()
+    raise ValueError(f"Unknown JSON backend {backend}")
+
+json_backend = get_json_backend()
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider on `json_backend`, response bodies are encoded straight to bytes."""
+    def __init__(self, app: Any, backend: Optional[JSONBackend] = None):
+        super().__init__(app)
+        self.backend = backend or json_backend
+    def encode(self, obj: Any, indent: bool = False) -> bytes:
+        return self.backend.dumps(obj, sort_keys=self.sort_keys, indent=indent)
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs: return super().dumps(obj, **kwargs) # explicit json.dumps options
+        return self.encode(obj).decode()
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        if kwargs: return super().loads(s, **kwargs)
+        return self.backend.loads(s)
+    def response(self, *args: Any, **kwargs: Any) -> Any:
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.encode(obj, indent=indent) + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,250 @@
+"""
+Per-request SQL instrumentation and Prometheus metrics for the Flask app.
+
+Engine events count every statement (its time and the rows it returned) into the current request's
+`RequestStats`. The Flask hooks open those stats per request and, once the response has been sent, observe them
+into per-route histograms that `GET /metrics` renders in the Prometheus text format. Statements slower than
+`SLOW_QUERY_MS` are logged with their parameters.
+"""
+import contextlib, contextvars, logging, math, threading, time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from flask import Flask, Response, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.cursor import CursorFetchStrategy
+
+from constants import SLOW_QUERY_MS
+from pool import PoolMonitor
+from json_encoding import FastJSONProvider
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000, math.inf)
+ROW_BUCKETS = (0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, math.inf)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000, math.inf)
+MAX_LOGGED_PARAMETERS = 1000 # characters of repr(parameters) in the slow-query log
+
+def _format_value(value: float) -> str:
+    if math.isinf(value): return "+Inf"
+    return str(int(value)) if float(value).is_integer() and abs(value) < 1e15 else repr(float(value))
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], le: Optional[float] = None) -> str:
+    pairs = [(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")) for name, value in zip(names, values)]
+    if le is not None: pairs.append(("le", _format_value(le)))
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self.lock = threading.Lock()
+        self.values: Dict[Tuple[str, ...], float] = {}
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self.lock: self.values[label_values] = self.values.get(label_values, 0) + amount
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for label_values, value in sorted(self.values.items()): lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...], labels: Tuple[str, ...] = ("route",)):
+        self.name, self.help, self.buckets, self.labels = name, help, buckets, labels
+        self.lock = threading.Lock()
+        self.series: Dict[Tuple[str, ...], List[float]] = {} # label values -> [cumulative bucket counts..., sum, count]
+    def observe(self, value: float, *label_values: str) -> None:
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None: series = self.series[label_values] = [0] * (len(self.buckets) + 2)
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound: series[idx] += 1
+            series[-2] += value
+            series[-1] += 1
+    def count(self, *label_values: str) -> int:
+        with self.lock: return int(self.series[label_values][-1]) if label_values in self.series else 0
+    def sum(self, *label_values: str) -> float:
+        with self.lock: return self.series[label_values][-2] if label_values in self.series else 0.0
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for label_values, series in sorted(self.series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, le=bound)} {int(count)}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, label_values)} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, label_values)} {int(series[-1])}")
+        return lines
+
+class RequestStats:
+    """What one request did, filled by the engine events and the JSON provider."""
+    __slots__ = ("route", "method", "start", "queries", "db_seconds", "rows", "serialize_seconds", "status", "response_bytes", "streamed")
+    def __init__(self, route: str, method: str):
+        self.route = route
+        self.method = method
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.serialize_seconds = 0.0
+        self.status: Optional[int] = None
+        self.response_bytes: Optional[int] = None
+        self.streamed = False
+
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("current_request", default=None)
+
+@contextlib.contextmanager
+def timed_serialization() -> Iterator[None]:
+    """Adds the time spent in the block to the current request's serialization time."""
+    start = time.perf_counter()
+    try: yield
+    finally:
+        stats = current_request.get()
+        if stats is not None: stats.serialize_seconds += time.perf_counter() - start
+
+class TimedJSONProvider(FastJSONProvider):
+    """The app's JSON provider, adding the time spent encoding to the current request's stats."""
+    def encode(self, obj: Any, indent: bool = False) -> bytes:
+        with timed_serialization(): return super().encode(obj, indent=indent)
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if not kwargs: return super().dumps(obj) # timed by encode
+        with timed_serialization(): return super().dumps(obj, **kwargs)
+
+class Metrics:
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS):
+        self.slow_query_seconds = slow_query_ms / 1000 if slow_query_ms > 0 else None
+        self.requests = Counter("http_requests_total", "Requests served.", labels=("route", "method", "status"))
+        self.duration = Histogram("http_request_duration_seconds", "Time from the request arriving to the response being sent.", DURATION_BUCKETS, labels=("route", "method"))
+        self.queries = Histogram("db_queries_per_request", "SQL statements executed per request.", COUNT_BUCKETS)
+        self.db_time = Histogram("db_time_seconds_per_request", "Time spent executing SQL per request.", DURATION_BUCKETS)
+        self.rows = Histogram("db_rows_per_request", "Rows returned by the database per request.", ROW_BUCKETS)
+        self.serialization = Histogram("serialization_seconds_per_request", "Time spent encoding JSON per request.", DURATION_BUCKETS)
+        self.response_size = Histogram("http_response_size_bytes", "Response body size.", SIZE_BUCKETS)
+        self.statements = Histogram("db_statement_duration_seconds", "Duration of every SQL statement.", DURATION_BUCKETS, labels=())
+        self.slow_queries = Counter("db_slow_queries_total", "Statements slower than SLOW_QUERY_MS.")
+        self.pool_monitors: List[PoolMonitor] = []
+
+    # --- Engine ---
+
+    def instrument_engine(self, engine: Engine) -> None:
+        count_rowcount = engine.dialect.name != "sqlite" # sqlite3 reports no rowcount for SELECT, rows are counted as fetched instead
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+            conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+            elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+            self.statements.observe(elapsed)
+            stats = current_request.get()
+            if stats is not None:
+                stats.queries += 1
+                stats.db_seconds += elapsed
+                if cursor.description is None or executemany: pass
+                elif count_rowcount:
+                    if cursor.rowcount > 0: stats.rows += cursor.rowcount
+                elif type(context.cursor_fetch_strategy) is CursorFetchStrategy and not context.execution_options.get("yield_per"):
+                    context.cursor_fetch_strategy = _CountingFetch(stats)
+            if self.slow_query_seconds is not None and elapsed >= self.slow_query_seconds:
+                self.slow_queries.inc()
+                logger.warning("slow query (%.1f ms, %s): %s; parameters: %s", elapsed * 1000, stats.route if stats is not None else "no request",
+                               statement, repr(parameters)[:MAX_LOGGED_PARAMETERS])
+        @event.listens_for(engine, "handle_error")
+        def handle_error(context) -> None:
+            # The statement failed, after_cursor_execute won't pop its start time
+            if context.connection is not None and context.connection.info.get("query_start_time"): context.connection.info["query_start_time"].pop()
+
+    def watch_pool(self, monitor: PoolMonitor) -> None: self.pool_monitors.append(monitor)
+
+    # --- Flask ---
+
+    def init_app(self, app: Flask) -> None:
+        app.json = TimedJSONProvider(app)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', lambda: Response(self.render(), mimetype='text/plain; version=0.0.4'))
+
+    def _before_request(self) -> None:
+        current_request.set(RequestStats(request.url_rule.rule if request.url_rule is not None else "unmatched", request.method))
+
+    def _after_request(self, response: Response) -> Response:
+        stats = current_request.get()
+        if stats is None: return response
+        stats.status = response.status_code
+        if response.is_streamed:
+            # The body is produced after the request is torn down, observe once it's exhausted
+            stats.streamed = True
+            response.response = self._stream(stats, response.response)
+        else:
+            stats.response_bytes = response.calculate_content_length()
+            if response.status_code >= 500 and "Content-Encoding" not in response.headers: logger.error("%s %s -> %d: %s", request.method, request.path, response.status_code, response.get_data(as_text=True)[:500])
+        return response
+
+    def _stream(self, stats: RequestStats, body: Iterable[Any]) -> Iterator[Any]:
+        current_request.set(stats)
+        stats.response_bytes = 0
+        try:
+            for chunk in body:
+                stats.response_bytes += len(chunk)
+                yield chunk
+        except Exception: # not GeneratorExit, a client going away isn't a server error
+            stats.status = 500
+            raise
+        finally:
+            current_request.set(None)
+            self._observe(stats)
+
+    def _teardown_request(self, exc: Optional[BaseException]) -> None:
+        stats = current_request.get()
+        current_request.set(None)
+        if stats is None or stats.streamed: return
+        if exc is not None or stats.status is None: stats.status = 500
+        self._observe(stats)
+
+    def _observe(self, stats: RequestStats) -> None:
+        self.requests.inc(stats.route, stats.method, str(stats.status))
+        self.duration.observe(time.perf_counter() - stats.start, stats.route, stats.method)
+        self.queries.observe(stats.queries, stats.route)
+        self.db_time.observe(stats.db_seconds, stats.route)
+        self.rows.observe(stats.rows, stats.route)
+        self.serialization.observe(stats.serialize_seconds, stats.route)
+        if stats.response_bytes is not None: self.response_size.observe(stats.response_bytes, stats.route)
+
+    # --- Exposition ---
+
+    def _render_pools(self) -> List[str]:
+        if not self.pool_monitors: return []
+        gauges: Dict[str, List[str]] = {name: [] for name in ("size", "checked_out", "checked_in", "overflow")}
+        waits = ["# HELP db_pool_checkout_wait_seconds Time spent waiting for a pooled connection.", "# TYPE db_pool_checkout_wait_seconds histogram"]
+        for idx, monitor in enumerate(self.pool_monitors):
+            stats = monitor.stats()
+            labels = f'{{pool="{idx}"}}'
+            for name in gauges: gauges[name].append(f"db_pool_{name}{labels} {getattr(stats, name)}")
+            for bound, count in stats.wait_buckets.items(): waits.append(f'db_pool_checkout_wait_seconds_bucket{{pool="{idx}",le="{bound}"}} {count}')
+            waits.append(f"db_pool_checkout_wait_seconds_sum{labels} {stats.wait_seconds_sum!r}")
+            waits.append(f"db_pool_checkout_wait_seconds_count{labels} {stats.wait_count}")
+        lines = []
+        for name, values in gauges.items(): lines += [f"# HELP db_pool_{name} Connection pool {name.replace('_', ' ')}.", f"# TYPE db_pool_{name} gauge", *values]
+        return lines + waits
+
+    def render(self) -> str:
+        metrics = (self.requests, self.duration, self.queries, self.db_time, self.rows, self.serialization, self.response_size, self.statements, self.slow_queries)
+        lines = [line for metric in metrics for line in metric.render()] + self._render_pools()
+        return "\n".join(lines) + "\n"
+
+class _CountingFetch(CursorFetchStrategy):
+    """Counts the rows of a SQLite result into `stats` as SQLAlchemy fetches them, once per fetch call rather than per row.
+    Streamed results (yield_per) buffer through their own strategy and go uncounted, as with PostgreSQL's server-side cursors."""
+    __slots__ = ("stats",)
+    def __init__(self, stats: RequestStats): self.stats = stats
+    def fetchone(self, result: Any, dbapi_cursor: Any, hard_close: bool = False) -> Any:
+        row = super().fetchone(result, dbapi_cursor, hard_close)
+        if row is not None: self.stats.rows += 1
+        return row
+    def fetchmany(self, result: Any, dbapi_cursor: Any, size: Optional[int] = None) -> Any:
+        rows = super().fetchmany(result, dbapi_cursor, size)
+        self.stats.rows += len(rows)
+        return rows
+    def fetchall(self, result: Any, dbapi_cursor: Any) -> Any:
+        rows = super().fetchall(result, dbapi_cursor)
+        self.stats.rows += len(rows)
+        return rows
@@ -1,13 +1,28 @@
-from typing import NewType, Union, List, Optional, Any, Tuple, Dict, NamedTuple
+import base64, json, math, threading, time
+from collections import Counter
+from typing import NewType, Union, List, Optional, Any, Tuple, Dict, NamedTuple, Iterable, Iterator, Mapping, Set, Sequence, Callable
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, UniqueConstraint, asc, desc, and_, func # Add func
+from sqlalchemy import create_engine, Column, Integer, BigInteger, String, Float, ForeignKey, UniqueConstraint, Index, text, asc, desc, func, insert, tuple_, literal, update, delete, select, case, bindparam # Add func
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import relationship, declarative_base, Mapped
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.orm import sessionmaker, Session, scoped_session
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.engine import Engine
+from sqlalchemy import inspect as inspect_schema
+from sqlalchemy.engine import Engine, Connection
+from sqlalchemy.sql import Select
+from werkzeug.exceptions import BadRequest
 
-from constants import DEBUG
+from constants import (
+    DEBUG, BULK_INSERT_BATCH_SIZE, MAX_PAGE_SIZE, EXPORT_CHUNK_SIZE, AUTO_CREATE_SCHEMA, JOB_MAX_REJECTED_ROWS, DATABASE_REPLICA_URLS, REPLICA_STRATEGY,
+    AUTOCOMPLETE_LIMIT
+)
+from search_index import SearchIndex, get_search_index
+from pool import PoolMonitor, PoolStats, engine_options, configure_engine, is_memory_sqlite
+from cache import CacheStats
+from identity_cache import IdentityCaches
+from replicas import ReplicaSet, ReplicaStats, RoutingSession, reads, WRITTEN_VERSION_KEY
+from autocomplete import Autocomplete, Suggestion
 
 SortBy = NewType("SortBy", str)
 SortByOptions: Dict[str, SortBy] = {
@@ -22,6 +37,38 @@ OrderOptions: Dict[str, Order] = {
     "desc": Order("desc")
 }
 
+IngestStatus = NewType("IngestStatus", str)
+IngestStatusOptions: Dict[str, IngestStatus] = {
+    "accepted": IngestStatus("accepted"),
+    "duplicate": IngestStatus("duplicate"),
+    "rejected": IngestStatus("rejected")
+}
+BatchOpKind = NewType("BatchOpKind", str)
+BatchOpOptions: Dict[str, BatchOpKind] = {
+    "add": BatchOpKind("add"),
+    "edit": BatchOpKind("edit"),
+    "delete": BatchOpKind("delete")
+}
+BatchStatus = NewType("BatchStatus", str)
+BatchStatusOptions: Dict[str, BatchStatus] = {
+    "added": BatchStatus("added"),
+    "duplicate": BatchStatus("duplicate"),
+    "edited": BatchStatus("edited"),
+    "deleted": BatchStatus("deleted"),
+    "not_found": BatchStatus("not_found"),
+    "invalid": BatchStatus("invalid"),
+    "skipped": BatchStatus("skipped")
+}
+JobStatus = NewType("JobStatus", str)
+JobStatusOptions: Dict[str, JobStatus] = {
+    "queued": JobStatus("queued"),
+    "running": JobStatus("running"),
+    "done": JobStatus("done"),
+    "failed": JobStatus("failed")
+}
+# Columns expected by the bulk ingestion path (same shape as /add and /download)
+INGEST_COLUMNS: List[str] = ['college_name', 'company_name', 'role', 'ctc', 'hr_name', 'linkedin_id', 'email', 'contact_number']
+
 Base: type = declarative_base()
 
 # Association table for the many-to-many relationship
@@ -33,6 +80,11 @@ class CompanyCollege(Base):
     person_id: Mapped[Optional[int]] = Column(Integer, ForeignKey('persons.id'), nullable=True)
     person: Mapped[Optional["Person"]] = relationship("Person", uselist=False, cascade="all, delete-orphan", single_parent=True) # One-to-one relationship
     
+    __table_args__ = (
+        Index('ix_company_college_college_id', 'college_id'), # the primary key leads with company_id
+        Index('ix_company_college_person_id', 'person_id'),
+    )
+    
     @staticmethod
     def get(session: scoped_session, company: "Company", college: "College") -> Optional["CompanyCollege"]:
         existing_relation: Optional[CompanyCollege] = session.query(CompanyCollege).filter_by(company_id=company.id, college_id=college.id).one_or_none()
@@ -81,6 +133,8 @@ class Company(Base):
 
     __table_args__ = (
         UniqueConstraint('company_name', 'role', 'ctc', name='uix_company_role_ctc'),
+        Index('ix_companies_ctc', 'ctc'), # top placements and sorting by ctc
+        Index('ix_companies_role', 'role'),
     )
 
     # Relationship to colleges
@@ -137,11 +191,126 @@ class College(Base):
     def update(self, college_name: Optional[str] = None):
         if college_name is not None: self.college_name = college_name
         
+# --- Analytics rollups, maintained by every write path (see PostgreSQL._apply_rollups) ---
+
+class PlacementStats(Base):
+    __tablename__ = 'placement_stats'
+    SINGLETON_ID = 1 # the table holds exactly one row
+    
+    id: Mapped[int] = Column(Integer, primary_key=True)
+    total_placements: Mapped[int] = Column(Integer, nullable=False, default=0)
+    ctc_sum: Mapped[float] = Column(Float, nullable=False, default=0.0)
+    ctc_min: Mapped[Optional[float]] = Column(Float, nullable=True)
+    ctc_max: Mapped[Optional[float]] = Column(Float, nullable=True)
+
+class CompanyVisits(Base):
+    __tablename__ = 'company_visits'
+    
+    company_id: Mapped[int] = Column(Integer, ForeignKey('companies.id', ondelete='CASCADE'), primary_key=True)
+    visit_count: Mapped[int] = Column(Integer, nullable=False, default=0, index=True)
+
+class CollegeVisits(Base):
+    __tablename__ = 'college_visits'
+    
+    college_id: Mapped[int] = Column(Integer, ForeignKey('colleges.id', ondelete='CASCADE'), primary_key=True)
+    visit_count: Mapped[int] = Column(Integer, nullable=False, default=0, index=True)
+
+class DatasetVersion(Base):
+    """Single-row counter bumped by every write, read caches key their entries on it."""
+    __tablename__ = 'dataset_version'
+    SINGLETON_ID = 1
+    
+    id: Mapped[int] = Column(Integer, primary_key=True)
+    version: Mapped[int] = Column(Integer, nullable=False, default=0)
+
+class SchemaMigration(Base):
+    __tablename__ = 'schema_migrations'
+    
+    version: Mapped[int] = Column(Integer, primary_key=True)
+    name: Mapped[str] = Column(String, nullable=False)
+    applied_at: Mapped[float] = Column(Float, nullable=False) # unix timestamp
+
+class ImportJob(Base):
+    """A background import (jobs.py): its spooled upload, who works on it and how far it got."""
+    __tablename__ = 'import_jobs'
+
+    id: Mapped[str] = Column(String(32), primary_key=True)
+    filename: Mapped[str] = Column(String, nullable=False)
+    file_format: Mapped[str] = Column(String, nullable=False) # csv | parquet
+    path: Mapped[str] = Column(String, nullable=False) # the spooled upload, deleted once the job ends
+    status: Mapped[str] = Column(String, nullable=False, default=JobStatusOptions["queued"])
+    owner: Mapped[Optional[str]] = Column(String, nullable=True) # the runner holding the job
+    total_rows: Mapped[Optional[int]] = Column(Integer, nullable=True) # estimated from line breaks for CSV
+    checkpoint_row: Mapped[int] = Column(Integer, nullable=False, default=0) # rows committed, the job resumes there
+    checkpoint_offset: Mapped[Optional[int]] = Column(BigInteger, nullable=True) # CSV: byte offset of the row at checkpoint_row
+    accepted: Mapped[int] = Column(Integer, nullable=False, default=0)
+    duplicates: Mapped[int] = Column(Integer, nullable=False, default=0)
+    rejected: Mapped[int] = Column(Integer, nullable=False, default=0)
+    rejected_rows: Mapped[str] = Column(String, nullable=False, default="[]") # JSON, the first JOB_MAX_REJECTED_ROWS
+    error: Mapped[Optional[str]] = Column(String, nullable=True)
+    processing_seconds: Mapped[float] = Column(Float, nullable=False, default=0.0) # spent on committed chunks
+    created_at: Mapped[float] = Column(Float, nullable=False) # unix timestamps
+    started_at: Mapped[Optional[float]] = Column(Float, nullable=True)
+    heartbeat_at: Mapped[Optional[float]] = Column(Float, nullable=True) # last commit of the owner
+    finished_at: Mapped[Optional[float]] = Column(Float, nullable=True)
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[Connection], None] # runs inside the migration's transaction, should be idempotent
+
+def _create_indexes(*indexes: Index) -> Callable[[Connection], None]:
+    def apply(conn: Connection) -> None:
+        for index in indexes: index.create(conn, checkfirst=True)
+    return apply
+
+def _add_columns(*columns: Column) -> Callable[[Connection], None]:
+    def apply(conn: Connection) -> None:
+        for column in columns:
+            if column.name in {existing["name"] for existing in inspect_schema(conn).get_columns(column.table.name)}: continue
+            conn.execute(text(f"ALTER TABLE {column.table.name} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}"))
+    return apply
+
 class ItemPerson(NamedTuple):
     college: College
     company: Company
     person: Optional[Person] = None
 
+class PlacementRow(NamedTuple):
+    """One placement as plain values, what the listing endpoints serialize."""
+    college_id: int
+    company_id: int
+    college_name: str
+    company_name: str
+    role: str
+    ctc: float
+    hr_name: Optional[str] = None
+    linkedin_id: Optional[str] = None
+    email: Optional[str] = None
+    contact_number: Optional[str] = None
+
+class Page(NamedTuple):
+    items: List[Union[ItemPerson, PlacementRow]]
+    next_cursor: Optional[str] # opaque, pass it back to get the next page; None on the last page
+    total: Optional[int] = None # only computed when asked for
+
+class PlacementQuery(NamedTuple):
+    """Filters, order and page of a placement listing, `PostgreSQL.query_rows` compiles it into one statement."""
+    college_name: Optional[str] = None # case-insensitive substrings, matched through the search index
+    company_name: Optional[str] = None
+    role: Optional[str] = None
+    ctc_min: Optional[float] = None # inclusive bounds on the company's ctc
+    ctc_max: Optional[float] = None
+    sort_by: Optional[SortBy] = None # None: best matches first when searching, storage order otherwise
+    order: Order = OrderOptions["asc"]
+    limit: Optional[int] = None # keyset pages of at most `limit` rows, None returns every row at once
+    cursor: Optional[str] = None
+    with_total: bool = False
+    @property
+    def searches(self) -> bool: return bool(self.college_name or self.company_name or self.role)
+    @property
+    def has_filters(self) -> bool: return self.searches or self.ctc_min is not None or self.ctc_max is not None
+
 class AnalyticsSummary(NamedTuple):
     total_colleges: int
     total_companies: int # Unique company definitions (name, role, ctc)
@@ -160,25 +329,280 @@ class TopCtcItem(NamedTuple):
     ctc: float
     college_name: str # Added college context for highest CTC
 
+class CtcSummary(NamedTuple):
+    count: int
+    mean: Optional[float] # None without placements, like the rest
+    std: Optional[float]
+    min: Optional[float]
+    max: Optional[float]
+    percentiles: Dict[str, float] # "p90" -> value, linear interpolation between ranks
+
+class CtcHistogram(NamedTuple):
+    edges: List[float] # bins + 1 bounds, each bin includes its lower bound, the last one its upper bound too
+    counts: List[int]
+
+class GroupMedian(NamedTuple):
+    name: str # role or college name
+    count: int
+    median: float
+
+class GroupComparison(NamedTuple):
+    name: str
+    colleges: List[str] # the group's colleges found in the dataset
+    missing: List[str] # the ones that aren't
+    summary: CtcSummary
+    median_change: Optional[float] # against the first group, None for the first group itself
+    median_change_pct: Optional[float]
+    mean_change: Optional[float]
+    mean_change_pct: Optional[float]
+
+class DistributionReport(NamedTuple):
+    version: int # dataset version of the snapshot
+    summary: CtcSummary
+    histogram: CtcHistogram
+    role_medians: List[GroupMedian] # most placements first
+    college_medians: List[GroupMedian]
+    comparison: List[GroupComparison]
+
+class PlacementColumns(NamedTuple):
+    """The placement tables as plain tuples, what the in-memory copies (distribution.py, columnar.py) are built from."""
+    colleges: List[Tuple[int, str]] # (id, college_name)
+    companies: List[Tuple[int, str, str, float]] # (id, company_name, role, ctc)
+    persons: List[Tuple[int, Optional[str], Optional[str], Optional[str], Optional[str]]] # (id, name, linkedin_id, email, contact_number), when asked for
+    placements: Iterator[Sequence[Tuple[int, int, int]]] # (college_id, company_id, person_id or -1) chunks
+
+class NameCounts(NamedTuple):
+    """The colleges and companies that have placements with their visit counts, what autocomplete.py is built from."""
+    colleges: List[Tuple[int, str, int]] # (id, college_name, placements)
+    companies: List[Tuple[int, str, str, int]] # (id, company_name, role, placements)
+
+class RollupDiff(NamedTuple):
+    stats: Dict[str, Tuple[Any, Any]] # field -> (stored, recomputed), mismatches only
+    companies: Dict[int, Tuple[int, int]] # company_id -> (stored, recomputed) visit counts
+    colleges: Dict[int, Tuple[int, int]] # college_id -> (stored, recomputed) visit counts
+    @property
+    def consistent(self) -> bool: return not (self.stats or self.companies or self.colleges)
+
+class PlacementKey(NamedTuple):
+    """Natural key of a placement, what /delete-college-company identifies it by."""
+    college_name: str
+    company_name: str
+    role: str
+    ctc: float
+
+class IngestRow(NamedTuple):
+    college_name: str
+    company_name: str
+    role: str
+    ctc: float
+    hr_name: Optional[str] = None
+    linkedin_id: Optional[str] = None
+    email: Optional[str] = None
+    contact_number: Optional[str] = None
+    @property
+    def has_person(self) -> bool: return not (self.hr_name is None and self.linkedin_id is None and self.email is None and self.contact_number is None)
+    @property
+    def key(self) -> PlacementKey: return PlacementKey(self.college_name, self.company_name, self.role, self.ctc)
+
+class IngestRowResult(NamedTuple):
+    row: int # 0-based position in the uploaded records
+    status: IngestStatus
+    reason: Optional[str] = None
+
+class IngestReport(NamedTuple):
+    accepted: int
+    duplicates: int
+    rejected: int
+    rows: List[IngestRowResult]
+    elapsed_seconds: float
+    rows_per_second: float
+
+class ImportJobInfo(NamedTuple):
+    id: str
+    filename: str
+    file_format: str
+    path: str
+    status: JobStatus
+    total_rows: Optional[int]
+    rows_processed: int
+    checkpoint_offset: Optional[int] # where a CSV job resumes, see `import_job_chunk`
+    accepted: int
+    duplicates: int
+    rejected: int
+    rejected_rows: List[IngestRowResult]
+    error: Optional[str]
+    processing_seconds: float
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    @property
+    def rows_per_second(self) -> Optional[float]:
+        return self.rows_processed / self.processing_seconds if self.processing_seconds > 0 else None
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        if self.status in (JobStatusOptions["done"], JobStatusOptions["failed"]): return 0.0
+        if self.total_rows is None or not self.rows_per_second: return None
+        return max(self.total_rows - self.rows_processed, 0) / self.rows_per_second
+
+class BatchOp(NamedTuple):
+    op: BatchOpKind
+    old: Optional[PlacementKey] = None # placement removed by edit / delete
+    new: Optional[IngestRow] = None # placement written by add / edit
+
+class BatchOpResult(NamedTuple):
+    index: int # 0-based position in the batch
+    op: Optional[BatchOpKind]
+    status: BatchStatus
+    reason: Optional[str] = None
+
+class BatchReport(NamedTuple):
+    applied: bool # False when an operation failed and nothing was written
+    results: List[BatchOpResult]
+    elapsed_seconds: float
+
+# Schema changes for databases created by an older version, applied in order by `PostgreSQL.migrate`.
+# Fresh databases get the same objects from `create_all`, the migrations then only get recorded.
+MIGRATIONS: List[Migration] = [
+    Migration(1, "lookup indexes on company_college and companies", _create_indexes(
+        *(index for index in CompanyCollege.__table__.indexes if index.name in ('ix_company_college_college_id', 'ix_company_college_person_id')),
+        *(index for index in Company.__table__.indexes if index.name in ('ix_companies_ctc', 'ix_companies_role')),
+    )),
+    Migration(2, "import_jobs.checkpoint_offset", _add_columns(ImportJob.__table__.c.checkpoint_offset)),
+]
+
+# Selected by the projection read path, in `PlacementRow` order
+PLACEMENT_ROW_COLUMNS = (
+    CompanyCollege.college_id, CompanyCollege.company_id, College.college_name,
+    Company.company_name, Company.role, Company.ctc,
+    Person.name, Person.linkedin_id, Person.email, Person.contact_number,
+)
+
+def placement_select(projection: bool = False) -> Select:
+    """company_college joined with its college, company and (optional) person, as entities or as `PLACEMENT_ROW_COLUMNS`."""
+    columns = PLACEMENT_ROW_COLUMNS if projection else (College, Company, Person)
+    return (
+        select(*columns)
+            .select_from(CompanyCollege)
+            .join(College, CompanyCollege.college_id == College.id)
+            .join(Company, CompanyCollege.company_id == Company.id)
+            .outerjoin(Person, CompanyCollege.person_id == Person.id)
+    )
+
+def export_select() -> Select:
+    """Every placement as plain values in `INGEST_COLUMNS` order, what /download writes."""
+    return (
+        select(College.college_name, Company.company_name, Company.role, Company.ctc,
+               Person.name, Person.linkedin_id, Person.email, Person.contact_number)
+            .select_from(CompanyCollege)
+            .join(College, CompanyCollege.college_id == College.id)
+            .join(Company, CompanyCollege.company_id == Company.id)
+            .outerjoin(Person, CompanyCollege.person_id == Person.id)
+    )
+
+def get_sort_column(sort_by: SortBy):
+    # Define valid columns to sort 
+    valid_sort_columns = {
+        SortByOptions["college_name"]: College.college_name,
+        SortByOptions["company_name"]: Company.company_name,
+        SortByOptions["role"]: Company.role,
+        SortByOptions["ctc"]: Company.ctc
+    }
+    valid_sort_col = valid_sort_columns.get(sort_by)
+    if valid_sort_col is None: raise ValueError(f"Invalid sort column specified. Must be an instance of SortBy enum not {sort_by}.")
+    return valid_sort_col
+
+def encode_cursor(sort_by: SortBy, order: Order, value: Any, company_id: int, college_id: int) -> str:
+    payload = json.dumps([sort_by, order, value, company_id, college_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(cursor: str, sort_by: SortBy, order: Order) -> Tuple[Any, int, int]:
+    """The position a cursor resumes after, `BadRequest` (the client sent it) when it isn't one of this sort order."""
+    try:
+        cursor_sort_by, cursor_order, value, company_id, college_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        company_id, college_id = int(company_id), int(college_id)
+    except Exception as e: raise BadRequest("Invalid cursor") from e
+    if cursor_sort_by != sort_by or cursor_order != order: raise BadRequest("Cursor does not belong to this sort order")
+    return value, company_id, college_id
+
+def clean_text(value: Any) -> Optional[str]:
+    # pandas hands missing cells over as NaN, treat them like None
+    if value is None or (isinstance(value, float) and math.isnan(value)): return None
+    value = str(value).strip()
+    return value if value else None
+
+def _chunked(values: Sequence[Any], size: int) -> Iterable[Sequence[Any]]:
+    for i in range(0, len(values), size): yield values[i:i+size]
+
+
+def _fetch_chunks(result: Any, chunk_size: int) -> Iterator[Sequence[Tuple[Any, ...]]]:
+    """The plain DBAPI rows of a Core result, `chunk_size` at a time: a million rows without building Row objects."""
+    try:
+        while True:
+            rows = result.cursor.fetchmany(chunk_size)
+            if not rows: return
+            yield rows
+    finally: result.close()
+
+def _probe_version(conn: Connection) -> int:
+    """Dataset version of a replica, its health check."""
+    return conn.execute(select(DatasetVersion.version).where(DatasetVersion.id == DatasetVersion.SINGLETON_ID)).scalar() or 0
 
 class PostgreSQL:
-    def __init__(self, db_url:str):
+    def __init__(self, db_url:str, create_schema:bool=AUTO_CREATE_SCHEMA, replica_urls:Sequence[str]=DATABASE_REPLICA_URLS,
+                 replica_strategy:str=REPLICA_STRATEGY):
         self.db_url = db_url
-        self.engine: Engine = create_engine(self.db_url)
-        self.create_all()
+        self.pool_monitor = PoolMonitor()
+        self.engine: Engine = create_engine(self.db_url, **engine_options(self.db_url, self.pool_monitor))
+        configure_engine(self.engine, self.pool_monitor)
+        self.search_index: SearchIndex = get_search_index(self.engine)
+        self.identities = IdentityCaches()
+        # Reads of `@reads` methods go to a replica when there are any, see replicas.py
+        self.replicas: Optional[ReplicaSet] = ReplicaSet(replica_urls, _probe_version, strategy=replica_strategy) if replica_urls else None
+        # In-memory copy of the placements answering `query_rows` (columnar.ColumnStore), attached by the app when enabled
+        self.columns: Optional[Any] = None
+        # Typeahead index over the college names, company names and roles, see autocomplete.py
+        self.autocomplete = Autocomplete()
         # self._session:Optional[Session] = None
         
-        SessionFactory = sessionmaker(bind=self.engine)
+        SessionFactory = sessionmaker(bind=self.engine, class_=RoutingSession.bound_to(self.replicas))
         self.session: scoped_session = scoped_session(SessionFactory)
+        # In-memory databases start empty every time, anything else is created once (`init-db`)
+        if create_schema or is_memory_sqlite(self.db_url): self.create_all()
     
-    def remove(self)->None: return self.session.remove()  
-    def create_all(self):
-        # Create the database and tables
+    def remove(self)->None: return self.session.remove()
+    def pool_stats(self) -> PoolStats: return self.pool_monitor.stats()
+    def identity_cache_stats(self) -> List[CacheStats]: return self.identities.stats()
+    def replica_stats(self) -> List[ReplicaStats]: return self.replicas.stats() if self.replicas is not None else []
+    def create_all(self) -> List[int]:
+        """Creates missing tables and applies pending migrations, safe to run again. Returns the applied migration versions."""
         Base.metadata.create_all(self.engine)
+        applied = self.migrate()
+        self.search_index.install(self.engine)
+        self._ensure_rollups()
+        with self.engine.begin() as conn:
+            if conn.execute(select(DatasetVersion.id)).first() is None:
+                conn.execute(insert(DatasetVersion).values(id=DatasetVersion.SINGLETON_ID, version=0))
+        return applied
+    def migrate(self, migrations: Sequence[Migration] = MIGRATIONS) -> List[int]:
+        """Applies the migrations not yet recorded in schema_migrations, each in its own transaction. Returns the applied versions."""
+        applied: List[int] = []
+        for migration in sorted(migrations, key=lambda migration: migration.version):
+            with self.engine.begin() as conn:
+                # Several workers may start at once: serialize them on PostgreSQL, then re-check under the lock
+                if self.engine.dialect.name == "postgresql": conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": 0x636f6c6c})
+                if conn.execute(select(SchemaMigration.version).where(SchemaMigration.version == migration.version)).first() is not None: continue
+                migration.apply(conn)
+                conn.execute(insert(SchemaMigration).values(version=migration.version, name=migration.name, applied_at=time.time()))
+                applied.append(migration.version)
+        return applied
     def delete_all(self):
         if not DEBUG: raise RuntimeError("can't delete all tables in a production environment")
         # delete all tables and create new tables 
+        self.search_index.uninstall(self.engine)
         Base.metadata.drop_all(self.engine)
+        self.identities.clear()
+        if self.columns is not None: self.columns.clear()
+        self.autocomplete.clear()
         self.create_all()
     def commit(self)->None: 
         try: self.session.commit()
@@ -186,28 +610,487 @@ class PostgreSQL:
             self.session.rollback()
             raise RuntimeError(f"Database integrity error: {e.orig}") from e
 
+    def bump_version(self) -> None:
+        """
+        Marks the dataset as changed. Every write runs it first in its transaction: the row stays locked until the
+        commit, which serializes writers (their reads included) and keeps `identities` in sync.
+        """
+        version = self.session.execute(
+            update(DatasetVersion).where(DatasetVersion.id == DatasetVersion.SINGLETON_ID)
+                .values(version=DatasetVersion.version + 1).returning(DatasetVersion.version)
+        ).scalar()
+        if version is not None:
+            self.identities.observe_version(self.session, version) # None while create_all runs
+            if self.columns is not None: self.columns.observe_version(self.session, version)
+            self.autocomplete.observe_version(self.session, version)
+            self.session.info[WRITTEN_VERSION_KEY] = version
+
+    def _record_placements(self, added: Sequence[Tuple[PlacementRow, Optional[int]]] = (), removed: Sequence[Tuple[int, int]] = ()) -> None:
+        """Hands the placements a write adds, as (row, person_id), and removes, as (college_id, company_id), to `columns` and `autocomplete`."""
+        if self.columns is not None: self.columns.record(self.session, added=added, removed=removed)
+        self.autocomplete.record(self.session, added=[row for row, _ in added], removed=removed)
+    @reads
+    def get_version(self) -> int:
+        return self.session.execute(select(DatasetVersion.version).where(DatasetVersion.id == DatasetVersion.SINGLETON_ID)).scalar() or 0
+
     # Function to add data
     def add_data(self, college_name:str, company_name:str, role:str, ctc:float, 
                  hr_name: Optional[str] = None, linkedin_id: Optional[str] = None, email: Optional[str] = None, contact_number: Optional[str] = None
         ):
+        # First: takes the writer lock and tells `identities` whether they may answer this transaction
+        self.bump_version()
         person: Optional[Person] = None
         if not (hr_name is None and linkedin_id is None and email is None and contact_number is None):
             person = Person(name=hr_name, email=email, linkedin_id=linkedin_id,contact_number=contact_number)
             self.session.add(person)
-        
-        new_company: Company = Company.get_or_create(session=self.session, company_name=company_name, role=role, ctc=ctc)
-        new_college: College = College.get_or_create(session=self.session, college_name=college_name)
-        assert new_college is not None and new_college is not None
-        
-        new_relation: CompanyCollege = CompanyCollege.get_or_create(session=self.session, college=new_college, company=new_company, person=person)
+            self.session.flush()
+
+        company_id = self.get_or_create_company_id(company_name=company_name, role=role, ctc=ctc)
+        college_id = self.get_or_create_college_id(college_name=college_name)
+        if self._insert_relation(company_id=company_id, college_id=college_id, person_id=person.id if person is not None else None):
+            self._apply_rollups(added=[(company_id, college_id, ctc)])
+            self._record_placements(added=[(PlacementRow(college_id, company_id, college_name, company_name, role, float(ctc),
+                                                         hr_name, linkedin_id, email, contact_number), person.id if person is not None else None)])
+        elif person is not None: self.session.delete(person) # the placement exists, its contact isn't replaced
 
         self.session.commit()
-        
-        
+
+    def get_or_create_college_id(self, college_name: str) -> int:
+        """Id of the college, inserted when missing (caller commits). Answered by the identity cache when it can."""
+        college_id = self.identities.get(self.session, self.identities.colleges, college_name)
+        if college_id is not None: return college_id
+        college_id = self.session.execute(select(College.id).where(College.college_name == college_name)).scalar()
+        if college_id is None: college_id = self.session.execute(insert(College).values(college_name=college_name).returning(College.id)).scalar_one()
+        self.identities.put(self.session, self.identities.colleges, college_name, college_id)
+        return college_id
+
+    def get_or_create_company_id(self, company_name: str, role: str, ctc: float) -> int:
+        """Id of the (company_name, role, ctc) tuple, inserted when missing (caller commits). Answered by the identity cache when it can."""
+        key = (company_name, role, ctc)
+        company_id = self.identities.get(self.session, self.identities.companies, key)
+        if company_id is not None: return company_id
+        company_id = self.session.execute(
+            select(Company.id).where(Company.company_name == company_name, Company.role == role, Company.ctc == ctc)
+        ).scalar()
+        if company_id is None:
+            company_id = self.session.execute(insert(Company).values(company_name=company_name, role=role, ctc=ctc).returning(Company.id)).scalar_one()
+        self.identities.put(self.session, self.identities.companies, key, company_id)
+        return company_id
+
+    def _insert_relation(self, company_id: int, college_id: int, person_id: Optional[int]) -> bool:
+        """Inserts one company_college row unless it exists (caller commits), True when it was inserted."""
+        values = {"company_id": company_id, "college_id": college_id, "person_id": person_id}
+        dialect_insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(self.engine.dialect.name)
+        if dialect_insert is not None:
+            stmt = dialect_insert(CompanyCollege).values(**values).on_conflict_do_nothing(index_elements=["company_id", "college_id"])
+            return self.session.execute(stmt.returning(CompanyCollege.company_id)).first() is not None
+        exists = self.session.execute(
+            select(literal(1)).where(CompanyCollege.company_id == company_id, CompanyCollege.college_id == college_id)
+        ).first()
+        if exists is not None: return False
+        self.session.execute(insert(CompanyCollege).values(**values))
+        return True
+
+    def warm_identity_caches(self) -> None:
+        """Fills the identity caches with the most visited colleges and companies, up to their bound."""
+        version = self.get_version()
+        colleges = self.session.execute(
+            select(College.college_name, College.id).join(CollegeVisits, CollegeVisits.college_id == College.id)
+                .order_by(CollegeVisits.visit_count.desc()).limit(self.identities.colleges.max_entries)
+        ).all()
+        companies = self.session.execute(
+            select(Company.company_name, Company.role, Company.ctc, Company.id).join(CompanyVisits, CompanyVisits.company_id == Company.id)
+                .order_by(CompanyVisits.visit_count.desc()).limit(self.identities.companies.max_entries)
+        ).all()
+        self.identities.warm(version, colleges, [((company_name, role, ctc), company_id) for company_name, role, ctc, company_id in companies])
+
+    def remove_relation(self, college: College, company: Company) -> None:
+        """Unlinks a company from a college and deletes whatever that orphaned (caller commits), see `delete_relation`."""
+        self.delete_relation(college_id=college.id, company_id=company.id)
+
+    def delete_relation(self, college_id: int, company_id: int) -> bool:
+        """
+        Deletes the company_college row with this composite key, then the college, company and person it leaves
+        unreferenced (caller commits). No relationship collection is loaded, so the cost doesn't grow with how
+        connected the college or company is. False when the row doesn't exist.
+        """
+        self.bump_version()
+        ctc = self.session.execute(
+            select(Company.ctc).join(CompanyCollege, Company.id == CompanyCollege.company_id)
+                .where(CompanyCollege.college_id == college_id, CompanyCollege.company_id == company_id)
+        ).scalar()
+        if ctc is None: return False
+        return self._delete_placement(college_id=college_id, company_id=company_id, ctc=ctc)
+
+    def delete_data(self, college_name: str, company_name: str, role: str, ctc: float) -> bool:
+        """Deletes one placement by its natural key (caller commits), False when it doesn't exist."""
+        self.bump_version()
+        row = self.session.execute(
+            select(CompanyCollege.college_id, CompanyCollege.company_id, Company.ctc)
+                .join(College, College.id == CompanyCollege.college_id).join(Company, Company.id == CompanyCollege.company_id)
+                .where(College.college_name == college_name, Company.company_name == company_name, Company.role == role, Company.ctc == ctc)
+        ).one_or_none()
+        if row is None: return False
+        return self._delete_placement(college_id=row.college_id, company_id=row.company_id, ctc=row.ctc)
+
+    def _delete_placement(self, college_id: int, company_id: int, ctc: float) -> bool:
+        """
+        Deletes one placement found by a read before (caller commits), False when it is gone by now: a concurrent
+        delete got to it first, and the rollups and deltas must only count the row once.
+        """
+        deleted = self.session.execute(
+            delete(CompanyCollege).where(CompanyCollege.college_id == college_id, CompanyCollege.company_id == company_id)
+                .returning(CompanyCollege.person_id).execution_options(synchronize_session="fetch")
+        ).first()
+        if deleted is None: return False
+        self._apply_rollups(removed=[(company_id, college_id, ctc)])
+        self._record_placements(removed=[(college_id, company_id)])
+        self.delete_orphans(college_ids=[college_id], company_ids=[company_id], person_ids=[deleted.person_id] if deleted.person_id is not None else [])
+        return True
+
+    def delete_orphans(self, college_ids: Optional[Sequence[int]] = None, company_ids: Optional[Sequence[int]] = None,
+                       person_ids: Optional[Sequence[int]] = None) -> None:
+        """
+        Set-based NOT EXISTS deletes of colleges, companies and persons no placement refers to (caller commits).
+        Each id list limits the check to those candidates, None checks the whole table.
+        """
+        for model, referenced_by, ids in (
+            (College, CompanyCollege.college_id, college_ids),
+            (Company, CompanyCollege.company_id, company_ids),
+            (Person, CompanyCollege.person_id, person_ids),
+        ):
+            if ids is not None and len(ids) == 0: continue
+            stmt = delete(model).where(~select(literal(1)).where(referenced_by == model.id).exists())
+            if ids is not None: stmt = stmt.where(model.id.in_(ids))
+            # "fetch" evicts the deleted rows from the session, a re-created college or company may reuse the id
+            deleted = self.session.execute(stmt.returning(model.id).execution_options(synchronize_session="fetch")).scalars().all()
+            if model is College: self.identities.invalidate(self.session, self.identities.colleges, deleted)
+            elif model is Company: self.identities.invalidate(self.session, self.identities.companies, deleted)
+
+    # --- Bulk ingestion ---
+
+    @staticmethod
+    def validate_ingest_records(records: Iterable[Mapping[str, Any]], start: int = 0) -> Tuple[List[Tuple[int, IngestRow]], List[IngestRowResult]]:
+        """Validates every record up front, returns the valid rows (with their position, counted from `start`) and the rejected ones."""
+        valid: List[Tuple[int, IngestRow]] = []
+        rejected: List[IngestRowResult] = []
+        for idx, record in enumerate(records, start):
+            college_name = clean_text(record.get('college_name'))
+            company_name = clean_text(record.get('company_name'))
+            role = clean_text(record.get('role'))
+            missing = [name for name, value in (('college_name', college_name), ('company_name', company_name), ('role', role)) if value is None]
+            if missing:
+                rejected.append(IngestRowResult(row=idx, status=IngestStatusOptions["rejected"], reason="Missing " + ", ".join(missing)))
+                continue
+            try: ctc = float(record.get('ctc'))
+            except (TypeError, ValueError): ctc = math.nan
+            if not math.isfinite(ctc) or ctc < 0:
+                rejected.append(IngestRowResult(row=idx, status=IngestStatusOptions["rejected"], reason="ctc must be a non-negative real number"))
+                continue
+            valid.append((idx, IngestRow(college_name=college_name, company_name=company_name, role=role, ctc=ctc,
+                                         hr_name=clean_text(record.get('hr_name')), linkedin_id=clean_text(record.get('linkedin_id')),
+                                         email=clean_text(record.get('email')), contact_number=clean_text(record.get('contact_number')))))
+        return valid, rejected
+
+    def _resolve_colleges(self, college_names: Set[str], batch_size: int) -> Tuple[Dict[str, int], Set[int]]:
+        """Maps college names to ids, inserting the missing ones. Also returns the ids that were just created."""
+        ids: Dict[str, int] = {}
+        for chunk in _chunked(sorted(college_names), batch_size):
+            ids.update(self.session.query(College.college_name, College.id).filter(College.college_name.in_(chunk)).all())
+        created: Set[int] = set()
+        missing = sorted(college_names.difference(ids))
+        for chunk in _chunked(missing, batch_size):
+            rows = self.session.execute(insert(College).returning(College.college_name, College.id), [{"college_name": name} for name in chunk]).all()
+            ids.update(rows)
+            created.update(college_id for _, college_id in rows)
+        return ids, created
+
+    def _resolve_companies(self, companies: Set[Tuple[str, str, float]], batch_size: int) -> Dict[Tuple[str, str, float], int]:
+        """Maps (company_name, role, ctc) tuples to ids, inserting the missing ones."""
+        ids: Dict[Tuple[str, str, float], int] = {}
+        for chunk in _chunked(sorted({company_name for company_name, _, _ in companies}), batch_size):
+            rows = (self.session.query(Company.company_name, Company.role, Company.ctc, Company.id)
+                        .filter(Company.company_name.in_(chunk)).all())
+            ids.update(((company_name, role, ctc), company_id) for company_name, role, ctc, company_id in rows
+                       if (company_name, role, ctc) in companies)
+        missing = sorted(companies.difference(ids))
+        for chunk in _chunked(missing, batch_size):
+            rows = self.session.execute(
+                insert(Company).returning(Company.company_name, Company.role, Company.ctc, Company.id),
+                [{"company_name": company_name, "role": role, "ctc": ctc} for company_name, role, ctc in chunk]
+            ).all()
+            ids.update(((company_name, role, ctc), company_id) for company_name, role, ctc, company_id in rows)
+        return ids
+
+    def _existing_relations(self, college_ids: Set[int], batch_size: int) -> Set[Tuple[int, int]]:
+        """Returns the (company_id, college_id) pairs already linked for the given colleges."""
+        existing: Set[Tuple[int, int]] = set()
+        for chunk in _chunked(sorted(college_ids), batch_size):
+            existing.update(
+                (company_id, college_id) for company_id, college_id in
+                self.session.query(CompanyCollege.company_id, CompanyCollege.college_id).filter(CompanyCollege.college_id.in_(chunk)).all()
+            )
+        return existing
+
+    def _insert_relations(self, new_relations: Sequence[Tuple[int, int, IngestRow]], batch_size: int) -> None:
+        """Inserts (company_id, college_id, row) placements, and the persons of the rows that have one, with multi-row inserts."""
+        with_person = [row for _, _, row in new_relations if row.has_person]
+        person_ids: List[int] = []
+        for chunk in _chunked(with_person, batch_size):
+            person_ids.extend(self.session.execute(
+                insert(Person).returning(Person.id, sort_by_parameter_order=True),
+                [{"name": row.hr_name, "linkedin_id": row.linkedin_id, "email": row.email, "contact_number": row.contact_number} for row in chunk]
+            ).scalars().all())
+        person_id_iter = iter(person_ids)
+        relations = [{"company_id": company_id, "college_id": college_id, "person_id": next(person_id_iter) if row.has_person else None}
+                     for company_id, college_id, row in new_relations]
+        for chunk in _chunked(relations, batch_size):
+            self.session.execute(insert(CompanyCollege), list(chunk))
+        self._record_placements(added=[
+            (PlacementRow(college_id, company_id, row.college_name, row.company_name, row.role, float(row.ctc),
+                          row.hr_name, row.linkedin_id, row.email, row.contact_number), relation["person_id"])
+            for (company_id, college_id, row), relation in zip(new_relations, relations)
+        ])
+
+    def _ingest_rows(self, valid: Sequence[Tuple[int, IngestRow]], batch_size: int) -> List[IngestRowResult]:
+        """Writes the new relations among validated rows, in the current transaction. Returns their accepted / duplicate results."""
+        results: List[IngestRowResult] = []
+        college_ids, created_colleges = self._resolve_colleges({row.college_name for _, row in valid}, batch_size)
+        company_ids = self._resolve_companies({(row.company_name, row.role, row.ctc) for _, row in valid}, batch_size)
+        # Freshly created colleges can't have relations yet
+        seen = self._existing_relations(set(college_ids.values()).difference(created_colleges), batch_size)
+
+        new_relations: List[Tuple[int, int, IngestRow]] = []
+        for idx, row in valid:
+            key = (company_ids[(row.company_name, row.role, row.ctc)], college_ids[row.college_name])
+            if key in seen:
+                results.append(IngestRowResult(row=idx, status=IngestStatusOptions["duplicate"], reason="Relation already exists"))
+                continue
+            seen.add(key)
+            new_relations.append((key[0], key[1], row))
+            results.append(IngestRowResult(row=idx, status=IngestStatusOptions["accepted"]))
+
+        self._apply_rollups(added=[(company_id, college_id, row.ctc) for company_id, college_id, row in new_relations])
+        self._insert_relations(new_relations, batch_size)
+        return results
+
+    def bulk_add_data(self, records: Iterable[Mapping[str, Any]], batch_size: int = BULK_INSERT_BATCH_SIZE) -> IngestReport:
+        """
+        Set-based counterpart of `add_data` for imports.
+        Validates all records, resolves colleges and companies with a few IN queries,
+        inserts what is missing in batches and writes every new relation (and person) in one transaction.
+        """
+        return self.bulk_add_batches([records], batch_size)
+
+    def bulk_add_batches(self, batches: Iterable[Iterable[Mapping[str, Any]]], batch_size: int = BULK_INSERT_BATCH_SIZE) -> IngestReport:
+        """
+        `bulk_add_data` over records that arrive in batches (Parquet record batches), only one batch is held at a time.
+        Rows are numbered across batches and everything is still written in one transaction; the relations written by
+        earlier batches are visible to the duplicate check of later ones.
+        """
+        start = time.perf_counter()
+        results: List[IngestRowResult] = []
+        total = 0
+        try:
+            self.bump_version()
+            for batch in batches:
+                records = list(batch)
+                valid, rejected = self.validate_ingest_records(records, start=total)
+                results.extend(rejected)
+                results.extend(self._ingest_rows(valid, batch_size))
+                total += len(records)
+            self.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+        results.sort(key=lambda result: result.row)
+        elapsed = time.perf_counter() - start
+        counts = {status: 0 for status in IngestStatusOptions.values()}
+        for result in results: counts[result.status] += 1
+        return IngestReport(
+            accepted=counts[IngestStatusOptions["accepted"]],
+            duplicates=counts[IngestStatusOptions["duplicate"]],
+            rejected=counts[IngestStatusOptions["rejected"]],
+            rows=results,
+            elapsed_seconds=elapsed,
+            rows_per_second=(total / elapsed) if elapsed > 0 else 0.0,
+        )
+
+    # --- Import jobs (jobs.py) ---
+
+    @staticmethod
+    def _import_job_info(job: ImportJob) -> ImportJobInfo:
+        return ImportJobInfo(
+            id=job.id, filename=job.filename, file_format=job.file_format, path=job.path, status=JobStatus(job.status),
+            total_rows=job.total_rows, rows_processed=job.checkpoint_row, checkpoint_offset=job.checkpoint_offset, accepted=job.accepted, duplicates=job.duplicates,
+            rejected=job.rejected, rejected_rows=[IngestRowResult(**result) for result in json.loads(job.rejected_rows)],
+            error=job.error, processing_seconds=job.processing_seconds, created_at=job.created_at, started_at=job.started_at,
+            finished_at=job.finished_at,
+        )
+
+    def create_import_job(self, job_id: str, filename: str, file_format: str, path: str, total_rows: Optional[int]) -> None:
+        self.session.add(ImportJob(id=job_id, filename=filename, file_format=file_format, path=path, total_rows=total_rows, created_at=time.time()))
+        self.commit()
+
+    def get_import_job(self, job_id: str) -> Optional[ImportJobInfo]:
+        job = self.session.get(ImportJob, job_id)
+        return self._import_job_info(job) if job is not None else None
+
+    def resumable_import_jobs(self, stale_before: float) -> List[str]:
+        """Jobs still queued, or running without a heartbeat since `stale_before` (their process died)."""
+        return self.session.execute(
+            select(ImportJob.id).where((ImportJob.status == JobStatusOptions["queued"])
+                                       | ((ImportJob.status == JobStatusOptions["running"]) & (ImportJob.heartbeat_at < stale_before)))
+                                .order_by(ImportJob.created_at)
+        ).scalars().all()
+
+    def claim_import_job(self, job_id: str, owner: str, stale_before: float) -> Optional[ImportJobInfo]:
+        """Makes `owner` the only runner of a queued (or abandoned) job, None when it can't have it."""
+        now = time.time()
+        claimed = self.session.execute(
+            update(ImportJob)
+                .where(ImportJob.id == job_id, (ImportJob.status == JobStatusOptions["queued"])
+                       | ((ImportJob.status == JobStatusOptions["running"]) & (ImportJob.heartbeat_at < stale_before)))
+                .values(status=JobStatusOptions["running"], owner=owner, heartbeat_at=now, started_at=func.coalesce(ImportJob.started_at, now))
+        ).rowcount
+        self.commit()
+        return self.get_import_job(job_id) if claimed else None
+
+    def import_job_chunk(self, job_id: str, owner: str, records: Sequence[Mapping[str, Any]], start: int, offset: Optional[int] = None,
+                         parse_seconds: float = 0.0, batch_size: int = BULK_INSERT_BATCH_SIZE) -> bool:
+        """
+        Validates and writes the records of rows `start`.. of a job and moves its checkpoint past them, in one transaction.
+        `offset` is where the rows after them start in a CSV upload, the job resumes reading there.
+        Returns False, writing nothing, when `owner` no longer holds the job or the chunk was already committed.
+        """
+        started = time.perf_counter()
+        try:
+            self.bump_version()
+            valid, results = self.validate_ingest_records(records, start=start)
+            rejected = len(results)
+            results.extend(self._ingest_rows(valid, batch_size))
+            counts = Counter(result.status for result in results)
+            details = json.loads(self.session.execute(select(ImportJob.rejected_rows).where(ImportJob.id == job_id)).scalar() or "[]")
+            details.extend(result._asdict() for result in results[:min(rejected, max(JOB_MAX_REJECTED_ROWS - len(details), 0))])
+            moved = self.session.execute(
+                update(ImportJob)
+                    .where(ImportJob.id == job_id, ImportJob.owner == owner, ImportJob.status == JobStatusOptions["running"], ImportJob.checkpoint_row == start)
+                    .values(checkpoint_row=start + len(records), checkpoint_offset=offset, accepted=ImportJob.accepted + counts[IngestStatusOptions["accepted"]],
+                            duplicates=ImportJob.duplicates + counts[IngestStatusOptions["duplicate"]], rejected=ImportJob.rejected + rejected,
+                            rejected_rows=json.dumps(details), heartbeat_at=time.time(),
+                            processing_seconds=ImportJob.processing_seconds + parse_seconds + time.perf_counter() - started)
+            ).rowcount
+            if not moved:
+                self.session.rollback()
+                return False
+            self.commit()
+            return True
+        except Exception:
+            self.session.rollback()
+            raise
+
+    def finish_import_job(self, job_id: str, owner: str, error: Optional[str] = None) -> None:
+        """Marks the job done (or failed with `error`), unless another runner took it over meanwhile."""
+        self.session.execute(
+            update(ImportJob).where(ImportJob.id == job_id, ImportJob.owner == owner)
+                .values(status=JobStatusOptions["failed" if error is not None else "done"], error=error, finished_at=time.time(), owner=None)
+        )
+        self.commit()
+
+    def release_import_job(self, job_id: str, owner: str) -> None:
+        """Puts an unfinished job back in the queue (runner shutting down), it resumes from its checkpoint."""
+        self.session.execute(
+            update(ImportJob).where(ImportJob.id == job_id, ImportJob.owner == owner, ImportJob.status == JobStatusOptions["running"])
+                .values(status=JobStatusOptions["queued"], owner=None)
+        )
+        self.commit()
+
+    # --- Batched writes ---
+
+    def _lookup_placements(self, keys: Set[PlacementKey], batch_size: int) -> Dict[PlacementKey, Tuple[int, int, Optional[int]]]:
+        """Maps the keys of existing placements to (college_id, company_id, person_id), one joined IN query per chunk."""
+        found: Dict[PlacementKey, Tuple[int, int, Optional[int]]] = {}
+        for chunk in _chunked(sorted(keys), batch_size):
+            rows = self.session.execute(
+                select(College.college_name, Company.company_name, Company.role, Company.ctc,
+                       CompanyCollege.college_id, CompanyCollege.company_id, CompanyCollege.person_id)
+                    .select_from(CompanyCollege)
+                    .join(College, College.id == CompanyCollege.college_id)
+                    .join(Company, Company.id == CompanyCollege.company_id)
+                    # the plain IN filters let the name indexes narrow the scan before the exact tuple match
+                    .where(College.college_name.in_({key.college_name for key in chunk}),
+                           Company.company_name.in_({key.company_name for key in chunk}),
+                           tuple_(College.college_name, Company.company_name, Company.role, Company.ctc).in_([tuple(key) for key in chunk]))
+            ).all()
+            found.update((PlacementKey(*row[:4]), (row.college_id, row.company_id, row.person_id)) for row in rows)
+        return found
+
+    def apply_batch(self, operations: Sequence[BatchOp], batch_size: int = BULK_INSERT_BATCH_SIZE) -> BatchReport:
+        """
+        Applies add / edit / delete operations in order and in one transaction, all or nothing.
+        Every key is looked up up front with grouped IN queries and the operations are replayed in memory,
+        then only their net effect is written set-based, so the query count grows with `batch_size` chunks, not with operations.
+        Edits and deletes of a placement that doesn't exist (at that point of the batch) fail it, and nothing is written.
+        """
+        start = time.perf_counter()
+        keys = {key for op in operations for key in (op.old, op.new.key if op.new is not None else None) if key is not None}
+        try:
+            self.bump_version()
+            stored = self._lookup_placements(keys, batch_size)
+            # None stands for the stored placement, an IngestRow for the one this batch writes instead
+            present: Dict[PlacementKey, Optional[IngestRow]] = dict.fromkeys(stored)
+            results: List[BatchOpResult] = []
+            for index, op in enumerate(operations):
+                if op.old is not None:
+                    if op.old not in present:
+                        results.append(BatchOpResult(index=index, op=op.op, status=BatchStatusOptions["not_found"], reason="Data not found..."))
+                        continue
+                    del present[op.old]
+                status = BatchStatusOptions["deleted"] if op.op == BatchOpOptions["delete"] else BatchStatusOptions["edited"]
+                if op.op == BatchOpOptions["add"]:
+                    status = BatchStatusOptions["duplicate"] if op.new.key in present else BatchStatusOptions["added"]
+                if op.new is not None and op.new.key not in present: present[op.new.key] = op.new
+                results.append(BatchOpResult(index=index, op=op.op, status=status,
+                                             reason="Relation already exists" if status == BatchStatusOptions["duplicate"] else None))
+
+            if any(result.status == BatchStatusOptions["not_found"] for result in results):
+                self.session.rollback()
+                results = [result if result.status == BatchStatusOptions["not_found"]
+                           else result._replace(status=BatchStatusOptions["skipped"], reason="Batch not applied") for result in results]
+                return BatchReport(applied=False, results=results, elapsed_seconds=time.perf_counter() - start)
+
+            removed = {key: ids for key, ids in stored.items() if key not in present or present[key] is not None}
+            added = [row for row in present.values() if row is not None]
+            for chunk in _chunked(sorted((college_id, company_id) for college_id, company_id, _ in removed.values()), batch_size):
+                self.session.execute(
+                    delete(CompanyCollege).where(tuple_(CompanyCollege.college_id, CompanyCollege.company_id).in_(chunk))
+                        .execution_options(synchronize_session="fetch")
+                )
+                self._record_placements(removed=chunk)
+            # Resolved before the orphan cleanup, so a college or company that is only moved around is kept
+            college_ids, _ = self._resolve_colleges({row.college_name for row in added}, batch_size)
+            company_ids = self._resolve_companies({(row.company_name, row.role, row.ctc) for row in added}, batch_size)
+            new_relations = [(company_ids[(row.company_name, row.role, row.ctc)], college_ids[row.college_name], row) for row in added]
+            self._insert_relations(new_relations, batch_size)
+            self._apply_rollups(added=[(company_id, college_id, row.ctc) for company_id, college_id, row in new_relations],
+                                removed=[(company_id, college_id, key.ctc) for key, (college_id, company_id, _) in removed.items()])
+            self.delete_orphans(college_ids=sorted({college_id for college_id, _, _ in removed.values()}),
+                                company_ids=sorted({company_id for _, company_id, _ in removed.values()}),
+                                person_ids=sorted({person_id for _, _, person_id in removed.values() if person_id is not None}))
+            self.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return BatchReport(applied=True, results=results, elapsed_seconds=time.perf_counter() - start)
+
+    @reads
     def fetch_all_companies(self)->List[Company]: return self.session.query(Company).all() 
+    @reads
     def fetch_all_colleges(self)->List[College]: return self.session.query(College).all()
 
     # Function to fetch all data
+    @reads
     def fetch_all_data(self)->List[ItemPerson]:
         results = (
             self.session.query(College, Company, Person)
@@ -221,17 +1104,19 @@ class PostgreSQL:
         items = [ItemPerson(college=college, company=company, person=person) for college, company, person in results]
         return items
     
+    @reads
+    def iter_export_rows(self, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[Tuple[str, str, str, float, Optional[str], Optional[str], Optional[str], Optional[str]]]:
+        """
+        Streams every placement as a plain tuple in the `INGEST_COLUMNS` order.
+        Uses a server-side cursor (where the driver has one) and fetches `chunk_size` rows at a time,
+        so memory stays flat no matter how big the table is.
+        """
+        result = self.session.execute(export_select().execution_options(stream_results=True, yield_per=chunk_size))
+        return (tuple(row) for row in result) # executed right away, where the read goes to a replica
+
+    @reads
     def fetch_all_data_sorted(self, sort_by:SortBy = SortByOptions["college_name"], order:Order = OrderOptions["asc"])->List[ItemPerson]:
-        # Define valid columns to sort 
-        valid_sort_columns = {
-            SortByOptions["college_name"]: College.college_name,
-            SortByOptions["company_name"]: Company.company_name,
-            SortByOptions["role"]: Company.role,
-            SortByOptions["ctc"]: Company.ctc
-        }
-        
-        valid_sort_col = valid_sort_columns.get(sort_by)
-        if valid_sort_col is None: raise ValueError(f"Invalid sort column specified. Must be an instance of SortBy enum not {sort_by}.")
+        valid_sort_col = get_sort_column(sort_by)
             
         # Construct the query
         query = (
@@ -252,125 +1137,279 @@ class PostgreSQL:
         items = [ItemPerson(college=college, company=company, person=person) for college, company, person in results]
         return items
     
-    def search_by_college(self, college_name:str) -> List[ItemPerson]:
-        results = (
-            self.session.query(College, Company, Person)
-                .select_from(CompanyCollege)
-                .join(College, CompanyCollege.college_id == College.id)  # Explicit condition (may not needed)
-                .join(Company, CompanyCollege.company_id == Company.id)  # Explicit condition (may not needed)
-                .outerjoin(Person, CompanyCollege.person_id == Person.id)
-                .filter(College.college_name.ilike(f"%{college_name}%"))  # Case-insensitive search and This uses wildcards (%) to match any substring within the college_name.
-                .all()
-        )
-        # Create a list of Item instances from the results
-        items = [ItemPerson(college=college, company=company, person=person) for college, company, person in results]
-        return items
-    def search_by_company(self, company_name:str) -> List[ItemPerson]:
-        results = (
-            self.session.query(College, Company, Person)
-                .select_from(CompanyCollege)
-                .join(College, CompanyCollege.college_id == College.id)  # Explicit condition (may not needed)
-                .join(Company, CompanyCollege.company_id == Company.id)  # Explicit condition (may not needed)
-                .outerjoin(Person, CompanyCollege.person_id == Person.id)
-                .filter(Company.company_name.ilike(company_name))  # Case-insensitive search
-                .all()
-        )
-        # Create a list of Item instances from the results
-        items = [ItemPerson(college=college, company=company, person=person) for college, company, person in results]
-        return items
-    def search_by_role(self, role:str) -> List[ItemPerson]:
-        results = (
-            self.session.query(College, Company, Person)
-                .select_from(CompanyCollege)
-                .join(College, CompanyCollege.college_id == College.id)  # Explicit condition (may not needed)
-                .join(Company, CompanyCollege.company_id == Company.id)  # Explicit condition (may not needed)
-                .outerjoin(Person, CompanyCollege.person_id == Person.id)
-                .filter(Company.role.ilike(role))  # Case-insensitive search
-                .all()
-        )
-        # Create a list of Item instances from the results
-        items = [ItemPerson(college=college, company=company, person=person) for college, company, person in results]
-        return items
-    def search_with_filters(self, college_name: Optional[str] = None, company_name: Optional[str] = None, role: Optional[str] = None) -> List[ItemPerson]:
-        query = (
-            self.session.query(College, Company, Person)
-                .select_from(CompanyCollege)
-                .join(College, CompanyCollege.college_id == College.id)  # Explicit condition (may not needed)
-                .join(Company, CompanyCollege.company_id == Company.id)
-                .outerjoin(Person, CompanyCollege.person_id == Person.id)
-        )
+    def _paginate(self, stmt: Select, sort_by: SortBy, order: Order, limit: int, cursor: Optional[str], with_total: bool, projection: bool) -> Page:
+        """
+        Keyset pagination: orders by (sort column, company_id, college_id), the relation's primary key
+        breaks ties so every row has a stable position, and the cursor resumes strictly after the last row.
+        """
+        if order not in OrderOptions.values(): raise ValueError(f"Invalid order column specified. Must be an instance of Order enum not {order}.")
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        keys = (get_sort_column(sort_by), CompanyCollege.company_id, CompanyCollege.college_id)
 
-        # Build filters
-        filters = []
+        total = self.session.execute(select(func.count()).select_from(stmt.order_by(None).subquery())).scalar() if with_total else None
+        if cursor is not None:
+            after = tuple_(*decode_cursor(cursor, sort_by=sort_by, order=order))
+            stmt = stmt.where(tuple_(*keys) > after if order == OrderOptions["asc"] else tuple_(*keys) < after)
+        direction = asc if order == OrderOptions["asc"] else desc
+        results = self.session.execute(stmt.add_columns(*keys).order_by(*(direction(key) for key in keys)).limit(limit + 1)).all()
 
-        if college_name: filters.append(College.college_name.ilike(college_name))  # Case-insensitive search
-        if company_name: filters.append(Company.company_name.ilike(company_name))  # Case-insensitive search
-        if role: filters.append(Company.role.ilike(role))  # Case-insensitive search
+        next_cursor: Optional[str] = None
+        if len(results) > limit:
+            results = results[:limit]
+            value, company_id, college_id = results[-1][-3:]
+            next_cursor = encode_cursor(sort_by, order, value, company_id, college_id)
+        if projection: items = [PlacementRow._make(row[:-3]) for row in results]
+        else: items = [ItemPerson(college=college, company=company, person=person) for college, company, person, *_ in results]
+        return Page(items=items, next_cursor=next_cursor, total=total)
 
-        # Apply filters if any exist
-        if filters: query = query.filter(and_(*filters))
+    def fetch_page(self, sort_by: SortBy = SortByOptions["college_name"], order: Order = OrderOptions["asc"],
+                   limit: int = MAX_PAGE_SIZE, cursor: Optional[str] = None, with_total: bool = False, projection: bool = False) -> Page:
+        """Paginated `fetch_all_data_sorted`, each page is one range scan on the sort key. `projection` returns `PlacementRow`s."""
+        return self.query_rows(PlacementQuery(sort_by=sort_by, order=order, limit=limit, cursor=cursor, with_total=with_total), projection=projection)
 
-        results = query.all()
-        # Create a list of Item instances from the results
-        items = [ItemPerson(college=college, company=company, person=person) for college, company, person in results]
-        return items
+    def _search_select(self, college_name: Optional[str] = None, company_name: Optional[str] = None, role: Optional[str] = None, projection: bool = False) -> Tuple[Select, Any]:
+        """Placement select restricted through the search index, returns it with its match score expression."""
+        stmt, score = placement_select(projection), literal(0.0)
+        if college_name:
+            college_match = self.search_index.match_colleges(college_name)
+            stmt = stmt.join(college_match, college_match.c.id == College.id)
+            score = score + college_match.c.score
+        if company_name or role:
+            company_match = self.search_index.match_companies(company_name=company_name, role=role)
+            stmt = stmt.join(company_match, company_match.c.id == Company.id)
+            score = score + company_match.c.score
+        return stmt, score
+
+    def search_page(self, college_name: Optional[str] = None, company_name: Optional[str] = None, role: Optional[str] = None,
+                    sort_by: SortBy = SortByOptions["college_name"], order: Order = OrderOptions["asc"],
+                    limit: int = MAX_PAGE_SIZE, cursor: Optional[str] = None, with_total: bool = False, projection: bool = False) -> Page:
+        """Paginated `search_with_filters`, ordered by `sort_by` instead of match quality."""
+        query = PlacementQuery(college_name=college_name, company_name=company_name, role=role,
+                               sort_by=sort_by, order=order, limit=limit, cursor=cursor, with_total=with_total)
+        return self.query_rows(query, projection=projection)
+
+    @reads
+    def query_rows(self, query: PlacementQuery, projection: bool = True) -> Page:
+        """
+        The placements matching every filter of `query`, sorted and paginated by the database in one statement:
+        text filters join the search index, the ctc range hits ix_companies_ctc and pages are keyset range scans
+        (see `_paginate`, which needs a sort column and defaults to college_name). Without a limit every row
+        comes back in one page, best matches first unless `sort_by` is given.
+        """
+        if query.order not in OrderOptions.values(): raise ValueError(f"Invalid order column specified. Must be an instance of Order enum not {query.order}.")
+        if projection and self.columns is not None:
+            page = self.columns.query(self, query)
+            if page is not None: return page
+        stmt, score = self._search_select(college_name=query.college_name, company_name=query.company_name, role=query.role, projection=projection)
+        if query.ctc_min is not None: stmt = stmt.where(Company.ctc >= query.ctc_min)
+        if query.ctc_max is not None: stmt = stmt.where(Company.ctc <= query.ctc_max)
+        if query.limit is not None:
+            return self._paginate(stmt, sort_by=query.sort_by or SortByOptions["college_name"], order=query.order, limit=query.limit,
+                                  cursor=query.cursor, with_total=query.with_total, projection=projection)
+        if query.sort_by is not None:
+            direction = asc if query.order == OrderOptions["asc"] else desc
+            stmt = stmt.order_by(direction(get_sort_column(query.sort_by)), direction(CompanyCollege.company_id), direction(CompanyCollege.college_id))
+        elif query.searches: stmt = stmt.order_by(desc(score), CompanyCollege.company_id, CompanyCollege.college_id)
+        results = self.session.execute(stmt).all()
+        if projection: items = [PlacementRow._make(row) for row in results]
+        else: items = [ItemPerson(college=college, company=company, person=person) for college, company, person in results]
+        return Page(items=items, next_cursor=None, total=len(items) if query.with_total else None)
+
+    def search_by_college(self, college_name:str) -> List[ItemPerson]: return self.search_with_filters(college_name=college_name)
+    def search_by_company(self, company_name:str) -> List[ItemPerson]: return self.search_with_filters(company_name=company_name)
+    def search_by_role(self, role:str) -> List[ItemPerson]: return self.search_with_filters(role=role)
+    @reads
+    def search_with_filters(self, college_name: Optional[str] = None, company_name: Optional[str] = None, role: Optional[str] = None) -> List[ItemPerson]:
+        """Case-insensitive substring search through the search index, best matches first."""
+        return self.query_rows(PlacementQuery(college_name=college_name, company_name=company_name, role=role), projection=False).items
+
+    # --- Projection read path: plain tuples, no ORM entities (writes keep using the entities) ---
+
+    def fetch_all_rows(self, sort_by: Optional[SortBy] = None, order: Order = OrderOptions["asc"]) -> List[PlacementRow]:
+        """`fetch_all_data` / `fetch_all_data_sorted` without hydrating College, Company and Person."""
+        return self.query_rows(PlacementQuery(sort_by=sort_by, order=order)).items
+
+    def search_rows(self, college_name: Optional[str] = None, company_name: Optional[str] = None, role: Optional[str] = None) -> List[PlacementRow]:
+        """Projection counterpart of `search_with_filters`, same matching and ranking."""
+        return self.query_rows(PlacementQuery(college_name=college_name, company_name=company_name, role=role)).items
 
     # --- Analytics Methods ---
 
+    def _bump_visits(self, model, key_col, deltas: Mapping[int, int]) -> None:
+        """Adds `deltas` to the visit counts of `model` (CompanyVisits / CollegeVisits), dropping rows that reach zero."""
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas: return
+        existing: Set[int] = set()
+        for chunk in _chunked(sorted(deltas), BULK_INSERT_BATCH_SIZE):
+            existing.update(self.session.execute(select(key_col).where(key_col.in_(chunk))).scalars())
+        table = model.__table__
+        if existing:
+            self.session.execute(
+                update(table).where(table.c[key_col.key] == bindparam('b_key')).values(visit_count=table.c.visit_count + bindparam('b_delta')),
+                [{"b_key": key, "b_delta": deltas[key]} for key in existing]
+            )
+        missing = [{key_col.key: key, "visit_count": delta} for key, delta in deltas.items() if key not in existing]
+        if missing: self.session.execute(insert(table), missing)
+        # Only decrements can reach zero
+        for chunk in _chunked(sorted(key for key, delta in deltas.items() if delta < 0), BULK_INSERT_BATCH_SIZE):
+            self.session.execute(delete(table).where(table.c[key_col.key].in_(chunk), table.c.visit_count <= 0))
+
+    def _apply_rollups(self, added: Sequence[Tuple[int, int, float]] = (), removed: Sequence[Tuple[int, int, float]] = ()) -> None:
+        """
+        Applies placement changes, given as (company_id, college_id, ctc), to the analytics rollups
+        inside the caller's transaction.
+        """
+        if not added and not removed: return
+        company_deltas, college_deltas = Counter(), Counter()
+        for company_id, college_id, _ in added: company_deltas[company_id] += 1; college_deltas[college_id] += 1
+        for company_id, college_id, _ in removed: company_deltas[company_id] -= 1; college_deltas[college_id] -= 1
+        self._bump_visits(CompanyVisits, CompanyVisits.company_id, company_deltas)
+        self._bump_visits(CollegeVisits, CollegeVisits.college_id, college_deltas)
+
+        values: Dict[str, Any] = {
+            "total_placements": PlacementStats.total_placements + (len(added) - len(removed)),
+            "ctc_sum": PlacementStats.ctc_sum + (sum(ctc for _, _, ctc in added) - sum(ctc for _, _, ctc in removed)),
+        }
+        if added:
+            added_min, added_max = min(ctc for _, _, ctc in added), max(ctc for _, _, ctc in added)
+            values["ctc_min"] = case((PlacementStats.ctc_min.is_(None) | (PlacementStats.ctc_min > added_min), added_min), else_=PlacementStats.ctc_min)
+            values["ctc_max"] = case((PlacementStats.ctc_max.is_(None) | (PlacementStats.ctc_max < added_max), added_max), else_=PlacementStats.ctc_max)
+        self.session.execute(update(PlacementStats).where(PlacementStats.id == PlacementStats.SINGLETON_ID).values(**values))
+
+        if removed:
+            # Min/max can't be decremented, recompute them from the per-company rollup when an extreme was removed
+            ctc_min, ctc_max = self.session.execute(
+                select(PlacementStats.ctc_min, PlacementStats.ctc_max).where(PlacementStats.id == PlacementStats.SINGLETON_ID)
+            ).one()
+            if any(ctc_min is None or ctc_max is None or ctc <= ctc_min or ctc >= ctc_max for _, _, ctc in removed):
+                ctc_min, ctc_max = self.session.execute(
+                    select(func.min(Company.ctc), func.max(Company.ctc)).join(CompanyVisits, CompanyVisits.company_id == Company.id)
+                ).one()
+                self.session.execute(update(PlacementStats).where(PlacementStats.id == PlacementStats.SINGLETON_ID).values(ctc_min=ctc_min, ctc_max=ctc_max))
+
+    def _compute_rollups(self) -> Tuple[Dict[str, Any], Dict[int, int], Dict[int, int]]:
+        """Aggregates the rollup contents from scratch over company_college."""
+        total_placements, ctc_sum, ctc_min, ctc_max = self.session.execute(
+            select(func.count(CompanyCollege.company_id), func.sum(Company.ctc), func.min(Company.ctc), func.max(Company.ctc))
+                .select_from(CompanyCollege).join(Company, CompanyCollege.company_id == Company.id)
+        ).one()
+        stats = {"total_placements": total_placements or 0, "ctc_sum": float(ctc_sum or 0.0), "ctc_min": ctc_min, "ctc_max": ctc_max}
+        companies = dict(self.session.execute(select(CompanyCollege.company_id, func.count()).group_by(CompanyCollege.company_id)).all())
+        colleges = dict(self.session.execute(select(CompanyCollege.college_id, func.count()).group_by(CompanyCollege.college_id)).all())
+        return stats, companies, colleges
+
+    def rebuild_rollups(self) -> None:
+        """Recomputes every rollup table from company_college and commits."""
+        self.bump_version()
+        stats, companies, colleges = self._compute_rollups()
+        self.session.execute(delete(PlacementStats))
+        self.session.execute(delete(CompanyVisits))
+        self.session.execute(delete(CollegeVisits))
+        self.session.execute(insert(PlacementStats).values(id=PlacementStats.SINGLETON_ID, **stats))
+        for chunk in _chunked(list(companies.items()), BULK_INSERT_BATCH_SIZE):
+            self.session.execute(insert(CompanyVisits), [{"company_id": key, "visit_count": count} for key, count in chunk])
+        for chunk in _chunked(list(colleges.items()), BULK_INSERT_BATCH_SIZE):
+            self.session.execute(insert(CollegeVisits), [{"college_id": key, "visit_count": count} for key, count in chunk])
+        self.commit()
+
+    def check_rollups(self, repair: bool = False) -> RollupDiff:
+        """Diffs the stored rollups against a from-scratch aggregation, `repair` rebuilds them when they disagree."""
+        stats, companies, colleges = self._compute_rollups()
+        stored = self.session.query(PlacementStats).filter_by(id=PlacementStats.SINGLETON_ID).one_or_none()
+        stats_diff: Dict[str, Tuple[Any, Any]] = {}
+        for field, actual in stats.items():
+            value = getattr(stored, field) if stored is not None else None
+            if value is None or actual is None: same = value == actual
+            else: same = math.isclose(value, actual, rel_tol=1e-9, abs_tol=1e-6)
+            if not same: stats_diff[field] = (value, actual)
+        def diff_counts(model, key_col, actual: Dict[int, int]) -> Dict[int, Tuple[int, int]]:
+            stored_counts = dict(self.session.execute(select(key_col, model.visit_count)).all())
+            return {key: (stored_counts.get(key, 0), actual.get(key, 0)) for key in set(stored_counts) | set(actual)
+                    if stored_counts.get(key, 0) != actual.get(key, 0)}
+        diff = RollupDiff(stats=stats_diff,
+                          companies=diff_counts(CompanyVisits, CompanyVisits.company_id, companies),
+                          colleges=diff_counts(CollegeVisits, CollegeVisits.college_id, colleges))
+        if repair and not diff.consistent: self.rebuild_rollups()
+        return diff
+
+    def _ensure_rollups(self) -> None:
+        # Databases created before the rollups existed get them backfilled once
+        with self.engine.connect() as conn:
+            if conn.execute(select(PlacementStats.id)).first() is not None: return
+        try: self.rebuild_rollups()
+        finally: self.remove()
+
+    @reads
+    def fetch_placement_columns(self, chunk_size: int = EXPORT_CHUNK_SIZE, persons: bool = False) -> PlacementColumns:
+        """Every table a placement is made of, placements `chunk_size` at a time; the persons only when asked for."""
+        colleges = self.session.execute(select(College.id, College.college_name)).all()
+        companies = self.session.execute(select(Company.id, Company.company_name, Company.role, Company.ctc)).all()
+        person_rows = self.session.execute(
+            select(Person.id, Person.name, Person.linkedin_id, Person.email, Person.contact_number)
+        ).all() if persons else []
+        # No stream_results: its buffering would take rows off the cursor before `_fetch_chunks` gets to them
+        result = self.session.connection().execute(
+            select(CompanyCollege.college_id, CompanyCollege.company_id, func.coalesce(CompanyCollege.person_id, -1))
+        )
+        return PlacementColumns(colleges=colleges, companies=companies, persons=person_rows, placements=_fetch_chunks(result, chunk_size))
+
+    @reads
+    def fetch_name_counts(self) -> NameCounts:
+        """Colleges and companies with the number of placements of each, from the visit rollups."""
+        colleges = self.session.execute(
+            select(College.id, College.college_name, CollegeVisits.visit_count).join(CollegeVisits, CollegeVisits.college_id == College.id)
+        ).all()
+        companies = self.session.execute(
+            select(Company.id, Company.company_name, Company.role, CompanyVisits.visit_count).join(CompanyVisits, CompanyVisits.company_id == Company.id)
+        ).all()
+        return NameCounts(colleges=colleges, companies=companies)
+
+    def suggest(self, field: str, prefix: str, limit: int = AUTOCOMPLETE_LIMIT) -> List[Suggestion]:
+        """The most placed names of `field` (college_name, company_name or role) with a word starting with `prefix`, any case."""
+        return self.autocomplete.suggest(self, field, prefix, limit)
+
+    @reads
     def get_analytics_summary(self) -> AnalyticsSummary:
-        """Calculates basic summary statistics."""
+        """Calculates basic summary statistics (placement and CTC figures come from the rollup row)."""
         total_colleges = self.session.query(func.count(College.id)).scalar()
         total_companies = self.session.query(func.count(Company.id)).scalar() # Counts unique company definitions
-        total_placements = self.session.query(func.count(CompanyCollege.company_id)).scalar() # Counts actual placement records
-
-        # Calculate CTC stats based on actual placements
-        ctc_stats = self.session.query(
-            func.avg(Company.ctc),
-            func.max(Company.ctc),
-            func.min(Company.ctc)
-        ).select_from(CompanyCollege).join(Company, CompanyCollege.company_id == Company.id).one()
-
-        avg_ctc, max_ctc, min_ctc = ctc_stats
+        stats: Optional[PlacementStats] = self.session.query(PlacementStats).filter_by(id=PlacementStats.SINGLETON_ID).one_or_none()
+        total_placements = stats.total_placements if stats is not None else 0 # Counts actual placement records
 
         return AnalyticsSummary(
             total_colleges=total_colleges or 0,
             total_companies=total_companies or 0,
             total_placements=total_placements or 0,
-            average_ctc=float(avg_ctc) if avg_ctc is not None else None,
-            max_ctc=float(max_ctc) if max_ctc is not None else None,
-            min_ctc=float(min_ctc) if min_ctc is not None else None,
+            average_ctc=(stats.ctc_sum / total_placements) if total_placements else None,
+            max_ctc=float(stats.ctc_max) if total_placements and stats.ctc_max is not None else None,
+            min_ctc=float(stats.ctc_min) if total_placements and stats.ctc_min is not None else None,
         )
 
+    @reads
     def get_top_companies_by_visits(self, n: int = 5) -> List[TopListItem]:
         """Gets the top N companies based on the number of distinct colleges visited."""
         results = (
-            self.session.query(
-                Company.company_name,
-                func.count(CompanyCollege.college_id).label('visit_count')
-            )
-            .join(CompanyCollege, Company.id == CompanyCollege.company_id)
-            .group_by(Company.id, Company.company_name) # Group by company ID and name
-            .order_by(desc('visit_count'))
+            self.session.query(Company.company_name, CompanyVisits.visit_count)
+            .join(CompanyVisits, Company.id == CompanyVisits.company_id)
+            .order_by(desc(CompanyVisits.visit_count))
             .limit(n)
             .all()
         )
         return [TopListItem(name=name, count=count) for name, count in results]
 
+    @reads
     def get_top_colleges_by_visits(self, n: int = 5) -> List[TopListItem]:
         """Gets the top N colleges based on the number of distinct companies visiting."""
         results = (
-            self.session.query(
-                College.college_name,
-                func.count(CompanyCollege.company_id).label('visit_count')
-            )
-            .join(CompanyCollege, College.id == CompanyCollege.college_id)
-            .group_by(College.id, College.college_name) # Group by college ID and name
-            .order_by(desc('visit_count'))
+            self.session.query(College.college_name, CollegeVisits.visit_count)
+            .join(CollegeVisits, College.id == CollegeVisits.college_id)
+            .order_by(desc(CollegeVisits.visit_count))
             .limit(n)
             .all()
         )
         return [TopListItem(name=name, count=count) for name, count in results]
 
+    @reads
     def get_top_placements_by_ctc(self, n: int = 5) -> List[TopCtcItem]:
         """Gets the top N individual placements (college-company pairs) by CTC."""
         results = (
@@ -389,3 +1428,28 @@ class PostgreSQL:
         )
         return [TopCtcItem(company_name=c_name, role=role, ctc=ctc, college_name=col_name)
                 for c_name, role, ctc, col_name in results]
+
+class LazyDatabase:
+    """
+    Stands in for a `PostgreSQL` that is only built (engine, pool, optional schema creation) on first use, so
+    importing the app opens no connection. `on_create` runs once on the new instance, e.g. to instrument its engine.
+    """
+    def __init__(self, factory: Callable[[], PostgreSQL], on_create: Optional[Callable[[PostgreSQL], None]] = None):
+        self._factory = factory
+        self._on_create = on_create
+        self._db: Optional[PostgreSQL] = None
+        self._lock = threading.Lock()
+    @property
+    def created(self) -> bool: return self._db is not None
+    def get(self) -> PostgreSQL:
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    db = self._factory()
+                    if self._on_create is not None: self._on_create(db)
+                    self._db = db
+        return self._db
+    def remove(self) -> None:
+        # Teardown after a request that never touched the database shouldn't open it
+        if self._db is not None: self._db.remove()
+    def __getattr__(self, name: str) -> Any: return getattr(self.get(), name)
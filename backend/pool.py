@@ -0,0 +1,148 @@
+"""
+Connection pool presets per dialect and live pool statistics.
+
+    - PostgreSQL: QueuePool of `DB_POOL_SIZE` (+ `DB_MAX_OVERFLOW`) connections, recycled and pre-pinged,
+      with an optional server-side `statement_timeout`
+    - SQLite file: QueuePool, WAL journal so readers never block the writer, a busy timeout, and (sync engines)
+      an in-process single-writer lock so concurrent writers queue instead of failing with "database is locked"
+    - SQLite in memory: SQLAlchemy's default (one connection per thread), every connection is its own database
+
+Every pool is wrapped so the time spent waiting for a connection lands in a histogram, see `PoolMonitor`.
+"""
+import math, threading, time
+from typing import Any, Dict, NamedTuple, Optional, Tuple, Type
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool, SingletonThreadPool, StaticPool
+
+from constants import (
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS,
+    SQLITE_WAL, SQLITE_BUSY_TIMEOUT_MS, SQLITE_SINGLE_WRITER
+)
+
+# Upper bounds (seconds) of the checkout wait histogram buckets
+WAIT_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+
+class WaitHistogram:
+    """Thread-safe histogram of checkout waits, cumulative buckets like a Prometheus histogram."""
+    def __init__(self, buckets: Tuple[float, ...] = WAIT_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+    def observe(self, seconds: float) -> None:
+        with self.lock:
+            for idx, bound in enumerate(self.buckets):
+                if seconds <= bound: self.counts[idx] += 1
+            self.count += 1
+            self.sum += seconds
+            self.max = max(self.max, seconds)
+    def snapshot(self) -> Tuple[int, float, float, Dict[str, int]]:
+        """(count, sum, max, {"le" bound: cumulative count})"""
+        with self.lock:
+            return self.count, self.sum, self.max, {("+Inf" if math.isinf(bound) else str(bound)): count for bound, count in zip(self.buckets, self.counts)}
+
+class PoolStats(NamedTuple):
+    pool_class: str
+    size: int # configured pool size (0 when the pool has none)
+    checked_out: int # connections in use right now
+    checked_in: int # idle connections in the pool
+    overflow: int # connections open beyond `size`
+    wait_count: int # checkouts so far
+    wait_seconds_sum: float
+    wait_seconds_max: float
+    wait_buckets: Dict[str, int] # cumulative checkouts per wait upper bound
+
+class _TimedPool:
+    """Mixin timing `Pool._do_get` (the checkout, including any wait for a free connection)."""
+    monitor: "PoolMonitor"
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        try: return super()._do_get() # type: ignore[misc]
+        finally: self.monitor.histogram.observe(time.perf_counter() - start)
+
+class PoolMonitor:
+    """Collects checkout waits of one engine's pool and reports its state."""
+    def __init__(self):
+        self.histogram = WaitHistogram()
+        self.engine: Optional[Engine] = None
+
+    def pool_class(self, base: Type[Pool]) -> Type[Pool]:
+        # A class attribute (not a constructor argument) survives `Pool.recreate()` after `engine.dispose()`
+        return type(f"Timed{base.__name__}", (_TimedPool, base), {"monitor": self})
+
+    def stats(self) -> PoolStats:
+        pool = self.engine.pool if self.engine is not None else None
+        size = checked_out = checked_in = overflow = 0
+        if isinstance(pool, QueuePool):
+            size, checked_out, checked_in, overflow = pool.size(), pool.checkedout(), pool.checkedin(), max(pool.overflow(), 0)
+        elif pool is not None and hasattr(pool, "_all_conns"): # SingletonThreadPool
+            checked_out = len(pool._all_conns)
+        count, total, longest, buckets = self.histogram.snapshot()
+        return PoolStats(pool_class=type(pool).__name__ if pool is not None else "", size=size, checked_out=checked_out, checked_in=checked_in,
+                         overflow=overflow, wait_count=count, wait_seconds_sum=total, wait_seconds_max=longest, wait_buckets=buckets)
+
+class SQLiteWriteLock:
+    """
+    One writing transaction per process at a time. pysqlite opens a transaction right before the first
+    INSERT/UPDATE/DELETE, that's where the lock is taken; commit or rollback releases it. Waiting here is
+    cheaper and fairer than spinning in SQLite's busy handler, and it never times out into "database is locked".
+    """
+    DML = ("INSERT", "UPDATE", "DELETE", "REPLAC")
+    def __init__(self, timeout: float):
+        self.lock = threading.Lock()
+        self.timeout = timeout
+    def attach(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "commit", self._release)
+        event.listen(engine, "rollback", self._release)
+        event.listen(engine, "checkin", lambda dbapi_connection, record: self._release_info(record.info)) # connection dropped mid-transaction
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if conn.info.get("write_lock") or statement.lstrip()[:6].upper() not in self.DML: return
+        # On timeout go ahead anyway, SQLite's own busy timeout still applies
+        conn.info["write_lock"] = self.lock.acquire(timeout=self.timeout)
+    def _release(self, conn) -> None: self._release_info(conn.info)
+    def _release_info(self, info: Dict[str, Any]) -> None:
+        if info.pop("write_lock", False): self.lock.release()
+
+def is_memory_sqlite(db_url: str) -> bool:
+    url = make_url(db_url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def engine_options(db_url: str, monitor: PoolMonitor, is_async: bool = False) -> Dict[str, Any]:
+    """Keyword arguments of `create_engine` / `create_async_engine` for the URL's dialect."""
+    url = make_url(db_url)
+    if is_memory_sqlite(db_url):
+        return {"poolclass": monitor.pool_class(StaticPool if is_async else SingletonThreadPool)}
+    options: Dict[str, Any] = {
+        "poolclass": monitor.pool_class(AsyncAdaptedQueuePool if is_async else QueuePool),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+    if url.get_backend_name() == "postgresql":
+        options.update(pool_recycle=DB_POOL_RECYCLE, pool_pre_ping=DB_POOL_PRE_PING)
+        if DB_STATEMENT_TIMEOUT_MS > 0:
+            if url.get_driver_name() == "asyncpg": options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+            else: options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+def configure_engine(engine: Engine, monitor: PoolMonitor, single_writer: bool = SQLITE_SINGLE_WRITER) -> None:
+    """
+    Hooks the monitor up and applies the SQLite connection settings. `engine` is the sync engine
+    (`AsyncEngine.sync_engine` for async ones, which must pass `single_writer=False`: a thread lock would block the event loop).
+    """
+    monitor.engine = engine
+    if engine.dialect.name != "sqlite" or is_memory_sqlite(str(engine.url)): return
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        if SQLITE_WAL:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL") # durable at checkpoints, safe with WAL
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+    if single_writer: SQLiteWriteLock(timeout=SQLITE_BUSY_TIMEOUT_MS / 1000).attach(engine)
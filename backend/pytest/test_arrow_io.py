@@ -0,0 +1,34 @@
+from unittest import TestCase
+import io
+import pytest
+from . import *
+from ..arrow_io import ArrowChunker, stream_arrow, open_parquet, missing_columns, iter_parquet_records
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.ipc, pyarrow.parquet
+
+ROWS = [("IIT Patna", "Google", "SDE", 100.5, "laksh", None, "l@x.in", None), ("IIT Delhi", "Méta", "PM", 50.0, None, None, None, None),
+        ("IIT Patna", "Meta", "SDE", 0.0, None, "in/x", None, "123")]
+
+class TestArrowIO(TestCase):
+    def test_export(self):
+        for export_format, read in (("parquet", lambda data: pa.parquet.read_table(io.BytesIO(data))),
+                                    ("arrow", lambda data: pa.ipc.open_file(io.BytesIO(data)).read_all())):
+            chunks = list(stream_arrow(iter(ROWS), ArrowChunker(export_format, batch_size=2)))
+            assert len(chunks) == 2 # one full batch, then the rest and the footer
+            table = read(b"".join(chunks))
+            assert table.schema.field("ctc").type == pa.float64()
+            assert [tuple(row.values())[1:] for row in table.to_pylist()] == ROWS and table.column("id").to_pylist() == [0, 1, 2]
+            assert read(ArrowChunker(export_format).finish()).num_rows == 0
+
+    def test_parquet_upload(self):
+        buffer = io.BytesIO()
+        pa.parquet.write_table(pa.Table.from_pylist([dict(zip(INGEST_COLUMNS, row)) for row in ROWS]), buffer, row_group_size=2)
+        buffer.seek(0)
+        parquet = open_parquet(buffer)
+        assert missing_columns(parquet) == []
+        batches = list(iter_parquet_records(parquet, batch_size=2))
+        assert [len(batch) for batch in batches] == [2, 1] and batches[0][0] == dict(zip(INGEST_COLUMNS, ROWS[0]))
+        buffer = io.BytesIO()
+        pa.parquet.write_table(pa.table({"college_name": ["IIT Patna"]}), buffer)
+        assert missing_columns(open_parquet(buffer)) == INGEST_COLUMNS[1:]
@@ -0,0 +1,67 @@
+import os, asyncio, tempfile
+from unittest import TestCase
+import pytest
+pytest.importorskip("aiosqlite")
+pytest.importorskip("starlette")
+from starlette.testclient import TestClient
+from ..async_models import AsyncPostgreSQL, to_async_url, to_sync_url
+from ..models import encode_cursor
+from .. import asgi
+
+class TestAsgi(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        asgi.db = AsyncPostgreSQL("sqlite:///" + os.path.join(self.tmpdir.name, "database.db"))
+        # asgi's own classes, this package imports the backend modules under other names
+        asgi.jobs = asgi.ImportJobRunner(asgi.PostgreSQL("sqlite:///" + os.path.join(self.tmpdir.name, "database.db"), create_schema=False),
+                                    spool_dir=os.path.join(self.tmpdir.name, "spool"))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_async_url(self):
+        assert to_async_url("sqlite:///database.db") == "sqlite+aiosqlite:///database.db"
+        assert to_async_url("postgresql+psycopg2://u:p@host/db") == "postgresql+asyncpg://u:p@host/db"
+        assert to_async_url("postgresql+asyncpg://u:p@host/db") == "postgresql+asyncpg://u:p@host/db"
+        assert to_sync_url("sqlite+aiosqlite:///database.db") == "sqlite:///database.db"
+        assert to_sync_url("postgresql+psycopg2://u:p@host/db") == "postgresql+psycopg2://u:p@host/db"
+
+    def test_async_db(self):
+        async def run():
+            await asgi.db.create_all()
+            await asgi.db.add_data(college_name="IIT Patna", company_name="Google", role="CTO", ctc=50000)
+            rows = await asgi.db.fetch_all_rows()
+            assert [(row.college_name, row.company_name, row.ctc) for row in rows] == [("IIT Patna", "Google", 50000)]
+            assert [row async for row in asgi.db.iter_export_rows()] == [("IIT Patna", "Google", "CTO", 50000, None, None, None, None)]
+            assert await asgi.db.delete_data(college_name="IIT Patna", company_name="Google", role="CTO", ctc=50000)
+            assert await asgi.db.fetch_all_rows() == []
+            await asgi.db.dispose()
+        asyncio.run(run())
+
+    def test_routes(self):
+        with TestClient(asgi.app) as client:
+            response = client.post("/add", json={"college_name": "IIT Patna", "company_name": "Google", "role": "CTO", "ctc": 50000})
+            assert response.status_code == 201
+            response = client.post("/view", json={"limit": 10, "with_total": True})
+            assert response.json()["total"] == 1
+            etag = response.headers["ETag"]
+            assert client.post("/view", json={"limit": 10, "with_total": True}, headers={"If-None-Match": etag}).status_code == 304
+            response = client.post("/edit-college-company", json={"old_college_name": "IIT Patna", "old_company_name": "Google",
+                                                                  "old_role": "CTO", "old_ctc": 50000, "new_ctc": 60000})
+            assert response.status_code == 201
+            assert [row["ctc"] for row in client.post("/search", json={"company_name": "Goo"}).json()] == [60000]
+            assert client.get("/autocomplete", params={"prefix": "pat", "field": "college_name"}).json() == {"college_name": [{"name": "IIT Patna", "count": 1}]}
+            assert client.get("/download").text.splitlines()[1] == "0,IIT Patna,Google,CTO,60000.0,,,,"
+            response = client.post("/delete-college-company", json={"college_name": "IIT Patna", "company_name": "Google", "role": "CTO", "ctc": 1})
+            assert response.status_code == 500 and "Data not found" in response.json()["error"]
+            response = client.post("/jobs", files={"file": ("data.csv", ",".join(asgi.INGEST_COLUMNS).encode() + b"\nIIT Delhi,Meta,PM,10,,,,\n")})
+            assert response.status_code == 202 and response.headers["Location"] == response.json()["status_url"]
+            asgi.jobs.wait(response.json()["job_id"], timeout=30)
+            job = client.get(response.json()["status_url"]).json()
+            assert (job["status"], job["rows_processed"], job["accepted"]) == ("done", 1, 1)
+            assert client.get("/jobs/unknown").status_code == 404
+            # Bad client values are the client's mistake, not a server error
+            for route, body in (("/view", {"limit": 10, "cursor": "not a cursor"}), ("/view", {"limit": "ten"}), ("/search", {"ctc_min": "a lot"}),
+                                ("/search", {"college_name": "IIT", "format": "xml"}), ("/view", {"limit": 10, "order": "desc", "cursor": encode_cursor("college_name", "asc", "IIT", 1, 1)})):
+                response = client.post(route, json=body)
+                assert response.status_code == 400 and "message" in response.json(), (route, body)
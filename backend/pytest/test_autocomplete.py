@@ -0,0 +1,97 @@
+from collections import Counter
+from sqlalchemy import event
+from unittest import TestCase, mock
+from werkzeug.exceptions import BadRequest
+from . import *
+import autocomplete # as models.py imports it, the module whose globals the index reads
+from autocomplete import Autocomplete, AUTOCOMPLETE_FIELDS
+from ..serializers import get_autocomplete_args
+from .test_columnar import make_records
+
+PREFIXES = ["", "i", "ii", "IIT", "iit d", "nit s", "n", "s", "sde", "SDE I", "goo", "web", "a", "zz"]
+
+class TestAutocomplete(TestCase):
+    def setUp(self):
+        self.db = PostgreSQL(db_url='sqlite:///:memory:')
+
+    def tearDown(self): self.db.remove()
+
+    def expected(self, field: str, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        """The suggestions counted from scratch."""
+        counts = Counter(getattr(row, field) for row in self.db.fetch_all_rows())
+        prefix = autocomplete.normalize(prefix)
+        names = [name for name in counts if any(key.startswith(prefix) for key in autocomplete._keys(name))]
+        return [(name, counts[name]) for name in sorted(names, key=lambda name: (-counts[name], name))[:limit]]
+
+    def assert_all_same(self) -> None:
+        for field in AUTOCOMPLETE_FIELDS:
+            for prefix in PREFIXES:
+                for limit in (1, 3, 50):
+                    assert [tuple(item) for item in self.db.suggest(field, prefix, limit)] == self.expected(field, prefix, limit), (field, prefix, limit)
+
+    def test_suggest(self):
+        for college_name, times in (("IIT Delhi", 3), ("IIT Patna", 1), ("Delhi Technological University", 2), ("iit bombay", 2)):
+            for i in range(times): self.db.add_data(college_name=college_name, company_name="Google", role="SDE", ctc=10 + i)
+        self.db.commit()
+        # Most placed first, at any word start, in any case; equal counts by name
+        assert self.db.suggest("college_name", "IIT") == [Suggestion("IIT Delhi", 3), Suggestion("iit bombay", 2), Suggestion("IIT Patna", 1)]
+        assert [item.name for item in self.db.suggest("college_name", "del")] == ["IIT Delhi", "Delhi Technological University"]
+        assert [item.name for item in self.db.suggest("college_name", " iit d", limit=5)] == ["IIT Delhi"]
+        assert self.db.suggest("company_name", "") == [Suggestion("Google", 8)] and self.db.suggest("role", "x") == []
+
+    def test_deltas(self):
+        with mock.patch.object(autocomplete, "CACHED_NAMES", 2), mock.patch.object(autocomplete, "SCAN_KEYS", 4): # short cached lists, names move in and out of them
+            self.db.bulk_add_data(make_records(200, seed=1))
+            self.assert_all_same()
+            self.db.add_data(college_name="IIT Delhi", company_name="Google", role="SDE", ctc=20, hr_name="New HR")
+            self.db.add_data(college_name="College of Engineering", company_name="Aardvark", role="Zookeeper", ctc=20)
+            self.db.commit()
+            rows = self.db.fetch_all_rows()
+            for row in rows[:40]: self.db.delete_data(college_name=row.college_name, company_name=row.company_name, role=row.role, ctc=row.ctc)
+            self.db.commit()
+            self.db.bulk_add_data(make_records(50, seed=2))
+            self.db.apply_batch([
+                BatchOp(op=BatchOpOptions["add"], new=IngestRow(college_name="DTU", company_name="Zomato", role="PM", ctc=99.0)),
+                BatchOp(op=BatchOpOptions["delete"], old=PlacementKey(rows[41].college_name, rows[41].company_name, rows[41].role, rows[41].ctc)),
+                BatchOp(op=BatchOpOptions["edit"], old=PlacementKey(rows[42].college_name, rows[42].company_name, rows[42].role, rows[42].ctc),
+                        new=IngestRow(college_name="BITS Goa", company_name=rows[42].company_name, role=rows[42].role, ctc=rows[42].ctc)),
+            ])
+            self.db.add_data(college_name="IIT Patna", company_name="Meta", role="PM", ctc=1.5)
+            self.db.session.rollback() # a write that didn't happen
+            self.assert_all_same()
+            stats = self.db.autocomplete.stats()
+            assert (stats.loads, stats.deltas, stats.version) == (1, 6, self.db.get_version())
+            # A writer the index doesn't hear about (another process): seen at the next version check
+            self.db.autocomplete, index = Autocomplete(), self.db.autocomplete
+            self.db.add_data(college_name="IIT Patna", company_name="Meta", role="PM", ctc=1.5)
+            self.db.commit()
+            self.db.autocomplete = index
+            index.check_seconds = 0
+            self.assert_all_same()
+            assert self.db.autocomplete.stats().loads == 2
+            # A delta failing halfway drops the index instead of serving it
+            with mock.patch.object(autocomplete._Names, "change", side_effect=RuntimeError):
+                self.db.add_data(college_name="IIT Patna", company_name="Meta", role="PM", ctc=2.5)
+            assert self.db.autocomplete.stats().version is None
+            self.assert_all_same()
+            assert self.db.autocomplete.stats().loads == 3
+
+    def test_no_version_reads(self):
+        self.db.add_data(college_name="IIT Delhi", company_name="Google", role="SDE", ctc=20)
+        self.db.suggest("college_name", "iit") # loads the index
+        statements = []
+        count = lambda *args: statements.append(args[2])
+        event.listen(self.db.engine, "before_cursor_execute", count)
+        try:
+            for prefix in ("i", "ii", "iit", "iit d"): self.db.suggest("college_name", prefix)
+            self.db.add_data(college_name="IIT Patna", company_name="Google", role="SDE", ctc=20)
+            writes = len(statements)
+            assert self.db.suggest("college_name", "iit p") == [Suggestion("IIT Patna", 1)] # the delta, not a version read
+        finally: event.remove(self.db.engine, "before_cursor_execute", count)
+        assert writes == len(statements) and statements[0].lstrip().upper().startswith("UPDATE")
+
+    def test_args(self):
+        assert get_autocomplete_args({"prefix": "ii"}) == (list(AUTOCOMPLETE_FIELDS), "ii", 10)
+        assert get_autocomplete_args({"field": "role", "limit": "3"}) == (["role"], "", 3)
+        for data in ({"field": "hr_name"}, {"limit": "x"}, {"limit": 0}, {"limit": 1000}):
+            with self.assertRaises(BadRequest): get_autocomplete_args(data)
@@ -0,0 +1,61 @@
+from unittest import TestCase
+import pytest
+from . import *
+from ..cache import LRUCache, make_cache_key
+
+class TestCache(TestCase):
+    def setUp(self):
+        db.delete_all()
+
+    def test_version_bumped_by_writes(self):
+        version = db.get_version()
+        db.add_data("IIT Patna", company_name="Google", role="CTO", ctc=50000)
+        assert db.get_version() == version + 1
+        db.bulk_add_data([{"college_name": "IIT Delhi", "company_name": "Google", "role": "CTO", "ctc": 50000}])
+        assert db.get_version() == version + 2
+
+    def test_lru(self):
+        cache = LRUCache(max_entries=2)
+        cache.set("a", b"1"); cache.set("b", b"2")
+        assert cache.get("a") == b"1"
+        cache.set("c", b"3") # evicts "b", "a" was used more recently
+        assert cache.get("b") is None
+        stats = cache.stats()
+        assert (stats.hits, stats.misses, stats.evictions, stats.size) == (1, 1, 1, 2)
+
+    def test_cache_key_normalized(self):
+        assert make_cache_key("view", 1, {"sort_by": "ctc", "limit": 5}) == make_cache_key("view", 1, {"limit": 5, "sort_by": "ctc"})
+        assert make_cache_key("view", 1, {"sort_by": "ctc"}) != make_cache_key("view", 2, {"sort_by": "ctc"})
+
+    def test_identity_caches(self):
+        from sqlalchemy import event
+        db.add_data("IIT Patna", company_name="Google", role="CTO", ctc=50000)
+        db.add_data("IIT Patna", company_name="Meta", role="CTO", ctc=50000)
+        statements = []
+        count = lambda *args: statements.append(args[2])
+        event.listen(db.engine, "before_cursor_execute", count)
+        try: db.add_data("IIT Patna", company_name="Google", role="CTO", ctc=50000) # steady state: version bump + relation insert
+        finally: event.remove(db.engine, "before_cursor_execute", count)
+        assert not any(statement.lstrip().startswith("SELECT") for statement in statements)
+        colleges, companies = db.identity_cache_stats()
+        assert colleges.hit_rate > 0 and companies.hits == 1
+
+        # Deletes invalidate, the re-created company gets a fresh id
+        assert db.delete_data("IIT Patna", company_name="Google", role="CTO", ctc=50000)
+        db.commit()
+        db.add_data("IIT Delhi", company_name="Google", role="CTO", ctc=50000)
+        assert {(row.college_name, row.company_name) for row in db.fetch_all_rows()} == {("IIT Patna", "Meta"), ("IIT Delhi", "Google")}
+
+        # Rolled back inserts never reach the cache
+        db.bump_version()
+        db.get_or_create_college_id("IIT Bombay")
+        db.session.rollback()
+        db.add_data("IIT Bombay", company_name="Meta", role="CTO", ctc=50000)
+        assert "IIT Bombay" in {college.college_name for college in db.fetch_all_colleges()}
+
+        # A write the caches didn't see (another process) empties them
+        with db.engine.begin() as conn: conn.execute(text("UPDATE dataset_version SET version = version + 1"))
+        hits = sum(stats.hits for stats in db.identity_cache_stats())
+        db.add_data("IIT Patna", company_name="Meta", role="CTO", ctc=50000)
+        assert sum(stats.hits for stats in db.identity_cache_stats()) == hits
+        assert db.check_rollups().consistent
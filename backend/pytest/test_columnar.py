@@ -0,0 +1,142 @@
+import random
+from contextlib import nullcontext
+from unittest import TestCase, mock
+from . import *
+from ..columnar import ColumnStore, check_collation
+
+COLLEGES = ["IIT Patna", "IIT Delhi", "iit bombay", "NIT Trichy", "NIT Surat", "BITS Pilani", "IIIT Hyderabad", "DTU", "Université Paris", "UNIVERSITÉ Lyon"]
+COMPANIES = ["Google", "Meta", "Amazon", "amazon web services", "Flipkart", "Microsoft", "Goldman Sachs", "Zomato", "École Ingénieurs", "ÉCOLE Conseil"]
+ROLES = ["SDE", "SDE II", "PM", "Analyst", "Data Scientist", "sde intern"]
+
+def make_records(n: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    records = []
+    for _ in range(n):
+        person = rng.random() < 0.5
+        records.append({"college_name": rng.choice(COLLEGES), "company_name": rng.choice(COMPANIES), "role": rng.choice(ROLES),
+                        "ctc": float(rng.choice([8, 12, 12.5, 20, 20, 45])), # repeated values, the ids have to break the ties
+                        "hr_name": f"HR {rng.randrange(50)}" if person else None, "linkedin_id": None,
+                        "email": f"hr{rng.randrange(50)}@example.com" if person else None, "contact_number": None})
+    return records
+
+# Every sort and order, text filters of all lengths (FTS5 below three characters, trigram phrases above) and ctc bounds.
+# Unsorted searches are ranked: by the LIKE scores with short terms, by bm25 (only the database has it) with long ones.
+QUERIES = [
+    PlacementQuery(),
+    PlacementQuery(ctc_min=12.5, ctc_max=20),
+    PlacementQuery(college_name="ii"),
+    PlacementQuery(college_name="Tr", company_name="go", role="E"),
+    PlacementQuery(company_name="AMAZON", role="sde", sort_by=SortByOptions["ctc"], order=OrderOptions["desc"]),
+    PlacementQuery(role="SDE", ctc_min=20, sort_by=SortByOptions["role"]),
+    PlacementQuery(college_name="no such college", sort_by=SortByOptions["college_name"]),
+    # Not ASCII: FTS5 folds their case, the copy doesn't
+    *(PlacementQuery(college_name=term, sort_by=SortByOptions["college_name"]) for term in ("université", "UNIVERSITÉ", "ité", "É")),
+    PlacementQuery(company_name="école", role="sde", sort_by=SortByOptions["ctc"]),
+    PlacementQuery(college_name="univ", company_name="ÉCOLE", sort_by=SortByOptions["company_name"], order=OrderOptions["desc"], limit=7),
+] + [
+    PlacementQuery(college_name=college_name, ctc_max=ctc_max, sort_by=sort_by, order=order)
+    for sort_by in SortByOptions.values() for order in OrderOptions.values() for college_name, ctc_max in ((None, None), ("NIT", 20))
+]
+
+class TestColumnar(TestCase):
+    def setUp(self):
+        self.db = PostgreSQL(db_url='sqlite:///:memory:')
+        self.db.bulk_add_data(make_records(300, seed=1))
+        self.db.columns = self.store = ColumnStore()
+
+    def tearDown(self): self.db.remove()
+
+    def sql(self, query: PlacementQuery) -> Page:
+        self.db.columns = None
+        try: return self.db.query_rows(query)
+        finally: self.db.columns = self.store
+
+    def assert_same(self, query: PlacementQuery) -> None:
+        """The copy answers `query` exactly like the database, page by page."""
+        query = query._replace(with_total=True)
+        memory = self.store.query(self.db, query)
+        if memory is None: # only terms the copy doesn't fold like FTS5 go to the database
+            assert not ColumnStore._folds_like(query), query
+            return
+        expected = self.sql(query)
+        if query.sort_by is None and not query.searches: # storage order, unspecified on both sides
+            expected, memory = expected._replace(items=sorted(expected.items)), memory._replace(items=sorted(memory.items))
+        assert memory == expected, query
+        for limit in (25, 1000):
+            page_query, pages = query._replace(limit=limit), 0
+            while True:
+                memory, expected = self.store.query(self.db, page_query), self.sql(page_query)
+                assert memory == expected, page_query
+                pages += 1
+                if expected.next_cursor is None: break
+                page_query = page_query._replace(cursor=expected.next_cursor)
+            if query.cursor is None: assert pages == max(1, -(-expected.total // limit))
+
+    def assert_all_same(self) -> None:
+        for query in QUERIES: self.assert_same(query)
+
+    def test_differential(self):
+        self.assert_all_same()
+        assert (self.store.stats().loads, self.store.stats().rows) == (1, len(self.db.fetch_all_rows()))
+        # A cursor from before a write still resumes at the same place
+        cursor = self.sql(PlacementQuery(sort_by=SortByOptions["company_name"], limit=5)).next_cursor
+        self.db.delete_data(**{key: value for key, value in make_records(300, seed=1)[2].items() if key in ("college_name", "company_name", "role", "ctc")})
+        self.db.commit()
+        self.assert_same(PlacementQuery(sort_by=SortByOptions["company_name"], limit=5, cursor=cursor))
+        # Searches ranked by bm25 go to the database, as do those for non-ASCII terms
+        fallbacks = self.store.stats().fallbacks
+        assert self.store.query(self.db, PlacementQuery(college_name="IIT")) is None and self.store.stats().fallbacks == fallbacks + 1
+        colleges = {row.college_name for row in self.db.query_rows(PlacementQuery(college_name="université", sort_by=SortByOptions["college_name"]), projection=True).items}
+        assert colleges == {"Université Paris", "UNIVERSITÉ Lyon"}
+
+    def test_deltas(self):
+        self.assert_all_same()
+        self.db.add_data(college_name="IIT Delhi", company_name="Google", role="SDE", ctc=20, hr_name="New HR")
+        self.db.add_data(college_name="College of Engineering", company_name="Aardvark", role="Zookeeper", ctc=20) # new dictionary entries
+        self.db.commit()
+        rows = self.db.fetch_all_rows()
+        self.db.delete_data(college_name=rows[0].college_name, company_name=rows[0].company_name, role=rows[0].role, ctc=rows[0].ctc)
+        self.db.commit()
+        self.db.bulk_add_data(make_records(50, seed=2))
+        self.db.apply_batch([
+            BatchOp(op=BatchOpOptions["add"], new=IngestRow(college_name="DTU", company_name="Zomato", role="PM", ctc=99.0, email="pm@zomato.com")),
+            BatchOp(op=BatchOpOptions["delete"], old=PlacementKey(rows[1].college_name, rows[1].company_name, rows[1].role, rows[1].ctc)),
+            BatchOp(op=BatchOpOptions["edit"], old=PlacementKey(rows[2].college_name, rows[2].company_name, rows[2].role, rows[2].ctc),
+                    new=IngestRow(college_name="BITS Goa", company_name=rows[2].company_name, role=rows[2].role, ctc=rows[2].ctc)),
+        ])
+        self.db.bump_version()
+        self.db.session.rollback() # a write that didn't happen
+        # Deleted, added back under the same ids and deleted again: the copy finds the live row past the dead one
+        key = {name: getattr(rows[3], name) for name in ("college_name", "company_name", "role", "ctc")}
+        for write in (self.db.delete_data, self.db.add_data, self.db.delete_data, self.db.add_data):
+            write(**key)
+            self.db.commit()
+        self.assert_all_same()
+        stats = self.store.stats()
+        assert (stats.loads, stats.deltas, stats.version, stats.removed) == (1, 9, self.db.get_version(), 5)
+        self.store._value = self.store._value._compacted()
+        self.assert_all_same()
+        # A writer the copy doesn't hear about (another process): the next query reloads
+        self.db.columns = None
+        self.db.add_data(college_name="IIT Patna", company_name="Meta", role="PM", ctc=1.5)
+        self.db.columns = self.store
+        self.assert_all_same()
+        assert self.store.stats().loads == 2
+
+    def test_fallback_mid_pagination(self):
+        # Every other page goes to the database (a delta on its way, a lagging replica): no row skipped or repeated
+        check_collation(self.db.engine)
+        for query in QUERIES:
+            query = query._replace(limit=7)
+            if self.store.query(self.db, query) is None: continue # answered by the database anyway
+            expected = self.sql(query._replace(limit=1000)).items # one page of everything
+            items, page, pages = [], self.db.query_rows(query), 1
+            while True:
+                items.extend(page.items)
+                if page.next_cursor is None: break
+                with mock.patch.object(self.store, "current", return_value=None) if pages % 2 else nullcontext():
+                    page = self.db.query_rows(query._replace(cursor=page.next_cursor))
+                pages += 1
+            if query.sort_by is None and not query.searches: expected, items = sorted(expected), sorted(items)
+            assert items == expected, query
+        assert self.store.stats().fallbacks > 0
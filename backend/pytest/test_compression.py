@@ -0,0 +1,28 @@
+from unittest import TestCase
+import gzip
+import pytest
+from . import *
+from ..compression import negotiate, compress
+from ..serializers import get_columnar_from_rows, get_dict_from_row
+
+class TestCompression(TestCase):
+    def test_negotiate(self):
+        assert negotiate("gzip, deflate") == "gzip"
+        assert negotiate("identity") is None and negotiate("") is None and negotiate(None) is None
+        assert negotiate("gzip;q=0, *") in ("br", None) # gzip refused, br only with the brotli package
+        assert negotiate("*;q=0.5") is not None
+        assert gzip.decompress(compress(b"{}" * 1000, "gzip")) == b"{}" * 1000
+
+    def test_columnar(self):
+        rows = [PlacementRow(1, 1, "IIT Patna", "Google", "SDE", 100.0, "laksh"), PlacementRow(2, 1, "IIT Delhi", "Google", "SDE", 100.0),
+                PlacementRow(1, 2, "IIT Patna", "Meta", "PM", 50.0)]
+        columnar = get_columnar_from_rows(rows)
+        assert columnar["length"] == 3
+        assert columnar["dictionaries"]["company_name"] == ["Google", "Meta"] and columnar["columns"]["company_name"] == [0, 0, 1]
+        decoded = [
+            {"id": idx, **{name: columnar["dictionaries"][name][values[idx]] if name in columnar["dictionaries"] else values[idx]
+                           for name, values in columnar["columns"].items()}}
+            for idx in range(columnar["length"])
+        ]
+        assert decoded == [get_dict_from_row(idx, row) for idx, row in enumerate(rows)]
+        assert get_columnar_from_rows([])["columns"]["ctc"] == []
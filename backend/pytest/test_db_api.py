@@ -21,4 +21,224 @@ class TestDB(TestCase):
         assert len(db.fetch_all_companies()) == 1
         item = db.fetch_all_data()[0]
         assert item.person is not None
-        assert item.person.name == "laksh"
\ No newline at end of file
+        assert item.person.name == "laksh"
+    def test_bulk_add_data(self):
+        db.add_data("IIT Patna", company_name="Google", role="CTO", ctc=50000)
+        report = db.bulk_add_data([
+            {"college_name": "IIT Patna", "company_name": "Google", "role": "CTO", "ctc": 50000},  # already in the db
+            {"college_name": "IIT Delhi", "company_name": "Google", "role": "CTO", "ctc": "50000", "hr_name": "laksh"},
+            {"college_name": "IIT Delhi", "company_name": "Google", "role": "CTO", "ctc": 50000},  # repeated inside the file
+            {"college_name": "IIT Delhi", "company_name": "Meta", "role": "SDE", "ctc": float("nan")},
+            {"college_name": None, "company_name": "Meta", "role": "SDE", "ctc": 10},
+        ])
+        assert [result.status for result in report.rows] == ["duplicate", "accepted", "duplicate", "rejected", "rejected"]
+        assert (report.accepted, report.duplicates, report.rejected) == (1, 2, 2)
+        assert len(db.fetch_all_colleges()) == 2
+        assert len(db.fetch_all_companies()) == 1
+        persons = [item.person.name for item in db.fetch_all_data() if item.person is not None]
+        assert persons == ["laksh"]
+
+    def test_bulk_add_batches(self):
+        def batches():
+            yield [{"college_name": "IIT Patna", "company_name": "Google", "role": "CTO", "ctc": 50000.0}, {"college_name": "IIT Delhi", "company_name": None, "role": "SDE", "ctc": 1}]
+            assert db.session().in_transaction() # one transaction across batches
+            yield [{"college_name": "IIT Patna", "company_name": "Google", "role": "CTO", "ctc": 50000.0},  # written by the first batch
+                   {"college_name": "IIT Delhi", "company_name": "Google", "role": "CTO", "ctc": 50000.0}]
+        report = db.bulk_add_batches(batches())
+        assert [(result.row, result.status) for result in report.rows] == [(0, "accepted"), (1, "rejected"), (2, "duplicate"), (3, "accepted")]
+        assert db.get_analytics_summary().total_placements == 2
+        def failing():
+            yield [{"college_name": "IIT Bombay", "company_name": "Meta", "role": "SDE", "ctc": 1.0}]
+            raise ValueError("truncated file")
+        with pytest.raises(ValueError): db.bulk_add_batches(failing())
+        assert len(db.fetch_all_colleges()) == 2 # nothing of a failed upload is kept
+
+    def test_fetch_page(self):
+        for i in range(5): db.add_data(f"College {i % 2}", company_name=f"Company {i}", role="SDE", ctc=1000 * (i % 3))
+        ctcs, cursor, pages = [], None, 0
+        while True:
+            page = db.fetch_page(sort_by=SortByOptions["ctc"], order=OrderOptions["desc"], limit=2, cursor=cursor, with_total=True)
+            assert page.total == 5
+            ctcs.extend(item.company.ctc for item in page.items)
+            pages += 1
+            cursor = page.next_cursor
+            if cursor is None: break
+        assert pages == 3
+        assert ctcs == sorted((1000 * (i % 3) for i in range(5)), reverse=True)
+        page = db.search_page(college_name="lege 1", limit=10)
+        assert {item.company.company_name for item in page.items} == {"Company 1", "Company 3"}
+        assert page.next_cursor is None and page.total is None
+
+    def test_query_rows(self):
+        from sqlalchemy import event
+        for i in range(6): db.add_data(f"College {i % 2}", company_name=f"Company {i}", role="SDE" if i % 3 else "PM", ctc=1000 * i)
+        query = PlacementQuery(college_name="lege 1", role="sde", ctc_min=1000, ctc_max=5000, sort_by=SortByOptions["ctc"], order=OrderOptions["desc"])
+        statements = []
+        count = lambda *args: statements.append(args[2])
+        event.listen(db.engine, "before_cursor_execute", count)
+        try: page = db.query_rows(query)
+        finally: event.remove(db.engine, "before_cursor_execute", count)
+        assert len(statements) == 1
+        assert [(row.company_name, row.ctc) for row in page.items] == [("Company 5", 5000), ("Company 1", 1000)]
+        page = db.query_rows(query._replace(limit=1))
+        assert [row.company_name for row in page.items] == ["Company 5"]
+        page = db.query_rows(query._replace(limit=1, cursor=page.next_cursor))
+        assert [row.company_name for row in page.items] == ["Company 1"] and page.next_cursor is None
+        assert [row.ctc for row in db.query_rows(PlacementQuery(ctc_max=2000, sort_by=SortByOptions["ctc"])).items] == [0, 1000, 2000]
+
+    def test_iter_export_rows(self):
+        db.add_data("IIT Patna", company_name="Google", role="CTO", ctc=50000, hr_name="laksh")
+        db.add_data("IIT Delhi", company_name="Meta", role="SDE", ctc=100)
+        rows = sorted(db.iter_export_rows(chunk_size=1))
+        assert rows == [("IIT Delhi", "Meta", "SDE", 100.0, None, None, None, None),
+                        ("IIT Patna", "Google", "CTO", 50000.0, "laksh", None, None, None)]
+
+    def test_search_index(self):
+        db.add_data("IIT Patna", company_name="Google", role="SDE", ctc=100)
+        db.add_data("Patna University", company_name="Google India", role="SDE Intern", ctc=10)
+        db.add_data("NIT Trichy", company_name="Meta", role="PM", ctc=200)
+        assert {item.college.college_name for item in db.search_by_college("patna")} == {"IIT Patna", "Patna University"}
+        # the exact match ranks first
+        assert [item.company.company_name for item in db.search_by_company("google")] == ["Google", "Google India"]
+        assert [item.company.role for item in db.search_with_filters(college_name="patna", role="sde")] == ["SDE", "SDE Intern"]
+        # terms shorter than a trigram fall back to ILIKE
+        assert [item.company.role for item in db.search_by_role("pm")] == ["PM"]
+        # the index follows deletes
+        college = College.get(db.session, college_name="NIT Trichy")
+        db.session.delete(college)
+        db.commit()
+        assert db.search_by_college("trichy") == []
+
+    def test_rollups(self):
+        db.add_data("IIT Patna", company_name="Google", role="SDE", ctc=100)
+        db.add_data("IIT Patna", company_name="Meta", role="SDE", ctc=300)
+        db.bulk_add_data([{"college_name": "IIT Delhi", "company_name": "Google", "role": "SDE", "ctc": 100},
+                          {"college_name": "IIT Delhi", "company_name": "Amazon", "role": "SDE", "ctc": 50}])
+        summary = db.get_analytics_summary()
+        assert (summary.total_placements, summary.min_ctc, summary.max_ctc) == (4, 50, 300)
+        assert summary.average_ctc == 550 / 4
+        assert db.get_top_companies_by_visits(1) == [TopListItem(name="Google", count=2)]
+
+        db.remove_relation(college=College.get(db.session, "IIT Patna"), company=Company.get(db.session, "Meta", "SDE", 300))
+        db.commit()
+        summary = db.get_analytics_summary()
+        assert (summary.total_placements, summary.total_companies, summary.max_ctc) == (3, 2, 100)
+        assert db.check_rollups().consistent
+
+        db.session.query(CompanyVisits).delete()
+        db.commit()
+        diff = db.check_rollups(repair=True)
+        assert not diff.consistent and len(diff.companies) == 2
+        assert db.check_rollups().consistent
+
+    def test_migrate(self):
+        from sqlalchemy import inspect
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql("DROP INDEX ix_companies_ctc")
+            conn.exec_driver_sql("DELETE FROM schema_migrations")
+        assert "ix_companies_ctc" not in {index["name"] for index in inspect(db.engine).get_indexes("companies")}
+        assert db.migrate() == [migration.version for migration in MIGRATIONS]
+        assert "ix_companies_ctc" in {index["name"] for index in inspect(db.engine).get_indexes("companies")}
+        assert db.migrate() == []
+
+    def test_projection_rows(self):
+        db.add_data("IIT Patna", company_name="Google", role="CTO", ctc=50000, hr_name="laksh")
+        db.add_data("IIT Delhi", company_name="Meta", role="SDE", ctc=100)
+        rows = db.fetch_all_rows(sort_by=SortByOptions["ctc"], order=OrderOptions["desc"])
+        items = db.fetch_all_data_sorted(sort_by=SortByOptions["ctc"], order=OrderOptions["desc"])
+        assert [(row.college_name, row.company_name, row.ctc, row.hr_name) for row in rows] == \
+               [(item.college.college_name, item.company.company_name, item.company.ctc, item.person.name if item.person else None) for item in items]
+        assert [row.company_name for row in db.search_rows(company_name="meta")] == ["Meta"]
+        page = db.fetch_page(limit=1, projection=True)
+        assert isinstance(page.items[0], PlacementRow) and page.next_cursor is not None
+
+    def test_delete_by_key(self):
+        from sqlalchemy import event
+        db.bulk_add_data([{"college_name": "IIT Patna", "company_name": f"Company {i}", "role": "SDE", "ctc": 100 + i} for i in range(50)])
+        db.add_data("IIT Delhi", company_name="Google", role="SDE", ctc=500, hr_name="laksh")
+        statements = []
+        count = lambda *args: statements.append(args[2])
+        event.listen(db.engine, "before_cursor_execute", count)
+        try:
+            assert db.delete_data("IIT Patna", company_name="Company 7", role="SDE", ctc=107)
+            db.commit()
+            well_connected = len(statements); statements.clear()
+            assert db.delete_data("IIT Delhi", company_name="Google", role="SDE", ctc=500)
+            db.commit()
+        finally: event.remove(db.engine, "before_cursor_execute", count)
+        assert well_connected <= len(statements) # the 49 other companies of IIT Patna aren't loaded
+        assert not db.delete_data("IIT Delhi", company_name="Google", role="SDE", ctc=500)
+        assert not db.delete_data("IIT Patna", company_name="Company 8", role="SDE", ctc=500) # both exist, not linked
+        assert [college.college_name for college in db.fetch_all_colleges()] == ["IIT Patna"]
+        assert len(db.fetch_all_companies()) == 49
+        assert db.session.query(Person).count() == 0
+        assert db.check_rollups().consistent
+
+        # Two deletes that both read the row before either deleted it: the rollups and deltas count it once
+        row = db.fetch_all_rows()[0]
+        assert db._delete_placement(college_id=row.college_id, company_id=row.company_id, ctc=row.ctc)
+        assert not db._delete_placement(college_id=row.college_id, company_id=row.company_id, ctc=row.ctc)
+        db.commit()
+        assert db.check_rollups().consistent and len(db.fetch_all_rows()) == 48
+
+        # Re-adding right after the orphan delete, in the same session
+        assert db.delete_data("IIT Patna", company_name="Company 49", role="SDE", ctc=149)
+        db.add_data("IIT Patna", company_name="Company 49", role="SDE", ctc=149)
+        assert len(db.fetch_all_companies()) == 48
+
+    def test_apply_batch(self):
+        from sqlalchemy import event
+        db.add_data("IIT Patna", company_name="Google", role="SDE", ctc=100, hr_name="laksh")
+        db.add_data("IIT Delhi", company_name="Meta", role="SDE", ctc=200)
+
+        def batch(size: int) -> List[BatchOp]:
+            ops = [BatchOp(op=BatchOpOptions["add"], new=IngestRow(f"College {i}", f"Company {i}", "SDE", 10 + i)) for i in range(size)]
+            return ops + [
+                BatchOp(op=BatchOpOptions["add"], new=IngestRow("IIT Patna", "Google", "SDE", 100)),
+                BatchOp(op=BatchOpOptions["edit"], old=PlacementKey("IIT Patna", "Google", "SDE", 100), new=IngestRow("IIT Patna", "Google", "SDE", 150)),
+                BatchOp(op=BatchOpOptions["delete"], old=PlacementKey("IIT Delhi", "Meta", "SDE", 200)),
+                BatchOp(op=BatchOpOptions["add"], new=IngestRow("IIT Delhi", "Meta", "SDE", 200, hr_name="new hr")), # re-added, new person
+            ]
+        statements = []
+        count = lambda *args: statements.append(args[2])
+        event.listen(db.engine, "before_cursor_execute", count)
+        try:
+            report = db.apply_batch(batch(5), batch_size=100)
+            small = len(statements); statements.clear()
+            db.apply_batch(batch(50)[:50], batch_size=100)
+        finally: event.remove(db.engine, "before_cursor_execute", count)
+        assert len(statements) <= small # grouped lookups, not one query per operation
+        assert report.applied
+        assert [result.status for result in report.results][5:] == ["duplicate", "edited", "deleted", "added"]
+        rows = {(row.college_name, row.company_name, row.ctc): row.hr_name for row in db.fetch_all_rows()}
+        assert ("IIT Patna", "Google", 100) not in rows and rows[("IIT Patna", "Google", 150)] is None
+        assert rows[("IIT Delhi", "Meta", 200)] == "new hr"
+        assert db.session.query(Person).count() == 1 # laksh went with the edited placement
+        assert db.check_rollups().consistent
+
+        # All or nothing: the delete of a missing placement fails the batch
+        version = db.get_version()
+        report = db.apply_batch([
+            BatchOp(op=BatchOpOptions["add"], new=IngestRow("IIT Bombay", "Google", "SDE", 150)),
+            BatchOp(op=BatchOpOptions["delete"], old=PlacementKey("IIT Bombay", "Meta", "SDE", 200)),
+        ])
+        assert not report.applied
+        assert [result.status for result in report.results] == ["skipped", "not_found"]
+        assert db.get_version() == version and "IIT Bombay" not in {college.college_name for college in db.fetch_all_colleges()}
+
+    def test_write_args(self):
+        from werkzeug.exceptions import BadRequest
+        from ..serializers import get_add_args, get_edit_args, get_batch_ops
+        # Cleaned like bulk ingestion: " IIT Delhi" from /add is the college /upload-csv knows as "IIT Delhi"
+        args = get_add_args({"college_name": " IIT Delhi", "company_name": "Google ", "role": "SDE", "ctc": "10", "hr_name": " "})
+        assert args == {"college_name": "IIT Delhi", "company_name": "Google", "role": "SDE", "ctc": 10.0,
+                        "hr_name": None, "linkedin_id": None, "email": None, "contact_number": None}
+        for data in ({"college_name": " ", "company_name": "Google", "role": "SDE", "ctc": 10}, {"college_name": "IIT Delhi", "company_name": "Google", "role": "SDE", "ctc": -1},
+                     {"college_name": "IIT Delhi", "company_name": "Google", "role": "SDE", "ctc": "nan"}):
+            with self.assertRaises(BadRequest): get_add_args(data)
+        old = {"old_college_name": "IIT Delhi", "old_company_name": "Google", "old_role": "SDE", "old_ctc": 10}
+        assert get_edit_args({**old, "new_role": " PM "})[1]["role"] == "PM"
+        for new in ({"new_role": ""}, {"new_ctc": -5}):
+            with self.assertRaises(BadRequest): get_edit_args({**old, **new})
+        ops, results = get_batch_ops({"operations": [{"op": "add", "college_name": "IIT Delhi", "company_name": "Google", "role": "SDE", "ctc": -1}]})
+        assert [result.reason for result in results] == ["ctc must be a non-negative real number"]
@@ -0,0 +1,56 @@
+import statistics
+from unittest import TestCase
+import numpy as np
+from werkzeug.exceptions import BadRequest
+from . import *
+from ..cache import VersionedValue
+from ..distribution import load_snapshot, distribution_report
+from ..serializers import get_distribution_args
+
+PLACEMENTS = [("IIT Patna", "Google", "SDE", 100.0), ("IIT Patna", "Meta", "SDE", 80.0), ("IIT Patna", "Meta", "PM", 60.0),
+              ("IIT Delhi", "Google", "SDE", 120.0), ("IIT Delhi", "Amazon", "PM", 70.0), ("IIT Delhi", "Amazon", "SDE", 95.5),
+              ("NIT Trichy", "Google", "SDE", 40.0), ("NIT Trichy", "Flipkart", "Analyst", 30.0)]
+
+class TestDistribution(TestCase):
+    def setUp(self):
+        self.db = PostgreSQL(db_url='sqlite:///:memory:')
+        for college_name, company_name, role, ctc in PLACEMENTS: self.db.add_data(college_name=college_name, company_name=company_name, role=role, ctc=ctc)
+        self.db.commit()
+
+    def tearDown(self): self.db.remove()
+
+    def test_report_matches_sql(self):
+        snapshot = load_snapshot(self.db, self.db.get_version())
+        report = distribution_report(snapshot, percentiles=[10, 50, 99], bins=4, limit=2,
+                                     groups={"IIT": ["IIT Patna", "IIT Delhi"], "NIT": ["NIT Trichy", "NIT Surat"]})
+        rows = self.db.fetch_all_rows() # the SQL path
+        ctc = [row.ctc for row in rows]
+        assert report.summary.count == len(rows) and report.summary.mean == statistics.fmean(ctc)
+        assert (report.summary.min, report.summary.max) == (min(ctc), max(ctc))
+        assert report.summary.percentiles == dict(zip(["p10", "p50", "p99"], np.percentile(ctc, [10, 50, 99]).tolist()))
+        counts, edges = np.histogram(ctc, bins=4)
+        assert report.histogram.counts == counts.tolist() and report.histogram.edges == edges.tolist()
+        # The two roles with the most placements, then the two biggest colleges
+        assert [(item.name, item.count, item.median) for item in report.role_medians] == [
+            ("SDE", 5, statistics.median([row.ctc for row in rows if row.role == "SDE"])), ("PM", 2, 65.0)]
+        assert {item.name: item.median for item in report.college_medians} == {"IIT Patna": 80.0, "IIT Delhi": 95.5}
+        iit, nit = report.comparison
+        assert iit.summary.count == 6 and iit.median_change is None and nit.missing == ["NIT Surat"]
+        assert nit.summary.percentiles["p50"] == 35.0 and nit.median_change == 35.0 - iit.summary.percentiles["p50"]
+        assert nit.mean_change_pct == (35.0 - iit.summary.mean) / iit.summary.mean * 100
+
+    def test_snapshot_cache(self):
+        snapshots = VersionedValue()
+        build = lambda version: load_snapshot(self.db, version)
+        first = snapshots.get(self.db.get_version(), build)
+        assert snapshots.get(self.db.get_version(), build) is first and snapshots.get(0, build) is first # an older version doesn't rebuild
+        self.db.add_data(college_name="NIT Surat", company_name="Google", role="SDE", ctc=55)
+        self.db.commit()
+        assert snapshots.get(self.db.get_version(), build).colleges.codes.keys() >= {"NIT Surat"} and snapshots.builds == 2
+        empty = distribution_report(load_snapshot(PostgreSQL(db_url='sqlite:///:memory:'), 0))
+        assert empty.summary.count == 0 and empty.histogram.counts == [] and empty.role_medians == []
+
+    def test_args(self):
+        assert get_distribution_args({"percentiles": "10,90", "bins": "5"}) == {"percentiles": [10.0, 90.0], "bins": 5}
+        for data in ({"percentiles": [101]}, {"bins": 0}, {"limit": "x"}, {"groups": {"A": "IIT Patna"}}):
+            with self.assertRaises(BadRequest): get_distribution_args(data)
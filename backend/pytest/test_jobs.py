@@ -0,0 +1,63 @@
+import io, os, tempfile, time
+from unittest import TestCase
+from sqlalchemy import update
+from . import *
+from ..jobs import ImportJobRunner, JobError, iter_chunks
+
+HEADER = ",".join(INGEST_COLUMNS) + "\n"
+
+def make_csv(n: int, bad: int = 0, hr_name=lambda i: "") -> bytes:
+    lines = [f"College {i % 3},Company {i},SDE,{i},{hr_name(i)},,,{9000000000 + i}\n" for i in range(n)]
+    lines += [f"College 0,Company {i},SDE,not a number,,,,\n" for i in range(bad)]
+    return (HEADER + "".join(lines)).encode()
+
+class TestImportJobs(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = PostgreSQL("sqlite:///" + os.path.join(self.tmpdir.name, "database.db"), create_schema=True)
+        self.runner = ImportJobRunner(self.db, spool_dir=os.path.join(self.tmpdir.name, "spool"), workers=2, chunk_rows=4)
+
+    def tearDown(self):
+        self.runner.shutdown()
+        self.db.remove()
+        self.db.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def test_import(self):
+        job_id = self.runner.submit(io.BytesIO(make_csv(10, bad=2)), "placements.csv")
+        self.runner.wait(job_id, timeout=30)
+        job = self.db.get_import_job(job_id)
+        assert job.status == JobStatusOptions["done"] and job.error is None
+        assert (job.total_rows, job.rows_processed, job.accepted, job.rejected) == (12, 12, 10, 2)
+        assert [result.row for result in job.rejected_rows] == [10, 11] and job.eta_seconds == 0.0
+        assert not os.path.exists(job.path)
+        rows = self.db.fetch_all_rows()
+        assert len(rows) == 10 and all(row.contact_number.isdigit() for row in rows) # kept as text, not parsed as a number
+
+    def test_resume(self):
+        # Quoted line breaks (and quotes) in some fields: the rows span more lines than they are
+        hr_name = lambda i: '"HR\nof ""Company""\n' + str(i) + '"' if i % 2 else f"HR {i}"
+        job_id = self.runner.submit(io.BytesIO(make_csv(10, hr_name=hr_name)), "placements.csv", schedule=False)
+        # A runner that died after its first chunk: claimed, one chunk committed, heartbeat gone stale
+        job = self.db.claim_import_job(job_id, "dead-runner", time.time())
+        start, records, offset = next(iter_chunks(job.path, job.file_format, 0, 4))
+        assert [record["company_name"] for record in records] == [f"Company {i}" for i in range(4)]
+        assert self.db.import_job_chunk(job_id, "dead-runner", records, start, offset)
+        assert not self.db.import_job_chunk(job_id, "dead-runner", records, start, offset) # already committed
+        assert self.db.get_import_job(job_id).checkpoint_offset == offset
+        self.db.session.execute(update(ImportJob).where(ImportJob.id == job_id).values(heartbeat_at=0))
+        self.db.commit()
+        self.db.remove()
+
+        assert self.runner.resume() == [job_id]
+        self.runner.wait(job_id, timeout=30)
+        job = self.db.get_import_job(job_id)
+        assert job.status == JobStatusOptions["done"] and (job.rows_processed, job.accepted, job.duplicates) == (10, 10, 0)
+        rows = self.db.fetch_all_rows()
+        assert sorted((row.company_name, row.hr_name) for row in rows) == sorted((f"Company {i}", f'HR\nof "Company"\n{i}' if i % 2 else f"HR {i}") for i in range(10))
+        assert not self.db.import_job_chunk(job_id, "dead-runner", records, 4) # the old owner lost the job
+
+    def test_invalid_uploads(self):
+        with self.assertRaises(JobError): self.runner.submit(io.BytesIO(make_csv(1)), "placements.txt")
+        with self.assertRaises(JobError): self.runner.submit(io.BytesIO(b"college_name,ctc\nA,1\n"), "placements.csv")
+        assert os.listdir(self.runner.spool_dir) == []
@@ -0,0 +1,43 @@
+from unittest import TestCase
+import json
+import pytest
+from . import *
+from ..json_encoding import StdlibJSON, OrjsonJSON, orjson
+from ..serializers import RowFragmentCache, get_dict_from_row
+
+BACKENDS = [StdlibJSON()] + ([OrjsonJSON()] if orjson is not None else [])
+
+class TestJSONEncoding(TestCase):
+    def test_backends(self):
+        data = {"b": [1, 2.5, None, True], "a": {"nested": "é \" \\"}, "row": PlacementRow(1, 2, "IIT Patna", "Google", "SDE", 100.0)}
+        for backend in BACKENDS:
+            encoded = backend.dumps(data)
+            assert isinstance(encoded, bytes) and encoded.startswith(b'{"a":')
+            assert backend.loads(encoded) == json.loads(json.dumps(data))
+        assert len({backend.loads(backend.dumps(data, indent=True)) == backend.loads(backend.dumps(data)) for backend in BACKENDS}) == 1
+
+    def test_row_fragments(self):
+        rows = [PlacementRow(1, 1, "IIT Patna", "Google", "SDE", 100.0, "laksh", None, "l@x.in"), PlacementRow(2, 1, "IIT \"Delhi\"", "Google", "SDE", 100.0),
+                PlacementRow(1, 2, "IIT Patna", "Méta", "PM", 50.5)]
+        for backend in BACKENDS:
+            fragments = RowFragmentCache(backend, max_entries=3)
+            assert json.loads(fragments.encode_rows(rows)) == [get_dict_from_row(idx, row) for idx, row in enumerate(rows)]
+            assert fragments.encode_rows([]) == b"[]"
+            assert fragments.stats().misses == 4 and fragments.stats().evictions == 1
+            # An updated company re-encodes under the same id instead of serving the old fragment
+            renamed = [rows[0]._replace(company_name="Alphabet", ctc=120.0)]
+            assert json.loads(fragments.encode_rows(renamed)) == [get_dict_from_row(0, renamed[0])]
+            fragments.invalidate(college_ids=[1])
+            hits = fragments.stats().hits
+            fragments.encode_rows(renamed)
+            assert fragments.stats().hits == hits + 1 # the company fragment, the college was dropped
+
+    def test_row_fragments_every_field(self):
+        # The fragments are written by hand: every field of get_dict_from_row, each with its own value, must come out the same
+        row = PlacementRow(**{**{name: f"{name} é\"\\" for name in PlacementRow._fields}, "college_id": 1, "company_id": 2, "ctc": 12.5})
+        expected = get_dict_from_row(0, row)
+        assert len(set(expected.values())) == len(expected)
+        for backend in BACKENDS:
+            fragments = RowFragmentCache(backend)
+            for _ in range(2): # encoded, then from the cache
+                assert backend.loads(fragments.encode_rows([row])) == backend.loads(backend.dumps([expected]))
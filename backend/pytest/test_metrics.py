@@ -0,0 +1,56 @@
+import logging
+from unittest import TestCase
+import pytest
+from flask import Flask, jsonify
+from sqlalchemy import text
+from . import *
+from ..metrics import Metrics, Histogram
+from .. import compression
+
+class TestMetrics(TestCase):
+    def setUp(self):
+        self.db = db = PostgreSQL(db_url='sqlite:///:memory:') # own engine, the listeners stay off the shared one
+        self.metrics = Metrics(slow_query_ms=1e-6) # every statement counts as slow
+        self.metrics.instrument_engine(db.engine)
+        self.metrics.watch_pool(db.pool_monitor)
+        self.app = Flask(__name__)
+        self.metrics.init_app(self.app)
+        compression.init_app(self.app, minimum_size=0) # registered after metrics, as create_app does
+        @self.app.route('/rows')
+        def rows():
+            try: return jsonify([row.college_name for row in db.fetch_all_rows()])
+            finally: db.remove()
+        @self.app.route('/placements')
+        def placements():
+            try: return jsonify(sum(1 for _ in db.session.execute(text("SELECT * FROM company_college"))))
+            finally: db.remove()
+
+    def test_request_stats(self):
+        self.db.add_data("IIT Patna", company_name="Google", role="CTO", ctc=50000)
+        self.db.add_data("IIT Delhi", company_name="Google", role="CTO", ctc=50000)
+        self.db.commit()
+        client = self.app.test_client()
+        with self.assertLogs("backend.metrics", level=logging.WARNING) as logs:
+            assert sorted(client.get("/rows").json) == ["IIT Delhi", "IIT Patna"]
+        assert any("slow query" in line and "/rows" in line for line in logs.output)
+        assert self.metrics.queries.count("/rows") == 1 and self.metrics.queries.sum("/rows") == 1
+        assert self.metrics.rows.sum("/rows") == 2
+        assert self.metrics.serialization.sum("/rows") > 0
+        assert self.metrics.response_size.sum("/rows") == len(client.get('/rows').data)
+        compressed = client.get('/rows', headers={"Accept-Encoding": "gzip"})
+        assert compressed.headers["Content-Encoding"] == "gzip" and self.metrics.response_size.sum("/rows") == 2 * len(client.get('/rows').data) + len(compressed.data)
+        assert self.metrics.rows.sum("/rows") == 8
+        assert client.get('/placements').json == 2 and self.metrics.rows.sum("/placements") == 2 # fetched one at a time
+        assert self.db.engine.raw_connection().driver_connection.row_factory is None
+        body = client.get('/metrics').get_data(as_text=True)
+        assert 'http_requests_total{route="/rows",method="GET",status="200"} 4' in body
+        assert 'db_queries_per_request_bucket{route="/rows",le="1"} 4' in body
+        assert 'db_pool_checkout_wait_seconds_count{pool="0"}' in body
+
+    def test_histogram(self):
+        histogram = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1, float("inf")))
+        for value in (0.05, 0.5, 5): histogram.observe(value, "/view")
+        assert histogram.render()[2:] == [
+            'latency_seconds_bucket{route="/view",le="0.1"} 1', 'latency_seconds_bucket{route="/view",le="1"} 2',
+            'latency_seconds_bucket{route="/view",le="+Inf"} 3', 'latency_seconds_sum{route="/view"} 5.55', 'latency_seconds_count{route="/view"} 3',
+        ]
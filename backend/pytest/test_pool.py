@@ -0,0 +1,76 @@
+import os, tempfile, threading
+from unittest import TestCase
+import pytest
+from sqlalchemy import text
+from . import *
+from ..pool import WaitHistogram
+
+class TestPool(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = PostgreSQL("sqlite:///" + os.path.join(self.tmpdir.name, "database.db"))
+
+    def tearDown(self):
+        self.db.remove()
+        self.db.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def test_sqlite_preset(self):
+        assert self.db.session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        self.db.remove()
+        stats = self.db.pool_stats()
+        assert stats.pool_class == "TimedQueuePool" and stats.checked_out == 0 and stats.wait_count > 0
+        assert stats.wait_buckets["+Inf"] == stats.wait_count
+
+    def test_single_writer(self):
+        errors = []
+        def write(i):
+            for j in range(10):
+                try:
+                    self.db.add_data(college_name=f"College {i}", company_name=f"Company {i}-{j}", role="SDE", ctc=j)
+                    self.db.commit()
+                except Exception as e: errors.append(e)
+                finally: self.db.remove()
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        assert errors == []
+        assert len(self.db.fetch_all_rows()) == 40
+        assert self.db.check_rollups().consistent
+
+    def test_concurrent_delete_and_add(self):
+        # Each delete orphans a college while an add, with the college's id cached, links a new company to it
+        for i in range(20): self.db.add_data(college_name=f"College {i}", company_name="Old", role="SDE", ctc=i)
+        self.db.remove()
+        errors, barrier = [], threading.Barrier(2)
+        def write(i, step):
+            barrier.wait()
+            try: step(i)
+            except Exception as e: errors.append(e)
+            finally: self.db.remove()
+        def delete(i):
+            assert self.db.delete_data(f"College {i}", company_name="Old", role="SDE", ctc=i)
+            self.db.commit()
+        add = lambda i: self.db.add_data(college_name=f"College {i}", company_name="New", role="SDE", ctc=i)
+        threads = [threading.Thread(target=lambda step=step: [write(i, step) for i in range(20)]) for step in (delete, add)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        assert errors == []
+        assert sorted((row.college_name, row.company_name) for row in self.db.fetch_all_rows()) == sorted((f"College {i}", "New") for i in range(20))
+        assert self.db.session.query(CompanyCollege).count() == 20 and len(self.db.fetch_all_colleges()) == 20
+        assert self.db.check_rollups().consistent
+
+    def test_wait_histogram(self):
+        histogram = WaitHistogram(buckets=(0.01, 1.0, float("inf")))
+        for seconds in (0.001, 0.5, 3): histogram.observe(seconds)
+        assert histogram.snapshot() == (3, 3.501, 3, {"0.01": 1, "1.0": 2, "+Inf": 3})
+
+    def test_lazy_database(self):
+        created = []
+        lazy = LazyDatabase(lambda: PostgreSQL("sqlite:///" + os.path.join(self.tmpdir.name, "lazy.db"), create_schema=False), on_create=created.append)
+        lazy.remove()
+        assert not lazy.created and not created # no engine until something needs it
+        assert lazy.create_all() == sorted(migration.version for migration in MIGRATIONS) # init-db on an empty file
+        assert lazy.create_all() == [] and created == [lazy.get()] and lazy.get_version() == 0
+        lazy.remove()
+        lazy.engine.dispose()
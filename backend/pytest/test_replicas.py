@@ -0,0 +1,96 @@
+import importlib, os, sqlite3, tempfile
+from unittest import TestCase
+from . import *
+
+# The module models uses, this package imports the backend modules under other names
+replicas = importlib.import_module(ReplicaSet.__module__)
+required_version, written_version = replicas.required_version, replicas.written_version
+
+def copy_database(source: str, target: str) -> None:
+    """A replica that has caught up to `source` right now."""
+    src, dst = sqlite3.connect(source), sqlite3.connect(target)
+    try: src.backup(dst)
+    finally: src.close(); dst.close()
+
+class TestReplicas(TestCase):
+    def break_replica(self, idx: int) -> None:
+        """Replica `idx` loses its data: reopened as an empty file, its probe fails."""
+        self.db.replicas.replicas[idx].engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.paths[idx + 1] + suffix): os.remove(self.paths[idx + 1] + suffix)
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.paths = [os.path.join(self.tmpdir.name, name) for name in ("primary.db", "replica-1.db", "replica-2.db")]
+        primary = PostgreSQL("sqlite:///" + self.paths[0], create_schema=True)
+        primary.add_data(college_name="IIT Patna", company_name="Google", role="SDE", ctc=100)
+        primary.commit()
+        primary.remove()
+        primary.engine.dispose()
+        for path in self.paths[1:]: copy_database(self.paths[0], path)
+        self.db = PostgreSQL("sqlite:///" + self.paths[0], replica_urls=["sqlite:///" + path for path in self.paths[1:]])
+        self.db.replicas.check_interval = 0 # checks run when the test says so
+        # The primary moves on, the replicas lag one write behind
+        self.db.add_data(college_name="IIT Delhi", company_name="Meta", role="PM", ctc=50)
+        self.db.commit()
+        self.db.remove()
+
+    def tearDown(self):
+        required_version.set(0)
+        written_version.set(None)
+        self.db.remove()
+        self.db.replicas.close()
+        self.db.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def test_routing(self):
+        assert [stats.version for stats in self.db.replicas.check()] == [1, 1]
+        assert written_version.get() == 2 # the client's read-your-writes token
+        assert self.db.get_version() == 1 and len(self.db.fetch_all_rows()) == 1 # both from the session's replica
+        assert len(list(self.db.iter_export_rows())) == 1 and self.db.get_analytics_summary().total_placements == 1
+        self.db.remove()
+        # A session that writes reads from the primary from then on, its own write included
+        self.db.add_data(college_name="IIT Bombay", company_name="Meta", role="PM", ctc=70)
+        assert len(self.db.fetch_all_rows()) == 3
+        self.db.commit()
+        assert len(self.db.fetch_all_rows()) == 3 and written_version.get() == 3
+        self.db.remove()
+        # Read-your-writes across requests: no replica has version 3 yet, then one catches up
+        required_version.set(3)
+        assert len(self.db.fetch_all_rows()) == 3
+        self.db.remove()
+        copy_database(self.paths[0], self.paths[2])
+        self.db.replicas.check()
+        assert len(self.db.fetch_all_rows()) == 3 and self.db.session.info["replica"] is self.db.replicas.replicas[1]
+
+    def test_strategies(self):
+        self.db.replicas.check()
+        chosen = []
+        for _ in range(4):
+            self.db.get_version()
+            chosen.append(self.db.session.info["replica"])
+            self.db.remove()
+        assert chosen == self.db.replicas.replicas * 2 # round robin
+        self.db.replicas.strategy = "least_connections"
+        busy = self.db.replicas.replicas[0].engine.connect()
+        try:
+            for _ in range(2):
+                self.db.get_version()
+                assert self.db.session.info["replica"] is self.db.replicas.replicas[1]
+                self.db.remove()
+        finally: busy.close()
+        assert [stats.sessions for stats in self.db.replica_stats()] == [2, 4]
+
+    def test_eviction(self):
+        self.break_replica(0)
+        stats = self.db.replicas.check()
+        assert [s.healthy for s in stats] == [False, True] and stats[0].failures == 1 and "no such table" in stats[0].last_error
+        for _ in range(3):
+            assert self.db.get_version() == 1 and self.db.session.info["replica"] is self.db.replicas.replicas[1]
+            self.db.remove()
+        self.break_replica(1)
+        self.db.replicas.check()
+        assert self.db.get_version() == 2 and self.db.session.info["replica"] is None # the primary serves
+        self.db.remove()
+        copy_database(self.paths[0], self.paths[1])
+        assert [s.healthy for s in self.db.replicas.check()] == [True, False] # back in rotation
@@ -0,0 +1,188 @@
+"""
+Read replicas (`DATABASE_REPLICA_URLS`) for the read-only methods of `PostgreSQL`.
+
+A session sends its statements to the primary unless it runs a method marked `@reads` (listings, search, export,
+analytics, the dataset version) and has written nothing yet; it then picks one replica for its whole lifetime, so
+the version a response is cached under and its rows come from the same database. The first write (or flush) pins
+the session to the primary: later reads in it see its own writes.
+
+Across requests, read-your-writes goes through the dataset version: a write response carries the version it
+committed (`X-Dataset-Version`), a client that sends it back (`X-Min-Dataset-Version`) is only served by a replica
+that has caught up to it, otherwise by the primary. Replica versions come from the health checks, run every
+`REPLICA_HEALTH_CHECK_SECONDS` on a background thread. A replica failing its check, or a statement with a connection
+error, is evicted until a check passes again.
+"""
+import itertools, logging, threading
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.dml import UpdateBase
+
+from constants import REPLICA_STRATEGY, REPLICA_HEALTH_CHECK_SECONDS
+from pool import PoolMonitor, engine_options, configure_engine
+
+logger = logging.getLogger(__name__)
+
+REPLICA_STRATEGIES = ("round_robin", "least_connections")
+
+# session.info keys
+READS_KEY = "replica_reads" # depth of `@reads` methods running
+PRIMARY_KEY = "replica_primary" # the session wrote, it stays on the primary
+REPLICA_KEY = "replica" # the replica the session reads from
+WRITTEN_VERSION_KEY = "written_version" # dataset version of the write in progress
+
+VERSION_HEADER = "X-Dataset-Version" # on write responses
+MIN_VERSION_HEADER = "X-Min-Dataset-Version" # on requests that must see that write
+
+# Read-your-writes token of the current request (context), outlives its sessions
+required_version: ContextVar[int] = ContextVar("required_version", default=0)
+# Dataset version of the last write committed in this context, the token handed to the client
+written_version: ContextVar[Optional[int]] = ContextVar("written_version", default=None)
+
+class ReplicaStats(NamedTuple):
+    url: str # without password
+    healthy: bool
+    version: Optional[int] # dataset version seen by the last health check
+    checked_out: int # connections in use right now
+    sessions: int # sessions routed here so far
+    failures: int
+    last_error: Optional[str]
+
+class Replica:
+    def __init__(self, url: str):
+        self.url = url
+        self.monitor = PoolMonitor()
+        self.engine: Engine = create_engine(url, **engine_options(url, self.monitor))
+        configure_engine(self.engine, self.monitor, single_writer=False) # never written through
+        self.healthy = True
+        self.version: Optional[int] = None
+        self.sessions = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        event.listen(self.engine, "handle_error", self._handle_error)
+
+    @property
+    def checked_out(self) -> int:
+        pool = self.engine.pool
+        return pool.checkedout() if isinstance(pool, QueuePool) else 0
+
+    def evict(self, error: BaseException) -> None:
+        if self.healthy: logger.warning("Replica %s evicted: %s", self.stats().url, error)
+        self.healthy = False
+        self.failures += 1
+        self.last_error = str(error)
+
+    def _handle_error(self, context: Any) -> None:
+        # Connection lost or refused, the statement fails and the replica waits for its next passing check
+        if context.is_disconnect or context.connection is None: self.evict(context.original_exception)
+
+    def stats(self) -> ReplicaStats:
+        return ReplicaStats(url=make_url(self.url).render_as_string(hide_password=True), healthy=self.healthy, version=self.version,
+                            checked_out=self.checked_out, sessions=self.sessions, failures=self.failures, last_error=self.last_error)
+
+class ReplicaSet:
+    """
+    The replicas of one primary. `probe` reads the dataset version over a replica connection; `check_interval`
+    seconds between background health checks, 0 runs them only through `check()`.
+    """
+    def __init__(self, urls: Iterable[str], probe: Callable[[Connection], int], strategy: str = REPLICA_STRATEGY,
+                 check_interval: float = REPLICA_HEALTH_CHECK_SECONDS):
+        if strategy not in REPLICA_STRATEGIES: raise ValueError(f"Unknown replica strategy {strategy}, expected one of " + ", ".join(REPLICA_STRATEGIES))
+        self.replicas = [Replica(url) for url in urls]
+        self.probe = probe
+        self.strategy = strategy
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._turns = itertools.count()
+        self._checker: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def choose(self, min_version: int = 0) -> Optional[Replica]:
+        """A healthy replica at `min_version` or later, None when the primary has to serve."""
+        if self.check_interval > 0 and self._checker is None: self._start_checker()
+        candidates = [replica for replica in self.replicas if replica.healthy and (min_version <= 0 or (replica.version or 0) >= min_version)]
+        if not candidates: return None
+        if self.strategy == "least_connections":
+            fewest = min(replica.checked_out for replica in candidates)
+            candidates = [replica for replica in candidates if replica.checked_out == fewest]
+        with self._lock:
+            replica = candidates[next(self._turns) % len(candidates)] # round robin, among the least busy
+            replica.sessions += 1
+        return replica
+
+    def check(self) -> List[ReplicaStats]:
+        """Probes every replica: evicts the failing ones, re-admits those that answer and records their version."""
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn: replica.version = self.probe(conn)
+                if not replica.healthy: logger.info("Replica %s back in rotation", replica.stats().url)
+                replica.healthy = True
+            except DBAPIError as e: replica.evict(e)
+        return self.stats()
+
+    def stats(self) -> List[ReplicaStats]: return [replica.stats() for replica in self.replicas]
+
+    def close(self) -> None:
+        self._stopping.set()
+        for replica in self.replicas: replica.engine.dispose()
+
+    def _start_checker(self) -> None:
+        with self._lock:
+            if self._checker is not None: return
+            self._checker = threading.Thread(target=self._check_loop, name="replica-health", daemon=True)
+        self._checker.start()
+
+    def _check_loop(self) -> None:
+        while not self._stopping.is_set():
+            try: self.check()
+            except Exception: logger.exception("Replica health check failed")
+            self._stopping.wait(self.check_interval)
+
+class RoutingSession(Session):
+    """Session reading from `replicas` inside `@reads` methods, see the module docstring. Subclassed per database."""
+    replicas: Optional[ReplicaSet] = None
+
+    @classmethod
+    def bound_to(cls, replicas: Optional[ReplicaSet]) -> type:
+        return type(cls.__name__, (cls,), {"replicas": replicas, "__module__": cls.__module__})
+
+    def commit(self) -> None:
+        super().commit()
+        version = self.info.pop(WRITTEN_VERSION_KEY, None)
+        if version is not None: written_version.set(version)
+
+    def rollback(self) -> None:
+        self.info.pop(WRITTEN_VERSION_KEY, None)
+        super().rollback()
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kw: Any) -> Any:
+        replica = self._replica(clause)
+        return replica.engine if replica is not None else super().get_bind(mapper=mapper, clause=clause, **kw)
+
+    def _replica(self, clause: Any) -> Optional[Replica]:
+        info = self.info
+        if self.replicas is None or info.get(PRIMARY_KEY): return None
+        if self._flushing or isinstance(clause, UpdateBase):
+            info[PRIMARY_KEY] = True
+            return None
+        if not info.get(READS_KEY): return None
+        replica = info.get(REPLICA_KEY)
+        if replica is None or not replica.healthy:
+            replica = info[REPLICA_KEY] = self.replicas.choose(required_version.get())
+        return replica
+
+def reads(method: Callable) -> Callable:
+    """Marks a read-only `PostgreSQL` method, its statements may go to a replica."""
+    @wraps(method)
+    def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        info = self.session.info
+        info[READS_KEY] = info.get(READS_KEY, 0) + 1
+        try: return method(self, *args, **kwargs)
+        finally: info[READS_KEY] -= 1
+    return wrapper
@@ -0,0 +1,159 @@
+"""
+Indexed substring search over colleges.college_name, companies.company_name and companies.role.
+
+Every backend answers the same two questions with a subquery of `(id, score)` rows,
+`score` being higher for better matches, so `PostgreSQL` can join it in and rank by it:
+    - PostgreSQL: pg_trgm GIN indexes, ILIKE uses them and `similarity()` ranks
+    - SQLite: FTS5 tables with the trigram tokenizer, kept in sync by triggers, ranked by bm25
+    - anything else (or terms too short for trigrams): plain ILIKE with exact > prefix > substring ranking
+"""
+import sqlite3
+from abc import ABC, abstractmethod
+from typing import Optional, List
+
+from sqlalchemy import Float, Integer, and_, case, column, func, literal, select, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import Subquery
+
+from constants import SEARCH_BACKEND
+
+colleges = table("colleges", column("id"), column("college_name"))
+companies = table("companies", column("id"), column("company_name"), column("role"))
+
+def _like_score(col, term: str):
+    return case(
+        (func.lower(col) == term.lower(), 3.0),
+        (func.lower(col).startswith(term.lower(), autoescape=True), 2.0),
+        else_=1.0
+    )
+
+class SearchIndex(ABC):
+    name: str = "abstract"
+    def install(self, engine: Engine) -> None: """Creates whatever the backend needs, safe to call on every start."""
+    def uninstall(self, engine: Engine) -> None: """Drops what `install` created (before the tables themselves are dropped)."""
+    @abstractmethod
+    def match_colleges(self, college_name: str) -> Subquery: ...
+    @abstractmethod
+    def match_companies(self, company_name: Optional[str] = None, role: Optional[str] = None) -> Subquery: ...
+    def like_scored(self, *terms: Optional[str]) -> bool:
+        """Whether one side's match (the college term, or the company and role terms) is scored by `_like_score`."""
+        return False
+
+class LikeSearchIndex(SearchIndex):
+    """No index, a sequential ILIKE scan, used as the fallback."""
+    name = "like"
+    def like_scored(self, *terms: Optional[str]) -> bool: return True
+    def match_colleges(self, college_name: str) -> Subquery:
+        return (select(colleges.c.id, _like_score(colleges.c.college_name, college_name).label("score"))
+                    .where(colleges.c.college_name.icontains(college_name, autoescape=True))
+                    .subquery("college_match"))
+    def match_companies(self, company_name: Optional[str] = None, role: Optional[str] = None) -> Subquery:
+        filters, score = [], literal(0.0)
+        if company_name:
+            filters.append(companies.c.company_name.icontains(company_name, autoescape=True))
+            score = score + _like_score(companies.c.company_name, company_name)
+        if role:
+            filters.append(companies.c.role.icontains(role, autoescape=True))
+            score = score + _like_score(companies.c.role, role)
+        return select(companies.c.id, score.label("score")).where(and_(*filters)).subquery("company_match")
+
+class TrigramSearchIndex(LikeSearchIndex):
+    """PostgreSQL pg_trgm: GIN indexes serve `ILIKE '%term%'`, `similarity()` ranks."""
+    name = "pg_trgm"
+    def like_scored(self, *terms: Optional[str]) -> bool: return False
+    INDEXES = (
+        ("ix_colleges_college_name_trgm", "colleges", "college_name"),
+        ("ix_companies_company_name_trgm", "companies", "company_name"),
+        ("ix_companies_role_trgm", "companies", "role"),
+    )
+    def install(self, engine: Engine) -> None:
+        with engine.begin() as conn:
+            conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            for index_name, table_name, column_name in self.INDEXES:
+                conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} USING gin ({column_name} gin_trgm_ops)")
+    def uninstall(self, engine: Engine) -> None:
+        with engine.begin() as conn:
+            for index_name, _, _ in self.INDEXES: conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index_name}")
+    def match_colleges(self, college_name: str) -> Subquery:
+        return (select(colleges.c.id, func.similarity(colleges.c.college_name, college_name).label("score"))
+                    .where(colleges.c.college_name.icontains(college_name, autoescape=True))
+                    .subquery("college_match"))
+    def match_companies(self, company_name: Optional[str] = None, role: Optional[str] = None) -> Subquery:
+        filters, score = [], literal(0.0)
+        if company_name:
+            filters.append(companies.c.company_name.icontains(company_name, autoescape=True))
+            score = score + func.similarity(companies.c.company_name, company_name)
+        if role:
+            filters.append(companies.c.role.icontains(role, autoescape=True))
+            score = score + func.similarity(companies.c.role, role)
+        return select(companies.c.id, score.label("score")).where(and_(*filters)).subquery("company_match")
+
+class FTS5SearchIndex(LikeSearchIndex):
+    """SQLite FTS5 (trigram tokenizer) external-content tables, a phrase query is a case-insensitive substring match."""
+    name = "fts5"
+    MIN_TERM_LENGTH = 3 # trigrams can't match anything shorter, those terms go through ILIKE
+    TABLES = (
+        ("colleges_fts", "colleges", ("college_name",)),
+        ("companies_fts", "companies", ("company_name", "role")),
+    )
+
+    @staticmethod
+    def _ddl(fts_table: str, source_table: str, columns: tuple) -> List[str]:
+        cols = ", ".join(columns)
+        new_values = ", ".join(f"new.{col}" for col in columns)
+        old_values = ", ".join(f"old.{col}" for col in columns)
+        delete_old = f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_values});"
+        insert_new = f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new_values});"
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5({cols}, content='{source_table}', content_rowid='id', tokenize='trigram')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {source_table} BEGIN {insert_new} END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {source_table} BEGIN {delete_old} END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE ON {source_table} BEGIN {delete_old} {insert_new} END",
+        ]
+
+    def install(self, engine: Engine) -> None:
+        with engine.begin() as conn:
+            for fts_table, source_table, columns in self.TABLES:
+                expected = {fts_table, f"{fts_table}_ai", f"{fts_table}_ad", f"{fts_table}_au"}
+                existing = {name for (name,) in conn.exec_driver_sql(
+                    f"SELECT name FROM sqlite_master WHERE name IN ({', '.join('?' * len(expected))})", tuple(expected))}
+                if existing == expected: continue
+                for statement in self._ddl(fts_table, source_table, columns): conn.exec_driver_sql(statement)
+                # Triggers were missing, so the index can't be trusted: rebuild it from the content table
+                conn.exec_driver_sql(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+
+    def uninstall(self, engine: Engine) -> None:
+        with engine.begin() as conn:
+            for fts_table, _, _ in self.TABLES:
+                for suffix in ("ai", "ad", "au"): conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {fts_table}_{suffix}")
+                conn.exec_driver_sql(f"DROP TABLE IF EXISTS {fts_table}")
+
+    def like_scored(self, *terms: Optional[str]) -> bool: return any(term and len(term) < self.MIN_TERM_LENGTH for term in terms)
+
+    @staticmethod
+    def _phrase(term: str) -> str: return '"' + term.replace('"', '""') + '"'
+
+    def match_colleges(self, college_name: str) -> Subquery:
+        if len(college_name) < self.MIN_TERM_LENGTH: return super().match_colleges(college_name)
+        return (text("SELECT rowid AS id, -bm25(colleges_fts) AS score FROM colleges_fts WHERE colleges_fts MATCH :college_query")
+                    .bindparams(college_query=f"college_name : {self._phrase(college_name)}")
+                    .columns(id=Integer, score=Float)
+                    .subquery("college_match"))
+
+    def match_companies(self, company_name: Optional[str] = None, role: Optional[str] = None) -> Subquery:
+        terms = [(col, term) for col, term in (("company_name", company_name), ("role", role)) if term]
+        if any(len(term) < self.MIN_TERM_LENGTH for _, term in terms): return super().match_companies(company_name=company_name, role=role)
+        return (text("SELECT rowid AS id, -bm25(companies_fts) AS score FROM companies_fts WHERE companies_fts MATCH :company_query")
+                    .bindparams(company_query=" AND ".join(f"{col} : {self._phrase(term)}" for col, term in terms))
+                    .columns(id=Integer, score=Float)
+                    .subquery("company_match"))
+
+def get_search_index(engine: Engine, backend: str = SEARCH_BACKEND) -> SearchIndex:
+    """Picks the backend for the engine's dialect, `backend` ("auto", "pg_trgm", "fts5" or "like") forces one."""
+    if backend == "auto":
+        if engine.dialect.name == "postgresql": backend = TrigramSearchIndex.name
+        elif engine.dialect.name == "sqlite" and sqlite3.sqlite_version_info >= (3, 34, 0): backend = FTS5SearchIndex.name # trigram tokenizer
+        else: backend = LikeSearchIndex.name
+    for cls in (TrigramSearchIndex, FTS5SearchIndex, LikeSearchIndex):
+        if cls.name == backend: return cls()
+    raise ValueError(f"Unknown search backend {backend}")
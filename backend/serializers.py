@@ -0,0 +1,397 @@
+"""
+Request parsing and response shaping shared by the Flask app (api.py) and the ASGI app (asgi.py).
+"""
+import io, csv, math, threading
+from collections import OrderedDict
+from typing import List, Optional, Any, Tuple, Dict, Iterator, NewType, Sequence, Hashable
+
+from werkzeug.exceptions import BadRequest
+
+from constants import EXPORT_CHUNK_SIZE, MAX_BATCH_OPERATIONS, FRAGMENT_CACHE_MAX_ENTRIES, AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX_LIMIT
+from autocomplete import AUTOCOMPLETE_FIELDS, Suggestion
+from cache import CacheStats
+from json_encoding import JSONBackend, json_backend
+from models import (
+    College, Company, SortByOptions, OrderOptions, PlacementRow, Page,
+    AnalyticsSummary, TopListItem, TopCtcItem, IngestReport, INGEST_COLUMNS,
+    IngestRow, PlacementKey, PlacementQuery, BatchOp, BatchOpOptions, BatchOpResult, BatchStatusOptions, BatchReport,
+    ImportJobInfo, DistributionReport, clean_text
+)
+
+EXPORT_COLUMNS: List[str] = ["id", *INGEST_COLUMNS]
+
+def get_dict_from_row(idx: int, row: PlacementRow):
+    return {
+        "id": idx,
+        "college_name": row.college_name,
+        "company_name": row.company_name,
+        "role": row.role,
+        "ctc": row.ctc,
+        "hr_name" : row.hr_name,
+        "linkedin_id" : row.linkedin_id,
+        "email" : row.email,
+        "contact_number" :  row.contact_number,
+    }
+
+ResponseFormat = NewType("ResponseFormat", str)
+ResponseFormatOptions: Dict[str, ResponseFormat] = {
+    "rows": ResponseFormat("rows"), # one object per row (default)
+    "columnar": ResponseFormat("columnar") # see get_columnar_from_rows
+}
+# Columns of the columnar format whose values are replaced by indexes into a per-response dictionary
+DICTIONARY_COLUMNS = ("college_name", "company_name", "role")
+
+def get_columnar_from_rows(rows: Sequence[PlacementRow]):
+    """
+    The rows as one array per `INGEST_COLUMNS` column. College, company and role strings are dictionary encoded:
+    their columns hold indexes into `dictionaries[column]`. A row's position stands in for the synthetic `id`.
+    """
+    transposed = list(zip(*rows)) if rows else [()] * len(PlacementRow._fields)
+    columns: Dict[str, list] = {}
+    dictionaries: Dict[str, list] = {}
+    for name in INGEST_COLUMNS:
+        values = transposed[PlacementRow._fields.index(name)]
+        if name in DICTIONARY_COLUMNS:
+            codes: Dict[Any, int] = {}
+            columns[name] = [codes.setdefault(value, len(codes)) for value in values]
+            dictionaries[name] = list(codes)
+        else: columns[name] = list(values)
+    return {"format": ResponseFormatOptions["columnar"], "length": len(rows), "columns": columns, "dictionaries": dictionaries}
+
+def get_format(value: Optional[str]) -> ResponseFormat:
+    response_format = ResponseFormatOptions.get(value or "rows")
+    if response_format is None: raise BadRequest("format must be one of " + ", ".join(ResponseFormatOptions))
+    return response_format
+
+class RowFragmentCache:
+    """
+    Pre-encoded JSON of the college and company fields of listing rows, keyed by id, so a rows response is
+    assembled mostly by concatenating bytes (the objects of `get_dict_from_row`, `id` first instead of sorted: a
+    field added there has to be added here, `test_row_fragments_every_field` compares them).
+    Each entry keeps the values it was encoded from: a row whose college or company was updated, or whose id was
+    re-used after a delete, is re-encoded rather than served stale. `invalidate` drops entries early.
+    """
+    NO_PERSON = b'"hr_name":null,"linkedin_id":null,"email":null,"contact_number":null}'
+    def __init__(self, backend: JSONBackend = json_backend, max_entries: int = FRAGMENT_CACHE_MAX_ENTRIES):
+        self.backend = backend
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[Any, bytes]]" = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def _fragment(self, key: Hashable, values: Any, encode) -> bytes:
+        # caller holds the lock
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == values:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+        self.misses += 1
+        fragment = encode()
+        self._entries[key] = (values, fragment)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return fragment
+
+    def encode_rows(self, rows: Sequence[PlacementRow]) -> bytes:
+        """The JSON array of `get_dict_from_row(idx, row)` objects."""
+        dumps, string = self.backend.dumps, self.backend.string
+        colleges: Dict[int, bytes] = {}
+        companies: Dict[int, bytes] = {}
+        with self._lock:
+            for row in rows:
+                if row.college_id not in colleges:
+                    colleges[row.college_id] = self._fragment(("college", row.college_id), row.college_name,
+                                                              lambda: b'"college_name":%b,' % string(row.college_name))
+                if row.company_id not in companies:
+                    companies[row.company_id] = self._fragment(("company", row.company_id), (row.company_name, row.role, row.ctc),
+                                                               lambda: b'"company_name":%b,"role":%b,"ctc":%b,' % (string(row.company_name), string(row.role), dumps(row.ctc)))
+        # One flat list and a single join, cheaper than formatting an object per row
+        no_person, parts = self.NO_PERSON, [b"["]
+        append = parts.append
+        for idx, row in enumerate(rows):
+            append(b'{"id":%d,' % idx if idx == 0 else b',{"id":%d,' % idx)
+            append(colleges[row.college_id])
+            append(companies[row.company_id])
+            if row.hr_name is None and row.linkedin_id is None and row.email is None and row.contact_number is None: append(no_person)
+            else: append(b'"hr_name":%b,"linkedin_id":%b,"email":%b,"contact_number":%b}' % (string(row.hr_name), string(row.linkedin_id), string(row.email), string(row.contact_number)))
+        append(b"]")
+        return b"".join(parts)
+
+    def invalidate(self, college_ids: Sequence[int] = (), company_ids: Sequence[int] = ()) -> None:
+        with self._lock:
+            for key in [("college", college_id) for college_id in college_ids] + [("company", company_id) for company_id in company_ids]:
+                self._entries.pop(key, None)
+
+    def stats(self) -> CacheStats:
+        return CacheStats(backend="fragments", hits=self.hits, misses=self.misses, evictions=self.evictions, size=len(self._entries))
+
+def get_dict_from_company(company: Company):
+    return {
+        "id": company.id,
+        "company_name": company.company_name,
+        "role": company.role,
+        "ctc": company.ctc
+    }
+
+def get_dict_from_college(college: College):
+    return {
+        "id": college.id,
+        "college_name": college.college_name
+    }
+
+def get_dict_from_page(page: Page, response_format: ResponseFormat = ResponseFormatOptions["rows"]):
+    return {
+        "items": get_columnar_from_rows(page.items) if response_format == ResponseFormatOptions["columnar"]
+                 else [get_dict_from_row(idx, row) for idx, row in enumerate(page.items)],
+        "next_cursor": page.next_cursor,
+        "total": page.total,
+    }
+
+def get_dict_from_report(report: IngestReport):
+    return {
+        "accepted": report.accepted,
+        "duplicates": report.duplicates,
+        "rejected": report.rejected,
+        "elapsed_seconds": report.elapsed_seconds,
+        "rows_per_second": report.rows_per_second,
+        "rows": [result._asdict() for result in report.rows],
+    }
+
+def get_dict_from_batch_report(report: BatchReport):
+    return {
+        "applied": report.applied,
+        "elapsed_seconds": report.elapsed_seconds,
+        "results": [result._asdict() for result in report.results],
+    }
+
+def get_dict_from_job(job: ImportJobInfo):
+    return {
+        "id": job.id,
+        "status": job.status,
+        "filename": job.filename,
+        "format": job.file_format,
+        "rows_total": job.total_rows,
+        "rows_processed": job.rows_processed,
+        "accepted": job.accepted,
+        "duplicates": job.duplicates,
+        "rejected": job.rejected,
+        "rejected_rows": [result._asdict() for result in job.rejected_rows],
+        "rows_per_second": job.rows_per_second,
+        "eta_seconds": job.eta_seconds,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+def get_dict_from_analytics(n: int, summary: AnalyticsSummary, top_companies_visits: List[TopListItem],
+                            top_colleges_visits: List[TopListItem], top_placements_ctc: List[TopCtcItem]):
+    # Convert NamedTuples to dictionaries for JSON serialization
+    return {
+        "summary": summary._asdict(),
+        f"top_{n}_companies_by_visits": [item._asdict() for item in top_companies_visits],
+        f"top_{n}_colleges_by_visits": [item._asdict() for item in top_colleges_visits],
+        f"top_{n}_placements_by_ctc": [item._asdict() for item in top_placements_ctc],
+    }
+
+def get_dict_from_distribution(report: DistributionReport):
+    return {
+        "version": report.version,
+        "summary": report.summary._asdict(),
+        "histogram": report.histogram._asdict(),
+        "role_medians": [item._asdict() for item in report.role_medians],
+        "college_medians": [item._asdict() for item in report.college_medians],
+        "comparison": [{**item._asdict(), "summary": item.summary._asdict()} for item in report.comparison],
+    }
+
+MAX_HISTOGRAM_BINS = 1000
+
+def get_distribution_args(data: Any) -> Dict[str, Any]:
+    """`distribution_report` arguments from /analytics/distribution query parameters or JSON, only those given."""
+    args: Dict[str, Any] = {}
+    percentiles = data.get('percentiles')
+    if percentiles is not None:
+        if isinstance(percentiles, str): percentiles = [value for value in percentiles.split(",") if value.strip()]
+        try: args["percentiles"] = [float(value) for value in percentiles]
+        except (TypeError, ValueError): raise BadRequest("percentiles must be numbers")
+        if not args["percentiles"] or not all(0 <= value <= 100 for value in args["percentiles"]): raise BadRequest("percentiles must be between 0 and 100")
+    for name, low, high in (("bins", 1, MAX_HISTOGRAM_BINS), ("limit", 0, None)):
+        if data.get(name) is None: continue
+        try: args[name] = int(data[name])
+        except (TypeError, ValueError): raise BadRequest(f"{name} must be an integer")
+        if args[name] < low or (high is not None and args[name] > high): raise BadRequest(f"{name} must be between {low} and {high}" if high else f"{name} must be at least {low}")
+    groups = data.get('groups')
+    if groups is not None:
+        if not isinstance(groups, dict) or not all(isinstance(colleges, list) and all(isinstance(college, str) for college in colleges) for colleges in groups.values()):
+            raise BadRequest("groups must map a group name to a list of college names")
+        args["groups"] = groups
+    return args
+
+def get_analytics_n(value: Optional[str]) -> int:
+    # 'n' for the top lists, default to 5 if not provided or invalid
+    try:
+        n = int(value if value is not None else 5)
+        return n if n > 0 else 5
+    except ValueError:
+        return 5
+
+def get_autocomplete_args(data: Any) -> Tuple[List[str], str, int]:
+    """Fields, prefix and limit of /autocomplete: every field unless 'field' names one."""
+    field = data.get('field')
+    if field is not None and field not in AUTOCOMPLETE_FIELDS: raise BadRequest(f"field must be one of {', '.join(AUTOCOMPLETE_FIELDS)}")
+    try: limit = int(data.get('limit', AUTOCOMPLETE_LIMIT))
+    except (TypeError, ValueError): raise BadRequest("limit must be an integer")
+    if not 1 <= limit <= AUTOCOMPLETE_MAX_LIMIT: raise BadRequest(f"limit must be between 1 and {AUTOCOMPLETE_MAX_LIMIT}")
+    return [field] if field is not None else list(AUTOCOMPLETE_FIELDS), data.get('prefix', ''), limit
+
+def get_dict_from_suggestions(suggestions: Dict[str, List[Suggestion]]) -> Dict[str, List[Dict[str, Any]]]:
+    return {field: [suggestion._asdict() for suggestion in items] for field, items in suggestions.items()}
+
+def get_page_args(data: dict) -> Optional[Dict[str, Any]]:
+    """Pagination arguments of /view and /search, None when the client wants the whole (legacy) list."""
+    if data.get('limit') is None: return None
+    try: limit = int(data['limit'])
+    except Exception as e: raise BadRequest("limit must be an integer")
+    order = OrderOptions.get(data.get('order', 'asc'))
+    if order is None: raise BadRequest("order must be one of " + ", ".join(OrderOptions))
+    return {
+        "sort_by": SortByOptions.get(data.get('sort_by'), SortByOptions["college_name"]),
+        "order": order,
+        "limit": limit,
+        "cursor": data.get('cursor'),
+        "with_total": bool(data.get('with_total', False)),
+    }
+
+def get_search_args(data: dict) -> Dict[str, Optional[str]]:
+    return {"college_name": data.get('college_name'), "company_name": data.get('company_name'), "role": data.get('role')}
+
+def get_query(data: dict) -> PlacementQuery:
+    """Filters, sort and page of a /view or /search body, see `PostgreSQL.query_rows`."""
+    bounds: Dict[str, Optional[float]] = {}
+    for name in ('ctc_min', 'ctc_max'):
+        try: bounds[name] = float(data[name]) if data.get(name) is not None else None
+        except Exception as e: raise BadRequest(f"{name} must be real")
+    page_args = get_page_args(data)
+    if page_args is not None: return PlacementQuery(**get_search_args(data), **bounds, **page_args)
+    order = OrderOptions.get(data.get('order', 'asc'))
+    if order is None: raise BadRequest("order must be one of " + ", ".join(OrderOptions))
+    return PlacementQuery(**get_search_args(data), **bounds, sort_by=SortByOptions.get(data.get('sort_by')), order=order)
+
+def get_rows_response(query: PlacementQuery, page: Page, response_format: ResponseFormat = ResponseFormatOptions["rows"]):
+    """A page object when the client paginates, the legacy plain list (or one columnar object) otherwise."""
+    if query.limit is not None: return get_dict_from_page(page, response_format)
+    if response_format == ResponseFormatOptions["columnar"]: return get_columnar_from_rows(page.items)
+    return [get_dict_from_row(idx, row) for idx, row in enumerate(page.items)]
+
+def encode_rows_response(query: PlacementQuery, page: Page, response_format: ResponseFormat, fragments: RowFragmentCache) -> bytes:
+    """`get_rows_response` encoded, rows through `fragments`, with jsonify's trailing newline."""
+    if response_format == ResponseFormatOptions["columnar"]: return fragments.backend.dumps(get_rows_response(query, page, response_format)) + b"\n"
+    items = fragments.encode_rows(page.items)
+    if query.limit is None: return items + b"\n"
+    rest = fragments.backend.dumps({"next_cursor": page.next_cursor, "total": page.total})
+    return b'{"items":' + items + b"," + rest[1:] + b"\n"
+
+def _get_ctc(value: Any) -> float:
+    try: ctc = float(value)
+    except Exception as e: raise BadRequest("ctc must be real")
+    if not math.isfinite(ctc) or ctc < 0: raise BadRequest("ctc must be a non-negative real number")
+    return ctc
+
+def _get_new_row(college_name: Any, company_name: Any, role: Any, ctc: Any, data: dict, prefix: str = "") -> Dict[str, Any]:
+    """`add_data` arguments cleaned as bulk ingestion cleans them (`validate_ingest_records`), so both store the same names."""
+    names = {"college_name": clean_text(college_name), "company_name": clean_text(company_name), "role": clean_text(role)}
+    missing = [name for name, value in names.items() if value is None]
+    if missing: raise BadRequest("Missing " + ", ".join(missing))
+    return {
+        **names, "ctc": _get_ctc(ctc),
+        "hr_name": clean_text(data.get(prefix + 'hr_name')), "linkedin_id": clean_text(data.get(prefix + 'linkedin_id')),
+        "email": clean_text(data.get(prefix + 'email')), "contact_number": clean_text(data.get(prefix + 'contact_number')),
+    }
+
+def get_add_args(data: dict) -> Dict[str, Any]:
+    """Validated keyword arguments of `PostgreSQL.add_data` from an /add body."""
+    college_name = data.get('college_name')
+    company_name = data.get('company_name')
+    role = data.get('role')
+    ctc = data.get('ctc')
+    if company_name is None or role is None or ctc is None or college_name is None:
+        raise BadRequest("Missing required fields in request data")
+    return _get_new_row(college_name, company_name, role, ctc, data)
+
+def get_delete_args(data: dict, prefix: str = "") -> Dict[str, Any]:
+    """Validated key of the placement to delete (`prefix` is "old_" for /edit-college-company bodies)."""
+    college_name = data.get(prefix + 'college_name')
+    company_name = data.get(prefix + 'company_name')
+    role = data.get(prefix + 'role')
+    ctc = data.get(prefix + 'ctc')
+    if company_name is None or role is None or ctc is None or college_name is None:
+        raise BadRequest("Missing required fields in request data")
+    try: ctc = float(ctc)
+    except Exception as e: raise BadRequest("ctc must be real")
+    return {"college_name": college_name, "company_name": company_name, "role": role, "ctc": ctc}
+
+def get_edit_args(data: dict) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """The placement to delete and the `add_data` arguments replacing it, missing new_* values keep the old ones."""
+    old = get_delete_args(data, prefix="old_")
+    new = _get_new_row(data.get('new_college_name', old["college_name"]), data.get('new_company_name', old["company_name"]),
+                       data.get('new_role', old["role"]), data.get('new_ctc', old["ctc"]), data, prefix="new_")
+    return old, new
+
+def get_batch_ops(data: Any) -> Tuple[List[BatchOp], List[BatchOpResult]]:
+    """
+    Parses a /batch body, `{"operations": [{"op": "add" | "edit" | "delete", ...}]}` where each operation carries the
+    fields of the matching route. When some are malformed the second list has a result for every operation.
+    """
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list): raise BadRequest("operations must be a list")
+    if len(operations) > MAX_BATCH_OPERATIONS: raise BadRequest(f"At most {MAX_BATCH_OPERATIONS} operations per batch")
+    ops: List[BatchOp] = []
+    results: List[BatchOpResult] = []
+    for index, operation in enumerate(operations):
+        kind = BatchOpOptions.get(operation.get('op')) if isinstance(operation, dict) else None
+        try:
+            if kind is None: raise BadRequest("op must be one of " + ", ".join(BatchOpOptions))
+            if kind == BatchOpOptions["add"]: ops.append(BatchOp(op=kind, new=IngestRow(**get_add_args(operation))))
+            elif kind == BatchOpOptions["delete"]: ops.append(BatchOp(op=kind, old=PlacementKey(**get_delete_args(operation))))
+            else:
+                old, new = get_edit_args(operation)
+                ops.append(BatchOp(op=kind, old=PlacementKey(**old), new=IngestRow(**new)))
+            results.append(BatchOpResult(index=index, op=kind, status=BatchStatusOptions["skipped"], reason="Batch not applied"))
+        except BadRequest as e:
+            results.append(BatchOpResult(index=index, op=kind, status=BatchStatusOptions["invalid"], reason=e.description))
+    if all(result.status != BatchStatusOptions["invalid"] for result in results): results = []
+    return ops, results
+
+class CsvChunker:
+    """Turns export rows into CSV text (same layout as the pandas export), one chunk per `chunk_size` rows."""
+    def __init__(self, chunk_size: int = EXPORT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.count = 0
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, lineterminator='\n')
+    def _take(self) -> str:
+        chunk = self.buffer.getvalue()
+        self.buffer.seek(0); self.buffer.truncate()
+        return chunk
+    def header(self) -> str:
+        self.writer.writerow(EXPORT_COLUMNS)
+        return self._take()
+    def add(self, row: tuple) -> Optional[str]:
+        """Buffers one row, returns a chunk once `chunk_size` rows are buffered."""
+        self.writer.writerow((self.count, *row))
+        self.count += 1
+        return self._take() if self.count % self.chunk_size == 0 else None
+    def flush(self) -> str: return self._take()
+
+def stream_csv(rows: Iterator[tuple], chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """Yields the CSV export chunk by chunk, the header goes out first."""
+    chunker = CsvChunker(chunk_size)
+    yield chunker.header()
+    for row in rows:
+        chunk = chunker.add(row)
+        if chunk is not None: yield chunk
+    rest = chunker.flush()
+    if rest: yield rest